@@ -1,6 +1,7 @@
 from flask import Flask
-from .database import db, bind_app
-from .config import load_config  # uses default_config.py in dev (per template)
+from .database import db, bind_app, init_migrate, tune_sqlite, track_changes
+from . import metrics
+from .config import load_config, SQLITE_MAINTENANCE_INTERVAL  # uses default_config.py in dev (per template)
 
 def create_app(config_overrides=None):
     app = Flask(__name__)
@@ -12,12 +13,21 @@ def create_app(config_overrides=None):
         app.config.update(cfg)
 
     db.init_app(app)
+    init_migrate(app)
     bind_app(app)
 
     with app.app_context():
-        # import both model modules so SQLAlchemy sees them, then create tables
+        if app.config.get("SQLITE_PRAGMAS"):
+            tune_sqlite(db.engine, app.config["SQLITE_PRAGMAS"], app.config.get("SQLITE_BEGIN"),
+                        app.config.get("SQLITE_MAINTENANCE_INTERVAL", SQLITE_MAINTENANCE_INTERVAL))
+        # import both model modules so SQLAlchemy sees them
         from .models import core  # noqa: F401
         from .models import user as user_models  # noqa: F401
-        db.create_all()
+        track_changes(db.engine, core.TableVersion.TRACKED)
+        metrics.configure(app.config)
+        metrics.instrument(db.engine)
+        # Schema creation is a round-trip per table; only on request (flask init db otherwise).
+        if app.config.get("CREATE_SCHEMA"):
+            db.create_all()
 
     return app
@@ -0,0 +1,19 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.controllers import attendance_controller as attendance
+from App.cli import require_roles
+
+attendance_cli = AppGroup('attendance')
+
+@attendance_cli.command('rebuild')
+@click.option('--from', 'start', default=None, type=click.DateTime(['%Y-%m-%d']), help='default: first shift')
+@click.option('--to', 'end', default=None, type=click.DateTime(['%Y-%m-%d']), help='default: last shift')
+@require_roles('admin')
+@with_appcontext
+def attendance_rebuild(start, end):
+    """Recompute the daily_attendance rollup from shifts and timelogs (backfill or repair)."""
+    try:
+        rows = attendance.rebuild(start and start.date(), end and end.date())
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Rebuilt {rows} user-days")
@@ -0,0 +1,23 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.models.core import User
+from App.cli import _session_set, _session_clear
+
+auth_cli = AppGroup('auth')
+
+@auth_cli.command('login')
+@click.argument('email')
+@click.argument('password')
+@with_appcontext
+def login(email, password):
+    u = User.query.filter_by(email=email).first()
+    if not u or not u.check_password(password):
+        raise click.ClickException("Invalid credentials")
+    _session_set(email)
+    click.echo(f"Logged in as {email} ({u.role})")
+
+@auth_cli.command('logout')
+@with_appcontext
+def logout():
+    _session_clear()
+    click.echo("Logged out")
@@ -0,0 +1,48 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.models.core import User
+from App.database import db
+from App.controllers import plan_controller as plans
+
+init = AppGroup('init')
+
+@init.command('db')
+@click.option('--drop', is_flag=True, help='Drop then recreate')
+@with_appcontext
+def init_db(drop):
+    if drop:
+        db.drop_all()
+    db.create_all()
+    click.echo("DB ready.")
+
+@init.command('seed')
+@with_appcontext
+def seed():
+    # users only (no payroll)
+    def ensure(name, email, role):
+        if not User.query.filter_by(email=email).first():
+            u = User(name=name, email=email, role=role)
+            u.set_password("pass")
+            db.session.add(u)
+
+    ensure('Admin','admin@example.com','admin')
+    ensure('Supervisor','supervisor@example.com','supervisor')
+    ensure('HR Clerk','hr@example.com','hr')
+    for i in range(1, 4):
+        ensure(f'Staff {i}', f'staff{i}@example.com', 'staff')
+    db.session.commit()
+    click.echo("Seeded users (password = 'pass').")
+
+@init.command('check-indexes')
+@with_appcontext
+def check_indexes():
+    """EXPLAIN the hot queries; fail if any falls back to a sequential scan."""
+    failed = 0
+    for name, scans in plans.check_query_plans().items():
+        if scans:
+            failed += 1
+            click.echo(f"FAIL {name}: sequential scan on {', '.join(sorted(set(scans)))}")
+        else:
+            click.echo(f"ok   {name}")
+    if failed:
+        raise click.ClickException(f"{failed} queries fall back to a sequential scan (run: flask db upgrade)")
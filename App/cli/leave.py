@@ -0,0 +1,154 @@
+import json
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from App.models.core import User
+from App.controllers import leave_controller as leave
+from App.cli import require_roles
+
+leave_cli = AppGroup('leave')
+
+@leave_cli.command('create')
+@require_roles('staff')
+@click.argument('requester_email')
+@click.argument('start_date')
+@click.argument('end_date')
+@click.argument('leave_type')
+@click.option('--reason', default='')
+@with_appcontext
+def leave_create(requester_email, start_date, end_date, leave_type, reason):
+    try:
+        lr = leave.create_leave(requester_email, start_date, end_date, leave_type, reason)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Leave #{lr.id} [{lr.status}] {start_date}→{end_date}")
+
+@leave_cli.command('decide')
+@require_roles('admin', 'supervisor')
+@click.argument('leave_id', type=int)
+@click.argument('approver_email')
+@click.argument('decision')
+@with_appcontext
+def leave_decide(leave_id, approver_email, decision):
+    try:
+        lr = leave.decide_leave(leave_id, approver_email, decision)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Leave #{lr.id} now {lr.status}")
+
+@leave_cli.command('calendar')
+@click.option('--from', 'start', required=True, type=click.DateTime(['%Y-%m-%d']), help='First day (YYYY-MM-DD)')
+@click.option('--to', 'end', required=True, type=click.DateTime(['%Y-%m-%d']), help='Last day, inclusive')
+@click.option('--role', default=None, help='Only staff with this role (and share of that role)')
+@click.option('--limit', default=leave.CALENDAR_LIMIT, show_default=True, help='Requests to list')
+@click.option('--format', 'fmt', type=click.Choice(['text', 'json']), default='text')
+@require_roles('admin', 'supervisor', 'hr')
+@with_appcontext
+def leave_calendar(start, end, role, limit, fmt):
+    """Who is off between two dates, and how many staff are absent on each day."""
+    try:
+        cal = leave.calendar(start.date(), end.date(), role, limit)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if fmt == 'json':
+        click.echo(json.dumps(cal, indent=2))
+        return
+    for d in cal["days"]:
+        click.echo(f"{d['day']} {d['absent']:5d} off {d['share'] * 100:5.1f}% " + "#" * round(d['share'] * 50))
+    click.echo(f"-- approved requests (headcount {cal['headcount']})")
+    for lr in cal["off"]:
+        click.echo(f"#{lr['id']} {lr['email']} {lr['start_date']}→{lr['end_date']} {lr['type']}")
+    if cal["more"]:
+        click.echo(f"-- more: raise --limit above {limit}")
+
+@leave_cli.command('rebuild-calendar')
+@require_roles('admin')
+@with_appcontext
+def leave_rebuild_calendar():
+    """Rewrite the leave_days calendar from approved requests (backfill or repair)."""
+    click.echo(f"Rebuilt {leave.rebuild_calendar()} leave days")
+
+@leave_cli.command('balance')
+@click.argument('email')
+@click.option('--history', is_flag=True, help='Also list the ledger entries')
+@click.option('--type', 'leave_type', default=None, help='Only this leave type')
+@require_roles('admin', 'supervisor', 'hr', 'staff')
+@with_appcontext
+def leave_balance(email, history, leave_type):
+    """Days of leave left per type, from the balance snapshots."""
+    u = User.query.filter_by(email=email).first()
+    if not u: raise click.ClickException("No such user")
+    balances = leave.balances(u.id)
+    if leave_type: balances = {leave_type: balances[leave_type]} if leave_type in balances else {}
+    for kind, days in balances.items():
+        click.echo(f"{kind:10} {days:8.2f} days")
+    if not balances:
+        click.echo("No tracked leave types")
+    if history:
+        for e in leave.ledger(u.id, leave_type):
+            click.echo(f"#{e.id} {e.posted_at:%Y-%m-%d} {e.type:10} {e.kind:10} {e.days:+8.2f}"
+                       + (f" leave #{e.leave_id}" if e.leave_id else "") + (f" {e.period}" if e.period else "")
+                       + (f" ({e.note})" if e.note else ""))
+
+@leave_cli.command('accrue')
+@click.argument('period')
+@click.option('--rate', 'rates', multiple=True, help='type:days per period, over LEAVE_ACCRUALS (repeatable)')
+@click.option('--role', 'roles', multiple=True, help='Only users with these roles (repeatable)')
+@require_roles('admin', 'hr')
+@with_appcontext
+def leave_accrue(period, rates, roles):
+    """Post PERIOD's (YYYY-MM) accruals for the whole workforce; users already accrued are skipped."""
+    try:
+        rates = {**current_app.config.get('LEAVE_ACCRUALS', {}), **leave.parse_rates(rates)}
+        posted = leave.accrue(period, rates, list(roles) or None)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Posted {posted} accruals for {period}")
+
+@leave_cli.command('adjust')
+@click.argument('email')
+@click.argument('leave_type')
+@click.argument('days', type=float)
+@click.option('--note', default=None, help='Why (opening balance, correction, ...)')
+@require_roles('admin', 'hr')
+@with_appcontext
+def leave_adjust(email, leave_type, days, note):
+    """Post a manual adjustment of DAYS (negative to deduct)."""
+    try:
+        left = leave.adjust(email, leave_type, days, note)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{email} {leave_type}: {left:.2f} days")
+
+@leave_cli.command('rebuild-balances')
+@require_roles('admin')
+@with_appcontext
+def leave_rebuild_balances():
+    """Rewrite the balance snapshots from the ledger (repair)."""
+    leave.rebuild_balances()
+    click.echo("Rebuilt leave balances")
+
+@leave_cli.command('list')
+@click.option('--status', default=None, help='pending/approved/rejected/cancelled')
+@click.option('--email', default=None, help='Filter by requester email')
+@click.option('--after-id', default=None, type=int, help='Keyset cursor: only ids after this one')
+@click.option('--limit', default=None, type=int, help='Page size (default: everything)')
+def leave_list(status, email, after_id, limit):
+    requester_id = None
+    if email:
+        u = User.query.filter_by(email=email).first()
+        if not u:
+            click.echo("No such user"); return
+        requester_id = u.id
+
+    shown = last_id = 0
+    for lr in leave.list_leave(status, requester_id, after_id, limit):
+        click.echo(
+            f"#{lr.id} {lr.start_date}→{lr.end_date} {lr.type:6} "
+            f"[{lr.status}] requester={lr.requester.email} approver={(lr.approver.email if lr.approver else '-')}"
+        )
+        shown, last_id = shown + 1, lr.id
+    if not shown:
+        click.echo("No leave requests found"); return
+    if limit and shown == limit:
+        click.echo(f"-- more: --after-id {last_id}")
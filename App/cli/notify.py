@@ -0,0 +1,87 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.models.core import User
+from App.controllers import notify_controller as notify
+from App.cli import require_roles
+
+notify_cli = AppGroup('notify')
+
+@notify_cli.command('send')
+@require_roles('admin', 'supervisor', 'hr')
+@click.argument('recipient_email')
+@click.argument('message')
+@click.option('--channel', default='inapp')
+@click.option('--etype', default=None)
+@click.option('--eid', default=None, type=int)
+@with_appcontext
+def notify_send(recipient_email, message, channel, etype, eid):
+    n = notify.send_notification(recipient_email, message, channel, etype, eid)
+    click.echo(f"Notification #{n.id} to {recipient_email} [{channel}]")
+
+@notify_cli.command('broadcast')
+@require_roles('admin', 'supervisor', 'hr')
+@click.argument('message')
+@click.option('--role', default=None, help='Only users with this role')
+@click.option('--email', 'emails', multiple=True, help='Recipient email (repeatable)')
+@click.option('--all', 'everyone', is_flag=True, help='Every user')
+@click.option('--channel', default='inapp')
+@click.option('--etype', default=None)
+@click.option('--eid', default=None, type=int)
+@with_appcontext
+def notify_broadcast(message, role, emails, everyone, channel, etype, eid):
+    """Notify a role, a list of emails or everyone with one bulk insert."""
+    if not (everyone or role or emails):
+        raise click.ClickException("Give --role, --email or --all")
+    try:
+        count, ids = notify.fan_out(message, channel, role, emails or None, etype, eid)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{count} notifications [{channel}]" + (f", {len(ids)} pending delivery (flask notify deliver)" if ids else ""))
+
+@notify_cli.command('deliver')
+@click.option('--max-attempts', default=notify.MAX_ATTEMPTS, show_default=True)
+@click.option('--backoff', default=notify.BACKOFF, show_default=True, help='Seconds before the first retry')
+@with_appcontext
+def notify_deliver(max_attempts, backoff):
+    """Deliver pending email/sms notifications that are due (safe to run from cron)."""
+    counts = notify.deliver_pending(max_attempts=max_attempts, backoff=backoff)
+    click.echo(f"sent={counts['sent']} failed={counts['failed']} retry={counts['retry']}")
+
+@notify_cli.command('inbox')
+@click.argument('email')
+@click.option('--unread', 'unread_only', is_flag=True, help='Only unread notifications')
+@click.option('--before', default=None, type=click.DateTime(['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S']),
+              help='Keyset cursor: created_at of the last row shown')
+@click.option('--before-id', default=None, type=int, help='Keyset cursor: id of the last row shown')
+@click.option('--limit', default=20, show_default=True)
+@with_appcontext
+def notify_inbox(email, unread_only, before, before_id, limit):
+    u = User.query.filter_by(email=email).first()
+    if not u:
+        raise click.ClickException("No such user")
+    rows = notify.inbox(u.id, before, before_id, limit, unread_only)
+    click.echo(f"{notify.unread_count(u.id)} unread")
+    for n in rows:
+        click.echo(f"#{n.id} {n.created_at:%Y-%m-%d %H:%M} {' ' if n.read else '*'} [{n.channel}] {n.message}")
+    if len(rows) == limit:
+        click.echo(f"-- more: --before {rows[-1].created_at.isoformat()} --before-id {rows[-1].id}")
+
+@notify_cli.command('read')
+@click.argument('email')
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--all', 'everything', is_flag=True, help='Mark every notification read')
+@with_appcontext
+def notify_read(email, ids, everything):
+    u = User.query.filter_by(email=email).first()
+    if not u:
+        raise click.ClickException("No such user")
+    if not (ids or everything):
+        raise click.ClickException("Give notification ids or --all")
+    click.echo(f"{notify.mark_read(u.id, None if everything else ids)} unread")
+
+@notify_cli.command('recount')
+@with_appcontext
+def notify_recount():
+    """Rebuild the unread counters from the notifications table."""
+    notify.recount_unread()
+    click.echo("Unread counters rebuilt.")
@@ -0,0 +1,183 @@
+import csv
+import json
+import click
+from datetime import timedelta
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from App.controllers import admin_controller as admin
+from App.controllers import staff_controller as staff
+from App.controllers import report_controller as reports
+from App.controllers import attendance_controller as attendance
+from App.controllers import conflict_controller as conflicts
+from App.controllers import autofill_controller as autofill
+from App.controllers import exception_controller as exceptions
+from App.cli import require_roles
+
+roster_cli = AppGroup('roster')
+
+@roster_cli.command('assign')
+@click.argument('email')
+@click.argument('start_iso')
+@click.argument('end_iso')
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def assign(email, start_iso, end_iso):
+    try:
+        sh = admin.assign_shift(email, start_iso, end_iso)
+    except conflicts.ConflictError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Shift #{sh.id} for {email} {start_iso}→{end_iso}")
+
+@roster_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT batch')
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def roster_import(path, batch_size):
+    """Bulk-create shifts from a CSV/JSON/NDJSON file of email,start,end rows."""
+    try:
+        inserted, errors = admin.import_shifts(admin.read_shift_file(path), batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for row_no, message in errors:
+        click.echo(f"row {row_no}: {message}", err=True)
+    click.echo(f"Imported {inserted} shifts ({len(errors)} rows rejected)")
+
+@roster_cli.command('view')
+@click.option('--from', 'start', default=None, type=click.DateTime(['%Y-%m-%d']), help='First day (YYYY-MM-DD)')
+@click.option('--to', 'end', default=None, type=click.DateTime(['%Y-%m-%d']), help='Last day, inclusive')
+@click.option('--user', 'email', default=None, help='Only this staff email')
+@click.option('--status', default=None, help='scheduled/completed/missed')
+@with_appcontext
+def view(start, end, email, status):
+    for sh in staff.view_roster(start.date() if start else None, end.date() if end else None, email, status):
+        click.echo(f"#{sh.id} {sh.user.email} {sh.start_time} → {sh.end_time} [{sh.status}]")
+
+@roster_cli.command('conflicts')
+@click.option('--from', 'start', required=True, type=click.DateTime(['%Y-%m-%d']), help='First day (YYYY-MM-DD)')
+@click.option('--to', 'end', required=True, type=click.DateTime(['%Y-%m-%d']), help='Last day, inclusive')
+@with_appcontext
+def roster_conflicts(start, end):
+    """Audit double-bookings and shifts on approved leave."""
+    found = list(conflicts.audit(start, end + timedelta(days=1)))
+    who = conflicts.emails({uid for uid, _, _ in found}) if found else {}
+    for uid, it, hit in found:
+        click.echo(f"{who.get(uid, uid)}: shift #{it[3]} ({it[0]} → {it[1]}) conflicts with {conflicts.describe(hit)}")
+    if found:
+        raise click.ClickException(f"{len(found)} conflicts")
+    click.echo("No conflicts.")
+
+@roster_cli.command('autofill')
+@click.argument('demand_csv', type=click.Path(exists=True, dir_okay=False))  # start,end,count rows
+@click.option('--shift-hours', default=8.0, show_default=True)
+@click.option('--max-hours', default=40.0, show_default=True, help='Weekly hours cap per staff member')
+@click.option('--min-rest', default=11.0, show_default=True, help='Hours off between shifts')
+@click.option('--slot-minutes', default=15, show_default=True)
+@click.option('--time-budget', default=2.0, show_default=True, help='Seconds to spend improving the plan')
+@click.option('--apply', 'do_apply', is_flag=True, help='Insert the proposed shifts (default: preview only)')
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def roster_autofill(demand_csv, shift_hours, max_hours, min_rest, slot_minutes, time_budget, do_apply):
+    """Propose shifts covering a demand curve; leave, existing shifts, weekly hours and rest are respected."""
+    plan = autofill.autofill(autofill.read_demand(demand_csv), shift_hours, max_hours, min_rest,
+                             slot_minutes, time_budget)
+    who = conflicts.emails({uid for uid, _, _ in plan["shifts"]}) if plan["shifts"] else {}
+    for uid, start, end in plan["shifts"]:
+        click.echo(f"{who.get(uid, uid)} {start} → {end}")
+    click.echo(f"{len(plan['shifts'])} shifts; {plan['uncovered_slots']} staff-slots uncovered, "
+               f"{plan['overstaffed_slots']} overstaffed")
+    if do_apply:
+        click.echo(f"Inserted {autofill.apply_plan(plan['shifts'])} shifts")
+
+@roster_cli.command('coverage')
+@click.option('--from', 'start', required=True, type=click.DateTime(['%Y-%m-%d']), help='First day (YYYY-MM-DD)')
+@click.option('--to', 'end', required=True, type=click.DateTime(['%Y-%m-%d']), help='Last day, inclusive')
+@click.option('--slot-minutes', default=15, show_default=True)
+@click.option('--role', 'roles', multiple=True, help='Only these roles (repeatable)')
+@click.option('--min', 'mins', multiple=True, help='role:N minimum headcount, over COVERAGE_MINIMUMS (repeatable)')
+@click.option('--format', 'fmt', type=click.Choice(['text', 'json']), default='text')
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def roster_coverage(start, end, slot_minutes, roles, mins, fmt):
+    """Staff on shift per slot and role as a heatmap, one line per day; ! marks slots below the minimum."""
+    from App.controllers import coverage_controller as coverage  # NumPy: only for this command
+    try:
+        minimums = {**current_app.config.get('COVERAGE_MINIMUMS', {}), **coverage.parse_minimums(mins)}
+        result = coverage.coverage(start.date(), end.date(), slot_minutes, list(roles) or None, minimums)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if fmt == 'json':
+        click.echo(json.dumps(result, indent=2))
+        return
+    per_day, shades = 1440 // slot_minutes, " .:-=+*#%@"
+    for role, counts in result["headcount"].items():
+        peak, minimum = max(counts, default=0), minimums.get(role, 0)
+        click.echo(f"{role} (peak {peak}" + (f", minimum {minimum})" if minimum else ")"))
+        for d in range(0, len(counts), per_day):
+            day = start.date() + timedelta(days=d // per_day)
+            cells = "".join("!" if n < minimum else shades[-(-n * (len(shades) - 1) // peak) if peak else 0]
+                            for n in counts[d:d + per_day])
+            click.echo(f"  {day:%Y-%m-%d %a} |{cells}|")
+    for gap in result["understaffed"]:
+        click.echo(f"understaffed {gap['role']}: {gap['start']} → {gap['end']} "
+                   f"({gap['staffed']} of {gap['minimum']})", err=True)
+
+@roster_cli.command('sweep-exceptions')
+@click.option('--late-grace', default=exceptions.LATE_GRACE, show_default=True, help='Minutes')
+@click.option('--early-grace', default=exceptions.EARLY_GRACE, show_default=True, help='Minutes')
+@click.option('--overtime-grace', default=exceptions.OVERTIME_GRACE, show_default=True, help='Minutes')
+@with_appcontext
+def sweep_exceptions(late_grace, early_grace, overtime_grace):
+    """Flag late/early/overtime/no-show for shifts ended since the last sweep (safe to run every minute)."""
+    counts = exceptions.sweep_exceptions(late_grace=late_grace, early_grace=early_grace,
+                                         overtime_grace=overtime_grace)
+    through = counts.pop("through")
+    click.echo(", ".join(f"{k}={v}" for k, v in counts.items()) + f" (swept through {through})")
+
+@roster_cli.command('clock-in')
+@click.argument('email')
+@click.argument('shift_id', type=int)
+@require_roles('staff')
+@with_appcontext
+def clock_in(email, shift_id):
+    tl = staff.clock_in(email, shift_id)
+    click.echo(f"Clock-in #{tl.id} at {tl.clock_in}")
+
+@roster_cli.command('clock-out')
+@click.argument('email')
+@click.argument('timelog_id', type=int)
+@require_roles('staff')
+@with_appcontext
+def clock_out(email, timelog_id):
+    tl = staff.clock_out(email, timelog_id)
+    click.echo(f"Clock-out #{tl.id} at {tl.clock_out}")
+
+@roster_cli.command('report-week')
+@require_roles('admin', 'supervisor')
+@click.argument('week_start')  # e.g., 2025-10-01
+@click.option('--format', 'fmt', type=click.Choice(['text', 'json', 'csv']), default='text')
+@click.option('--rollup', is_flag=True, help='Read daily_attendance (shifts by work date) instead of the raw logs')
+@with_appcontext
+def report_week(week_start, fmt, rollup):
+    report = attendance.weekly_report(week_start) if rollup else reports.weekly_report(week_start)
+    rows = report["rows"]
+
+    if fmt == 'json':
+        click.echo(json.dumps(report, indent=2))
+        return
+    if fmt == 'csv':
+        out = click.get_text_stream('stdout')
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(["user_id", "name", "scheduled", "completed", "missed", "worked_minutes"])
+        for row in rows:
+            writer.writerow([row["user_id"], row["name"], row["scheduled"], row["completed"],
+                             row["missed"], row["worked_minutes"]])
+        return
+
+    click.echo(f"Weekly report {report['week_start']} to {report['week_end']}")
+    if not rows:
+        click.echo("No data.")
+        return
+    for row in rows:
+        hours = row["worked_minutes"] / 60.0
+        click.echo(f"- {row['name']}: scheduled={row['scheduled']} completed={row['completed']} missed={row['missed']} worked_hours={hours:.2f}")
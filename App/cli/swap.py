@@ -0,0 +1,91 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.models.core import User
+from App.controllers import swap_controller as swap
+from App.controllers import conflict_controller as conflicts
+from App.controllers import availability_controller as availability
+from App.cli import require_roles
+
+swap_cli = AppGroup('swap')
+
+@swap_cli.command('request')
+@require_roles('staff')
+@click.argument('from_email')
+@click.argument('shift_id', type=int)
+@click.argument('to_email')
+@click.option('--note', default='')
+@with_appcontext
+def swap_request(from_email, shift_id, to_email, note):
+    sr = swap.request_swap(from_email, shift_id, to_email, note)
+    click.echo(f"Swap #{sr.id} from {from_email} -> {to_email} for shift #{shift_id}")
+
+@swap_cli.command('candidates')
+@require_roles('staff', 'admin', 'supervisor')
+@click.argument('shift_id', type=int)
+@click.option('--max-hours', default=availability.MAX_WEEK_HOURS, show_default=True, help='Weekly hours cap, this shift included')
+@click.option('--min-rest', default=availability.MIN_REST_HOURS, show_default=True, help='Hours off around other shifts')
+@click.option('--limit', default=availability.LIMIT, show_default=True)
+@with_appcontext
+def swap_candidates(shift_id, max_hours, min_rest, limit):
+    """Who could take this shift: free, not on leave, rested and under the weekly cap; fewest hours first."""
+    try:
+        found = availability.candidates(shift_id, max_hours, min_rest, limit)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for c in found:
+        click.echo(f"{c['email']} ({c['name']}): {c['week_minutes'] / 60:.1f} h rostered that week")
+    if not found:
+        click.echo("No eligible staff")
+
+@swap_cli.command('rebuild-availability')
+@click.option('--from', 'start', default=None, type=click.DateTime(['%Y-%m-%d']), help='default: first shift')
+@click.option('--to', 'end', default=None, type=click.DateTime(['%Y-%m-%d']), help='default: last shift')
+@require_roles('admin')
+@with_appcontext
+def swap_rebuild_availability(start, end):
+    """Recompute the availability bitmaps from shifts and approved leave (backfill or repair)."""
+    try:
+        rows = availability.rebuild(start and start.date(), end and end.date())
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Rebuilt {rows} user-weeks")
+
+@swap_cli.command('decide')
+@require_roles('admin', 'supervisor')
+@click.argument('swap_id', type=int)
+@click.argument('approver_email')
+@click.argument('decision')
+@with_appcontext
+def swap_decide(swap_id, approver_email, decision):
+    try:
+        sr = swap.approve_swap(swap_id, approver_email, decision)
+    except conflicts.ConflictError as e:
+        raise click.ClickException(f"Cannot approve: {e}")
+    click.echo(f"Swap #{sr.id} now {sr.status}")
+
+@swap_cli.command('list')
+@click.option('--status', default=None, help='pending/approved/rejected/cancelled')
+@click.option('--email', default=None, help='Filter by user email (requester or target)')
+@click.option('--after-id', default=None, type=int, help='Keyset cursor: only ids after this one')
+@click.option('--limit', default=None, type=int, help='Page size (default: everything)')
+def swap_list(status, email, after_id, limit):
+    user_id = None
+    if email:
+        u = User.query.filter_by(email=email).first()
+        if not u:
+            click.echo("No such user"); return
+        user_id = u.id
+
+    shown = last_id = 0
+    for sr in swap.list_swaps(status, user_id, after_id, limit):
+        sh = sr.shift
+        when = (sh.start_time.strftime("%Y-%m-%d %H:%M") if sh and sh.start_time else "")
+        click.echo(
+            f"#{sr.id} shift={sr.shift_id} {when} "
+            f"[{sr.status}] from={sr.from_user.email} -> to={sr.to_user.email} note={sr.note or ''}"
+        )
+        shown, last_id = shown + 1, sr.id
+    if not shown:
+        click.echo("No swap requests found"); return
+    if limit and shown == limit:
+        click.echo(f"-- more: --after-id {last_id}")
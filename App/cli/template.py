@@ -0,0 +1,85 @@
+import click
+from datetime import datetime, timedelta
+from flask.cli import AppGroup, with_appcontext
+from App.models.core import ShiftTemplate
+from App.controllers import template_controller as templates
+from App.cli import require_roles
+
+template_cli = AppGroup('template')
+
+def _expand_report(tpl_name, counts):
+    for day, message in counts['conflicts']:
+        click.echo(f"{day}: {message}", err=True)
+    click.echo(f"{tpl_name}: +{counts['inserted']} shifts, {counts['updated']} moved, {counts['deleted']} removed"
+               + (f", {len(counts['conflicts'])} dates skipped (conflicts)" if counts['conflicts'] else ""))
+
+@template_cli.command('create')
+@click.argument('email')
+@click.argument('name')
+@click.argument('start')  # e.g., 09:00
+@click.argument('end')    # e.g., 17:00 (at/before start = overnight)
+@click.option('--anchor', required=True, help='First day of the pattern (YYYY-MM-DD)')
+@click.option('--weekly', default=None, help='Weekdays, e.g. mon-fri or mon,wed,fri')
+@click.option('--cycle', default=None, help='Days on/off from the anchor, e.g. 4/4')
+@click.option('--until', default=None, help='Last day of the pattern')
+@click.option('--include-holidays', is_flag=True, help='Also roster on public holidays')
+@click.option('--weeks', default=4, show_default=True, help='Expand this many weeks ahead')
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def template_create(email, name, start, end, anchor, weekly, cycle, until, include_holidays, weeks):
+    try:
+        tpl = templates.create_template(email, name, start, end, anchor, weekly, cycle, until, not include_holidays)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Template #{tpl.id} {tpl.name} for {email}")
+    _expand_report(tpl.name, templates.expand_template(tpl.id, datetime.now().date() + timedelta(weeks=weeks)))
+
+@template_cli.command('update')
+@click.argument('template_id', type=int)
+@click.option('--user', 'email', default=None, help='Reassign to this staff email')
+@click.option('--start', default=None)
+@click.option('--end', default=None)
+@click.option('--anchor', default=None)
+@click.option('--weekly', default=None)
+@click.option('--cycle', default=None)
+@click.option('--until', default=None, help="Last day, or '' to clear")
+@click.option('--holidays/--skip-holidays', 'include_holidays', default=None, help='Roster on public holidays?')
+@click.option('--active/--inactive', default=None)
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def template_update(template_id, email, start, end, anchor, weekly, cycle, until, include_holidays, active):
+    """Edit a template and re-expand it; only future, un-worked shifts change."""
+    skip = None if include_holidays is None else not include_holidays
+    try:
+        tpl = templates.update_template(template_id, email, active, start=start, end=end, anchor=anchor,
+                                        weekdays=weekly, cycle=cycle, until=until, skip_holidays=skip)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    through = tpl.expanded_until or (datetime.now().date() + timedelta(weeks=4))
+    _expand_report(tpl.name, templates.expand_template(tpl.id, through))
+
+@template_cli.command('expand')
+@click.option('--weeks', default=4, show_default=True, help='Horizon from today')
+@require_roles('admin', 'supervisor')
+@with_appcontext
+def template_expand(weeks):
+    _expand_report("all templates", templates.expand_all(datetime.now().date() + timedelta(weeks=weeks)))
+
+@template_cli.command('holiday')
+@click.argument('day')
+@click.argument('name')
+@require_roles('admin', 'supervisor', 'hr')
+@with_appcontext
+def template_holiday(day, name):
+    h = templates.add_holiday(day, name)
+    click.echo(f"Holiday {h.date} {h.name} (run 'flask template expand' to clear shifts on it)")
+
+@template_cli.command('list')
+@with_appcontext
+def template_list():
+    for tpl in ShiftTemplate.query.order_by(ShiftTemplate.id):
+        j = tpl.get_json()
+        pattern = f"weekly {j['weekdays']}" if tpl.kind == 'weekly' else f"cycle {j['on_days']}/{j['off_days']}"
+        click.echo(f"#{j['id']} {j['name']} {j['user']} {pattern} {j['start_time']}-{j['end_time']} "
+                   f"from {j['anchor_date']} until {j['until_date'] or '-'} "
+                   f"[{'active' if j['active'] else 'inactive'}] expanded to {j['expanded_until'] or '-'}")
@@ -0,0 +1,23 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.controllers import timesheet_controller as timesheets
+from App.cli import require_roles
+
+timesheet_cli = AppGroup('timesheet')
+
+@timesheet_cli.command('export')
+@require_roles('admin', 'supervisor', 'hr')
+@click.option('--from', 'start', required=True, type=click.DateTime(['%Y-%m-%d']))
+@click.option('--to', 'end', required=True, type=click.DateTime(['%Y-%m-%d']))
+@click.option('--format', 'fmt', type=click.Choice(list(timesheets.FORMATS)), default='csv')
+@click.option('--email', default=None, help='only this staff member')
+@click.option('--output', '-o', type=click.File('w'), default='-')
+@with_appcontext
+def timesheet_export(start, end, fmt, email, output):
+    """Per-user, per-day worked minutes for payroll, streamed as CSV or NDJSON."""
+    try:
+        chunks = timesheets.export(start.date(), end.date(), fmt, email)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for chunk in chunks:
+        output.write(chunk)
@@ -0,0 +1,18 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from App.database import db
+from App.controllers import admin_controller as admin
+from App.cli import require_roles
+
+user_cli = AppGroup('user')
+
+@user_cli.command('create-staff')
+@click.argument('name')
+@click.argument('email')
+@require_roles('admin')
+@with_appcontext
+def create_staff(name, email):
+    s = admin.create_staff(name, email)
+    s.set_password("pass")
+    db.session.commit()
+    click.echo(f"Created staff: {s.email}")
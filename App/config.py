@@ -1,4 +1,49 @@
 import os
+from sqlalchemy.engine.url import make_url
+from .database import MeteredQueuePool
+
+# Production DB profile (DB_PROFILE=production, set by gunicorn_config.py along with DB_WORKERS
+# and DB_GREENLETS). Every worker process has its own pool, so they split the server's budget.
+DB_MAX_CONNECTIONS = 100  # Postgres' default max_connections
+DB_RESERVED_CONNECTIONS = 10  # left over for migrations, cron jobs and psql
+DB_POOL_TIMEOUT = 10  # seconds a checkout may wait before the request fails
+DB_POOL_RECYCLE = 1800  # seconds; below the usual server and proxy idle timeouts
+
+# SQLite under the same profile: WAL lets readers run alongside the writer, and NORMAL syncs the
+# WAL only at checkpoints (a power cut can lose the last commits, never corrupt the file).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms to wait for the write lock
+    'cache_size': -65536,  # KiB, i.e. 64 MiB of page cache per connection
+    'mmap_size': 268435456,  # 256 MiB
+}
+SQLITE_MAINTENANCE_INTERVAL = 600  # seconds between PRAGMA optimize / WAL checkpoint runs
+
+def pool_size(workers, greenlets, max_connections=DB_MAX_CONNECTIONS, reserved=DB_RESERVED_CONNECTIONS):
+    """(pool_size, max_overflow) for one worker: its share of the budget, never more than its greenlets."""
+    share = max(1, min(greenlets, (max_connections - reserved) // max(workers, 1)))
+    size = max(1, share * 2 // 3)
+    return size, share - size
+
+def apply_db_profile(config):
+    if config.get('DB_PROFILE') != 'production':
+        return
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    # SQLite keeps SQLAlchemy's default pool (no server budget to share) and gets tuned
+    # pragmas instead, when it is a file. create_app applies them with tune_sqlite().
+    if url.get_backend_name() == 'sqlite':
+        if url.database not in (None, '', ':memory:'):
+            config['SQLITE_PRAGMAS'] = {**SQLITE_PRAGMAS, **config.get('SQLITE_PRAGMAS', {})}
+        return
+    size, overflow = pool_size(config.get('DB_WORKERS', 1), config.get('DB_GREENLETS', 1000),
+                               config.get('DB_MAX_CONNECTIONS', DB_MAX_CONNECTIONS),
+                               config.get('DB_RESERVED_CONNECTIONS', DB_RESERVED_CONNECTIONS))
+    options = {'poolclass': MeteredQueuePool, 'pool_size': size, 'max_overflow': overflow,
+               'pool_pre_ping': True, 'pool_timeout': config.get('DB_POOL_TIMEOUT', DB_POOL_TIMEOUT),
+               'pool_recycle': config.get('DB_POOL_RECYCLE', DB_POOL_RECYCLE)}
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS still win.
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
 
 def load_config(app, overrides):
     if os.path.exists(os.path.join('./App', 'custom_config.py')):
@@ -16,4 +61,5 @@ def load_config(app, overrides):
     app.config["JWT_COOKIE_CSRF_PROTECT"] = False
     app.config['FLASK_ADMIN_SWATCH'] = 'darkly'
     for key in overrides:
-        app.config[key] = overrides[key]
\ No newline at end of file
+        app.config[key] = overrides[key]
+    apply_db_profile(app.config)
@@ -1,3 +1,12 @@
 from .user import *
-from .auth import *
 from .initialize import *
+
+# Auth pulls in Flask-JWT-Extended (PyJWT, cryptography); import it on first use.
+_AUTH = {'login', 'setup_jwt', 'add_auth_context', 'load_identity', 'identity_cache', 'IdentityCache',
+         'jwt_required', 'create_access_token', 'get_jwt_identity', 'verify_jwt_in_request', 'get_current_user'}
+
+def __getattr__(name):
+    if name in _AUTH:
+        from . import auth
+        return getattr(auth, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,13 @@
+import csv
+import json
+import re
 from datetime import datetime
+from sqlalchemy import select, insert
 from ..database import db
 from ..models.core import User, Shift
+from . import conflict_controller as conflicts
+from . import attendance_controller as attendance
+from . import availability_controller as availability
 
 def create_staff(name: str, email: str):
     staff = User(name=name, email=email, role='staff')
@@ -11,6 +18,144 @@ def assign_shift(user_email: str, start_iso: str, end_iso: str):
     user = User.query.filter_by(email=user_email, role='staff').first()
     if not user: raise ValueError("Staff not found")
     start_dt, end_dt = datetime.fromisoformat(start_iso), datetime.fromisoformat(end_iso)
+    conflicts.check_shift(user.id, start_dt, end_dt)
     sh = Shift(user_id=user.id, work_date=start_dt.date(), start_time=start_dt, end_time=end_dt, status='scheduled')
-    db.session.add(sh); db.session.commit()
+    db.session.add(sh)
+    attendance.refresh([(user.id, sh.work_date)])
+    availability.refresh([(user.id, sh.work_date)])
+    db.session.commit()
     return sh
+
+def read_shift_file(path: str):
+    """
+    Yield (row_no, record) from a CSV (email,start,end header), JSON array or NDJSON file, read a
+    row at a time whatever the format. A row that can't be parsed is yielded as (row_no, ValueError),
+    for import_shifts to report; in a .json array, where the next row can't be found, it raises.
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            rows, row_no = csv.DictReader(f), 1
+            while True:
+                row_no += 1
+                try:
+                    rec = next(rows)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    rec = ValueError(f"Unreadable CSV row: {e}")
+                yield row_no, rec
+    elif path.endswith(('.ndjson', '.jsonl')):
+        with open(path) as f:
+            for row_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError as e:
+                    rec = ValueError(f"Invalid JSON: {e}")
+                yield row_no, rec
+    elif path.endswith('.json'):
+        with open(path) as f:
+            yield from enumerate(_json_array(f), start=1)
+    else:
+        raise ValueError("Shift file must be .csv, .json, .ndjson or .jsonl")
+
+MAX_JSON_ROW = 1 << 20  # characters one row of a .json file may take before it is called malformed
+_JSON_SPACE = re.compile(r'[ \t\r\n]*')
+
+def _json_array(f, chunk_size: int = 1 << 16):
+    """
+    Yield the items of the JSON array in `f` one at a time, reading it in chunks rather than
+    whole. Malformed JSON raises ValueError: past it nothing can be resynchronised.
+    """
+    decoder, buf, pos, state = json.JSONDecoder(), '', 0, '['  # then 'first', 'sep' or 'item'
+    while True:
+        pos = _JSON_SPACE.match(buf, pos).end()
+        if pos == len(buf):
+            buf, pos = f.read(chunk_size), 0
+            if not buf: raise ValueError("Invalid JSON: the array is not closed")
+            continue
+        ch = buf[pos]
+        if state == '[':
+            if ch != '[': raise ValueError("A .json shift file must hold an array of rows")
+            pos, state = pos + 1, 'first'
+        elif ch == ']' and state in ('first', 'sep'):
+            return
+        elif state == 'sep':
+            if ch != ',': raise ValueError(f"Invalid JSON: expected ',' or ']', not {ch!r}")
+            pos, state = pos + 1, 'item'
+        else:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                after = _JSON_SPACE.match(buf, end).end()
+                whole = after < len(buf) and buf[after] in ',]'  # else it may run on into the next chunk
+            except json.JSONDecodeError as e:
+                item, end, whole, error = None, None, False, e
+            if not whole and len(buf) - pos <= MAX_JSON_ROW:
+                more = f.read(chunk_size)
+                if more:
+                    buf, pos = buf[pos:] + more, 0; continue
+            if end is None: raise ValueError(f"Invalid JSON: {error}")
+            yield item
+            pos, state = end, 'sep'
+
+def _with_staff_ids(batch, errors):
+    """The batch with each row's email swapped for its staff user_id: one lookup of just those emails."""
+    emails = {r["email"] for _, r in batch}
+    staff_ids = dict(db.session.execute(select(User.email, User.id)
+                                        .where(User.role == 'staff', User.email.in_(emails))).all())
+    found = []
+    for row_no, r in batch:
+        email = r.pop("email")
+        if email in staff_ids:
+            found.append((row_no, {"user_id": staff_ids[email], **r}))
+        else:
+            errors.append((row_no, f"Staff not found: {email}"))
+    return found
+
+def _insert_checked(batch, errors):
+    """Insert the batch's rows that clash with neither the roster, approved leave nor each other."""
+    batch = _with_staff_ids(batch, errors)
+    if not batch:
+        return 0
+    index = conflicts.build_index({r["user_id"] for _, r in batch},
+                                  min(r["start_time"] for _, r in batch), max(r["end_time"] for _, r in batch))
+    rows = []
+    for row_no, r in batch:
+        hit = index[r["user_id"]].overlapping(r["start_time"], r["end_time"])
+        if hit:
+            errors.append((row_no, f"Conflicts with {conflicts.describe(hit)}")); continue
+        index[r["user_id"]].add(r["start_time"], r["end_time"], 'row', row_no)
+        rows.append(r)
+    if rows:
+        db.session.execute(insert(Shift.__table__), rows)
+        attendance.refresh((r["user_id"], r["work_date"]) for r in rows)
+        availability.refresh((r["user_id"], r["work_date"]) for r in rows)
+    return len(rows)
+
+def import_shifts(rows, batch_size: int = 5000):
+    """
+    Bulk-create shifts from (row_no, {"email", "start", "end"}) pairs in one transaction.
+    Bad, unparsable (a ValueError record) or conflicting rows are skipped and reported as
+    (row_no, message); the rest are inserted in batches.
+    """
+    inserted, errors, batch = 0, [], []
+    for row_no, rec in rows:
+        try:
+            if isinstance(rec, ValueError): raise rec
+            if not isinstance(rec, dict): raise ValueError("Row must be an object with email, start, end")
+            missing = [k for k in ('email', 'start', 'end') if not rec.get(k)]
+            if missing: raise ValueError(f"Missing {', '.join(missing)}")
+            start_dt, end_dt = datetime.fromisoformat(rec['start']), datetime.fromisoformat(rec['end'])
+            if end_dt <= start_dt: raise ValueError("Shift must end after it starts")
+        except (TypeError, ValueError) as e:
+            errors.append((row_no, str(e))); continue
+        batch.append((row_no, {"email": rec['email'], "work_date": start_dt.date(),
+                               "start_time": start_dt, "end_time": end_dt, "status": 'scheduled'}))
+        if len(batch) >= batch_size:
+            inserted += _insert_checked(batch, errors); batch = []
+    if batch:
+        inserted += _insert_checked(batch, errors)
+    db.session.commit()
+    errors.sort()
+    return inserted, errors
@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert, delete, func, case, cast, literal, tuple_, union_all, and_, Integer, String
+from ..database import db
+from ..models.core import User, Shift, TimeLog, ExceptionFlag, DailyAttendance
+
+CHUNK = 400  # (user_id, day) keys per statement: two bound parameters each
+REBUILD_DAYS = 31  # days per transaction in rebuild()
+
+COLUMNS = ["user_id", "day", "scheduled", "completed", "missed", "worked_minutes", "break_minutes", "exceptions"]
+
+def _zero():
+    return literal(0, Integer)
+
+def rollup_statement(match=None):
+    """
+    SELECT of daily_attendance rows, computed from shifts, timelogs and exception flags.
+    `match(user_id, day)` narrows every source to the keys being refreshed; None means all of them.
+    Shifts and flags count on the shift's work date; timelogs on their shift's work date too, for
+    whoever clocked them.
+    """
+    shifts = select(Shift.user_id.label("user_id"), Shift.work_date.label("day"), literal(1, Integer),
+                    case((Shift.status == 'completed', 1), else_=0), case((Shift.status == 'missed', 1), else_=0),
+                    _zero(), _zero(), _zero())
+    logs = (select(TimeLog.user_id, Shift.work_date, _zero(), _zero(), _zero(),
+                   TimeLog.net_minutes, TimeLog.break_minutes, _zero())
+            .join(Shift, Shift.id == TimeLog.shift_id))
+    flags = (select(Shift.user_id, Shift.work_date, _zero(), _zero(), _zero(), _zero(), _zero(), literal(1, Integer))
+             .select_from(ExceptionFlag).join(Shift, Shift.id == ExceptionFlag.shift_id))
+    if match is not None:
+        shifts = shifts.where(match(Shift.user_id, Shift.work_date))
+        logs = logs.where(match(TimeLog.user_id, Shift.work_date))
+        flags = flags.where(match(Shift.user_id, Shift.work_date))
+    rows = union_all(shifts, logs, flags).subquery("sources")
+    c = list(rows.c)
+    return (select(c[0], c[1], *[func.sum(col) for col in c[2:]])
+            .group_by(c[0], c[1]))
+
+def refresh(keys):
+    """Recompute the rollup for an iterable of (user_id, day) keys, in the caller's transaction."""
+    keys = sorted(set(keys))
+    if not keys: return 0
+    db.session.flush()
+    table = DailyAttendance.__table__
+    for i in range(0, len(keys), CHUNK):
+        chunk = keys[i:i + CHUNK]
+        users = {uid for uid, _ in chunk}
+        # The user_id IN lets each source use its (user_id, ...) index before matching pairs.
+        match = lambda uid, day: and_(uid.in_(users), tuple_(uid, day).in_(chunk))
+        db.session.execute(delete(table).where(tuple_(table.c.user_id, table.c.day).in_(chunk)))
+        db.session.execute(insert(table).from_select(COLUMNS, rollup_statement(match)))
+    return len(keys)
+
+def shift_keys(shift_ids):
+    """(user_id, day) keys of the given shifts, for callers that changed them with bulk UPDATEs."""
+    ids = list(shift_ids)
+    keys = set()
+    for i in range(0, len(ids), CHUNK):
+        keys.update(db.session.execute(select(Shift.user_id, Shift.work_date).where(Shift.id.in_(ids[i:i + CHUNK]))))
+    return keys
+
+def rebuild(start: date = None, end: date = None, batch_days: int = REBUILD_DAYS):
+    """Recompute every rollup row in [start, end] (default: all shifts), committing every `batch_days`."""
+    if start is None or end is None:
+        first, last = db.session.execute(select(func.min(Shift.work_date), func.max(Shift.work_date))).one()
+        if first is None:
+            db.session.execute(delete(DailyAttendance)); db.session.commit()
+            return 0
+        start, end = start or first, end or last
+    if end < start: raise ValueError("end must not be before start")
+    table, rows, lo = DailyAttendance.__table__, 0, start
+    while lo <= end:
+        hi = min(lo + timedelta(days=batch_days - 1), end)
+        match = lambda uid, day: day.between(lo, hi)
+        db.session.execute(delete(table).where(table.c.day.between(lo, hi)))
+        rows += db.session.execute(insert(table).from_select(COLUMNS, rollup_statement(match))).rowcount
+        db.session.commit()
+        lo = hi + timedelta(days=1)
+    return rows
+
+def summary_statement(start: date, end: date):
+    """Per-user totals over [start, end] from the rollup: O(staff x days) rows, not the raw logs."""
+    a = DailyAttendance
+    return (select(a.user_id, func.coalesce(User.name, literal("User ") + cast(a.user_id, String)),
+                   func.sum(a.scheduled), func.sum(a.completed), func.sum(a.missed),
+                   func.sum(a.worked_minutes), func.sum(a.break_minutes), func.sum(a.exceptions))
+            .outerjoin(User, User.id == a.user_id)
+            .where(a.day.between(start, end))
+            .group_by(a.user_id, User.name))
+
+def weekly_report(week_start: str):
+    """report_controller.weekly_report's shape, read from the rollup (shifts by work date), plus breaks and exceptions."""
+    start = datetime.fromisoformat(f"{week_start}T00:00:00").date()
+    end = start + timedelta(days=6)
+    rows = [{
+        "user_id": uid,
+        "name": name,
+        "scheduled": int(scheduled),
+        "completed": int(completed),
+        "missed": int(missed),
+        "worked_minutes": int(worked),
+        "break_minutes": int(breaks),
+        "exceptions": int(exceptions),
+    } for uid, name, scheduled, completed, missed, worked, breaks, exceptions
+        in db.session.execute(summary_statement(start, end))]
+    rows.sort(key=lambda r: r["name"].lower())
+    return {"week_start": start.isoformat(), "week_end": end.isoformat(), "rows": rows}
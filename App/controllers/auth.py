@@ -1,8 +1,18 @@
-from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import request
+from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request, get_current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
 from App.models import User
 from App.database import db
 
+log = logging.getLogger(__name__)
+
 def login(username, password):
   result = db.session.execute(db.select(User).filter_by(username=username))
   user = result.scalar_one_or_none()
@@ -12,8 +22,93 @@ def login(username, password):
   return None
 
 
+class IdentityCache:
+  """Process-wide LRU of user column values by id; entries expire after `ttl` seconds."""
+
+  def __init__(self, ttl=60.0, maxsize=1024):
+    self.ttl, self.maxsize = ttl, maxsize
+    self.entries = OrderedDict()  # id -> (expires_at, values)
+    self.lock = threading.Lock()
+
+  def get(self, user_id):
+    with self.lock:
+      entry = self.entries.get(user_id)
+      if entry is None:
+        return None
+      if entry[0] < time.monotonic():
+        del self.entries[user_id]
+        return None
+      self.entries.move_to_end(user_id)
+      return entry[1]
+
+  def put(self, user_id, values):
+    if self.ttl <= 0 or self.maxsize <= 0:
+      return
+    with self.lock:
+      self.entries[user_id] = (time.monotonic() + self.ttl, values)
+      self.entries.move_to_end(user_id)
+      while len(self.entries) > self.maxsize:
+        self.entries.popitem(last=False)
+
+  def invalidate(self, user_id):
+    with self.lock:
+      self.entries.pop(user_id, None)
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+
+identity_cache = IdentityCache()
+
+
+def _columns(user):
+  return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+def _attach(values):
+  # Rebuild a detached instance from cached values; merge(load=False) adds it without a SELECT.
+  user = inspect(User).class_manager.new_instance()
+  for key, value in values.items():
+    set_committed_value(user, key, value)
+  make_transient_to_detached(user)
+  return db.session.merge(user, load=False)
+
+def load_identity(user_id):
+  """The User for a JWT identity: memoized for the request, then served from identity_cache."""
+  # Not flask.g: that lives on the app context, which create_app keeps pushed across requests.
+  memo = request.environ.setdefault('app.identities', {})
+  if user_id not in memo:
+    values = identity_cache.get(user_id)
+    if values is None:
+      user = db.session.get(User, user_id)
+      if user is not None:
+        identity_cache.put(user_id, _columns(user))
+    else:
+      user = _attach(values)
+    memo[user_id] = user
+  return memo[user_id]
+
+
+# Changed or deleted users are dropped from the cache once the change commits. Other worker
+# processes keep their copy until its TTL runs out.
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_identity_stale(_mapper, _connection, target):
+  Session.object_session(target).info.setdefault('stale_identities', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_identities(session):
+  for user_id in session.info.pop('stale_identities', ()):
+    identity_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_stale_identities(session, _previous_transaction):
+  session.info.pop('stale_identities', None)
+
+
 def setup_jwt(app):
   jwt = JWTManager(app)
+  identity_cache.ttl = app.config.get('JWT_IDENTITY_CACHE_TTL', identity_cache.ttl)
+  identity_cache.maxsize = app.config.get('JWT_IDENTITY_CACHE_SIZE', identity_cache.maxsize)
 
   # Always store a string user id in the JWT identity (sub),
   # whether a User object or a raw id is passed.
@@ -30,7 +125,7 @@ def setup_jwt(app):
       user_id = int(identity)
     except (TypeError, ValueError):
       return None
-    return db.session.get(User, user_id)
+    return load_identity(user_id)
 
   return jwt
 
@@ -40,13 +135,11 @@ def add_auth_context(app):
   @app.context_processor
   def inject_user():
       try:
-          verify_jwt_in_request()
-          identity = get_jwt_identity()
-          user_id = int(identity) if identity is not None else None
-          current_user = db.session.get(User, user_id) if user_id is not None else None
-          is_authenticated = current_user is not None
+          # Reuses the user the request's own JWT check loaded (see load_identity).
+          verify_jwt_in_request(optional=True)
+          current_user = get_current_user()
       except Exception as e:
-          print(e)
-          is_authenticated = False
+          # Expired or malformed tokens render the page as anonymous.
+          log.debug("no template identity: %s", e)
           current_user = None
-      return dict(is_authenticated=is_authenticated, current_user=current_user)
\ No newline at end of file
+      return dict(is_authenticated=current_user is not None, current_user=current_user)
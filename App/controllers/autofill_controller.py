@@ -0,0 +1,207 @@
+import csv
+import heapq
+import time as timer
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert
+from ..database import db
+from ..models.core import User, Shift
+from . import conflict_controller as conflicts
+from . import attendance_controller as attendance
+from . import availability_controller as availability
+
+UNDER_WEIGHT = 10  # an uncovered slot costs this many overstaffed ones
+
+def read_demand(path: str):
+    """Rows of (start, end, count) from a CSV with a start,end,count header; overlapping rows add up."""
+    with open(path, newline='') as f:
+        return [(datetime.fromisoformat(r['start']), datetime.fromisoformat(r['end']), int(r['count']))
+                for r in csv.DictReader(f)]
+
+class _Solver:
+    def __init__(self, demand, staff_ids, shift_hours, max_week_hours, min_rest_hours, slot_minutes):
+        self.slot = timedelta(minutes=slot_minutes)
+        self.origin = min(s for s, _, _ in demand)
+        self.origin -= timedelta(minutes=self.origin.minute % slot_minutes, seconds=self.origin.second,
+                                 microseconds=self.origin.microsecond)
+        n = -(-(max(e for _, e, _ in demand) - self.origin) // self.slot)
+        self.need = [0] * n
+        for s, e, count in demand:
+            for i in range(max(0, (s - self.origin) // self.slot), min(n, -(-(e - self.origin) // self.slot))):
+                self.need[i] += count
+        self.residual = list(self.need)
+        self.length = int(timedelta(hours=shift_hours) / self.slot)
+        self.week_cap = int(timedelta(hours=max_week_hours) / self.slot)
+        self.rest = timedelta(hours=min_rest_hours)
+        self.rest_slots = -(-self.rest // self.slot)
+        self.monday = (self.origin - timedelta(days=self.origin.weekday())).replace(hour=0, minute=0)
+        self.staff_ids = staff_ids
+
+        # Busy time (existing shifts, approved leave) over whole weeks, so weekly hours count the roster too.
+        last = self.at(n + self.length)
+        self.index = conflicts.build_index(staff_ids, self.monday - self.rest,
+                                           last + timedelta(days=7 - last.weekday()))
+        self.used = {}  # (user_id, week) -> slots worked
+        for uid in staff_ids:
+            for s, e, kind, _ in self.index[uid].items:
+                if kind == 'shift':
+                    key = (uid, self.week(s))
+                    self.used[key] = self.used.get(key, 0) + int((e - s) / self.slot)
+                    # Already rostered: counts toward the headcount it overlaps.
+                    for j in range(max(0, (s - self.origin) // self.slot), min(n, -(-(e - self.origin) // self.slot))):
+                        self.residual[j] -= 1
+        self.shifts = []  # [user_id, start slot] per assignment; None once dropped
+
+    def at(self, i):
+        return self.origin + i * self.slot
+
+    def week(self, when):
+        return (when - self.monday).days // 7
+
+    def _blocker(self, uid, i, ignore=None):
+        """What stops `uid` working slots [i, i + length): a busy interval (leave only if it
+        truly overlaps; shifts also within the rest gap), or None."""
+        start, end = self.at(i), self.at(i + self.length)
+        for it in self.index[uid].overlaps(start - self.rest, end + self.rest, ignore):
+            if it[2] != 'leave' or (it[0] < end and it[1] > start):
+                return it
+        return None
+
+    def _place(self, uid, i, k):
+        for j in range(i, min(i + self.length, len(self.residual))):
+            self.residual[j] -= 1
+        key = (uid, self.week(self.at(i)))
+        self.used[key] = self.used.get(key, 0) + self.length
+        self.index[uid].add(self.at(i), self.at(i + self.length), 'auto', k)
+
+    def _unplace(self, uid, i, k):
+        for j in range(i, min(i + self.length, len(self.residual))):
+            self.residual[j] += 1
+        self.used[(uid, self.week(self.at(i)))] -= self.length
+        self.index[uid].remove(self.at(i), self.at(i + self.length), 'auto', k)
+
+    def greedy(self):
+        """Sweep slots in time order; every uncovered slot opens a shift there for the least-loaded free staff."""
+        ready = [(self.used.get((uid, self.week(self.origin)), 0), uid) for uid in self.staff_ids]
+        heapq.heapify(ready)
+        waiting = []  # (first slot free again, user_id)
+        for i in range(len(self.residual)):
+            while waiting and waiting[0][0] <= i:
+                uid = heapq.heappop(waiting)[1]
+                heapq.heappush(ready, (self.used.get((uid, self.week(self.at(i))), 0), uid))
+            while self.residual[i] > 0 and ready:
+                load, uid = heapq.heappop(ready)
+                week = self.week(self.at(i))
+                actual = self.used.get((uid, week), 0)
+                if load != actual:  # stale key from an earlier week
+                    heapq.heappush(ready, (actual, uid)); continue
+                if actual + self.length > self.week_cap:
+                    next_week = self.monday + timedelta(weeks=week + 1)
+                    heapq.heappush(waiting, (-(-(next_week - self.origin) // self.slot), uid)); continue
+                hit = self._blocker(uid, i)
+                if hit:
+                    free = hit[1] + (timedelta(0) if hit[2] == 'leave' else self.rest)
+                    heapq.heappush(waiting, (max(i + 1, -(-(free - self.origin) // self.slot)), uid)); continue
+                self._place(uid, i, len(self.shifts))
+                self.shifts.append([uid, i])
+                heapq.heappush(waiting, (i + self.length + self.rest_slots, uid))
+
+    def _cost(self, j, change):
+        """Cost difference if slot j's coverage changes by `change` (+1/-1)."""
+        if j >= len(self.residual):
+            return 0
+        before, after = self.residual[j], self.residual[j] - change
+        cost = lambda r: UNDER_WEIGHT * r if r > 0 else -r
+        return cost(after) - cost(before)
+
+    def _fill(self, deadline):
+        """Open a shift over each still-uncovered slot with staff that has hours left that week."""
+        improved, spare = False, {}
+        for i in range(len(self.residual)):
+            if self.residual[i] <= 0:
+                continue
+            if timer.perf_counter() >= deadline:
+                break
+            week = self.week(self.at(i))
+            if week not in spare:
+                spare[week] = [u for u in self.staff_ids
+                               if self.used.get((u, week), 0) + self.length <= self.week_cap]
+            if not spare[week]:
+                continue
+            starts = [t for t in range(max(0, i - self.length + 1), i + 1) if self.week(self.at(t)) == week]
+            costs = sorted((sum(self._cost(j, 1) for j in range(t, t + self.length)), t) for t in starts)
+            costs = [(c, t) for c, t in costs[:4] if c < 0]  # the few best placements are plenty
+            if not costs:
+                continue
+            for uid in sorted(spare[week], key=lambda u: self.used.get((u, week), 0)):
+                if self.used.get((uid, week), 0) + self.length > self.week_cap:
+                    continue
+                t = next((t for _, t in costs if not self._blocker(uid, t)), None)
+                if t is not None:
+                    self._place(uid, t, len(self.shifts))
+                    self.shifts.append([uid, t])
+                    improved = True
+                    break
+        return improved
+
+    def improve(self, deadline, max_move=8):
+        """Local search: slide shifts up to `max_move` slots, drop ones that only overstaff,
+        and spend the hours that frees on slots still uncovered."""
+        improved = True
+        while improved and timer.perf_counter() < deadline:
+            improved = self._fill(deadline)
+            for k, sh in enumerate(self.shifts):
+                if sh is None:
+                    continue
+                if k % 64 == 0 and timer.perf_counter() >= deadline:
+                    return
+                uid, i = sh
+                drop = sum(self._cost(j, -1) for j in range(i, i + self.length))
+                if drop < 0:
+                    self._unplace(uid, i, k); self.shifts[k] = None; improved = True
+                    continue
+                best, best_delta = None, 0
+                for d in range(-max_move, max_move + 1):
+                    t = i + d
+                    if d == 0 or t < 0 or self.week(self.at(t)) != self.week(self.at(i)):
+                        continue
+                    lo, hi = (t, i) if d < 0 else (i + self.length, t + self.length)
+                    gone = range(i, t) if d > 0 else range(t + self.length, i + self.length)
+                    delta = sum(self._cost(j, 1) for j in range(lo, hi)) + sum(self._cost(j, -1) for j in gone)
+                    if delta < best_delta and not self._blocker(uid, t, ignore=('auto', k)):
+                        best, best_delta = t, delta
+                if best is not None:
+                    self._unplace(uid, i, k); self._place(uid, best, k); sh[1] = best
+                    improved = True
+
+def autofill(demand, shift_hours: float = 8, max_week_hours: float = 40, min_rest_hours: float = 11,
+             slot_minutes: int = 15, time_budget: float = 2.0):
+    """
+    Propose shifts for staff-role users covering `demand` [(start, end, headcount)], respecting
+    approved leave, existing shifts (which count toward the headcount), a weekly hours cap and
+    minimum rest between shifts.
+    Greedy construction, then local search until `time_budget` seconds have passed.
+    """
+    deadline = timer.perf_counter() + time_budget
+    staff_ids = db.session.scalars(select(User.id).where(User.role == 'staff').order_by(User.id)).all()
+    if not demand or not staff_ids:
+        return {"shifts": [], "uncovered_slots": sum(c for _, _, c in demand), "overstaffed_slots": 0}
+    solver = _Solver(demand, staff_ids, shift_hours, max_week_hours, min_rest_hours, slot_minutes)
+    solver.greedy()
+    solver.improve(deadline)
+    shifts = sorted((solver.at(i), uid) for uid, i in filter(None, solver.shifts))
+    return {
+        "shifts": [(uid, start, start + solver.length * solver.slot) for start, uid in shifts],
+        "uncovered_slots": sum(r for r in solver.residual if r > 0),
+        "overstaffed_slots": -sum(r for r in solver.residual if r < 0),
+    }
+
+def apply_plan(shifts, batch_size: int = 5000):
+    """Insert the (user_id, start, end) shifts of a plan in one transaction."""
+    rows = [{"user_id": uid, "work_date": s.date(), "start_time": s, "end_time": e, "status": 'scheduled'}
+            for uid, s, e in shifts]
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(insert(Shift.__table__), rows[i:i + batch_size])
+    attendance.refresh((r["user_id"], r["work_date"]) for r in rows)
+    availability.refresh((r["user_id"], r["work_date"]) for r in rows)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,146 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, insert, delete, func
+from ..database import db
+from ..models.core import User, Shift, LeaveRequest, Availability
+from .conflict_controller import MAX_SHIFT
+
+SLOT = timedelta(minutes=15)
+WEEK = timedelta(days=7)
+WEEK_SLOTS = WEEK // SLOT  # 672 bits
+BITMAP_BYTES = WEEK_SLOTS // 8
+CHUNK = 400  # users per refresh statement
+REBUILD_WEEKS = 4  # weeks per transaction in rebuild()
+MAX_WEEK_HOURS = 40.0
+MIN_REST_HOURS = 11.0
+LIMIT = 20
+
+def monday(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+def _weeks(start: datetime, end: datetime):
+    """Mondays of the weeks that [start, end) touches."""
+    week, last = monday(start.date()), (end - timedelta(microseconds=1)).date()
+    while week <= last:
+        yield week
+        week += WEEK
+
+def _bits(start: datetime, end: datetime, week: date) -> int:
+    """The slots of `week` that [start, end) touches, rounded out to whole slots."""
+    origin = _midnight(week)
+    a, b = max(0, (start - origin) // SLOT), min(WEEK_SLOTS, -(-(end - origin) // SLOT))
+    return ((1 << (b - a)) - 1) << a if a < b else 0
+
+def _compute(user_ids, weeks):
+    """{(week, user_id): [shift bits, leave bits, minutes]} from the source tables; user_ids None means everyone."""
+    weeks = set(weeks)
+    lo, hi = _midnight(min(weeks)), _midnight(max(weeks)) + WEEK
+    shift_q = select(Shift.user_id, Shift.start_time, Shift.end_time).where(
+        Shift.start_time < hi, Shift.start_time > lo - MAX_SHIFT, Shift.end_time > lo,
+        Shift.end_time > Shift.start_time)
+    leave_q = select(LeaveRequest.requester_id, LeaveRequest.start_date, LeaveRequest.end_date).where(
+        LeaveRequest.status == 'approved', LeaveRequest.start_date < hi.date(), LeaveRequest.end_date >= lo.date())
+    if user_ids is not None:
+        shift_q = shift_q.where(Shift.user_id.in_(user_ids))
+        leave_q = leave_q.where(LeaveRequest.requester_id.in_(user_ids))
+    rows = {}
+    for uid, s, e in db.session.execute(shift_q):
+        for week in _weeks(s, e):
+            if week in weeks:
+                rows.setdefault((week, uid), [0, 0, 0])[0] |= _bits(s, e, week)
+        if monday(s.date()) in weeks:  # hours count toward the week the shift starts in
+            rows.setdefault((monday(s.date()), uid), [0, 0, 0])[2] += (e - s) // timedelta(minutes=1)
+    for uid, first, last in db.session.execute(leave_q):
+        s, e = _midnight(first), _midnight(last) + timedelta(days=1)
+        for week in _weeks(s, e):
+            if week in weeks:
+                rows.setdefault((week, uid), [0, 0, 0])[1] |= _bits(s, e, week)
+    return rows
+
+def _insert(rows):
+    if rows:
+        db.session.execute(insert(Availability), [
+            {"week": week, "user_id": uid, "shifts": shifts.to_bytes(BITMAP_BYTES, 'little'),
+             "leave": leave.to_bytes(BITMAP_BYTES, 'little'), "minutes": minutes}
+            for (week, uid), (shifts, leave, minutes) in rows.items()])
+
+def refresh(keys):
+    """
+    Recompute the availability weeks of an iterable of (user_id, day) keys, in the caller's
+    transaction. A day also touches the next day's week, for shifts running past Sunday midnight.
+    """
+    weeks = {}
+    for uid, day in keys:
+        weeks.setdefault(uid, set()).update({monday(day), monday(day + timedelta(days=1))})
+    if not weeks: return 0
+    db.session.flush()
+    users = sorted(weeks)
+    for i in range(0, len(users), CHUNK):
+        chunk = users[i:i + CHUNK]
+        span = set().union(*(weeks[uid] for uid in chunk))
+        # Every (user, week) of the chunk is recomputed from source, so the superset is still exact.
+        db.session.execute(delete(Availability).where(Availability.user_id.in_(chunk), Availability.week.in_(span)))
+        _insert(_compute(chunk, span))
+    return sum(len(w) for w in weeks.values())
+
+def leave_keys(lr: LeaveRequest):
+    return [(lr.requester_id, lr.start_date + timedelta(days=d)) for d in range((lr.end_date - lr.start_date).days + 1)]
+
+def rebuild(start: date = None, end: date = None, batch_weeks: int = REBUILD_WEEKS):
+    """Recompute every availability week touching [start, end] (default: all shifts), committing every `batch_weeks`."""
+    if start is None or end is None:
+        first, last = db.session.execute(select(func.min(Shift.work_date), func.max(Shift.work_date))).one()
+        if first is None:
+            db.session.execute(delete(Availability)); db.session.commit()
+            return 0
+        start, end = start or first, end or last + timedelta(days=1)
+    if end < start: raise ValueError("end must not be before start")
+    rows, week = 0, monday(start)
+    while week <= end:
+        weeks = [week + k * WEEK for k in range(batch_weeks) if week + k * WEEK <= end]
+        db.session.execute(delete(Availability).where(Availability.week.in_(weeks)))
+        computed = _compute(None, weeks)
+        _insert(computed)
+        db.session.commit()
+        rows, week = rows + len(computed), weeks[-1] + WEEK
+    return rows
+
+def candidates(shift_id: int, max_hours: float = MAX_WEEK_HOURS, min_rest: float = MIN_REST_HOURS,
+               limit: int = LIMIT):
+    """
+    Staff-role users who could take the shift: no shift within `min_rest` hours of it, no approved
+    leave over it, and no more than `max_hours` rostered in its week with it. Fewest hours that week
+    first. Reads one availability row per user and week; slots round outwards, so a borderline
+    candidate may be left out, but never a conflicting one.
+    """
+    shift = db.session.get(Shift, shift_id)
+    if not shift: raise ValueError("Shift not found")
+    start, end, rest = shift.start_time, shift.end_time, timedelta(hours=min_rest)
+    home = monday(start.date())
+    room = int(max_hours * 60) - (end - start) // timedelta(minutes=1)
+    near = {week: _bits(start - rest, end + rest, week) for week in _weeks(start - rest, end + rest)}
+    over = {week: _bits(start, end, week) for week in _weeks(start, end)}
+
+    # Plain Core rows: the ORM's per-row handling would cost more than the bit tests.
+    conn = db.session.connection()
+    staff = set(conn.execute(select(User.id).where(User.role == 'staff')).scalars())
+    staff.discard(shift.user_id)
+    blocked, minutes = set(), {}
+    a = Availability
+    for week, uid, shifts, leave, used in conn.execute(
+            select(a.week, a.user_id, a.shifts, a.leave, a.minutes).where(a.week.in_(near))):
+        if int.from_bytes(shifts, 'little') & near[week] or int.from_bytes(leave, 'little') & over.get(week, 0):
+            blocked.add(uid)
+        if week == home:
+            minutes[uid] = used
+    # The shift's own owner has a row for its week unless the table was never built for it;
+    # without rows everyone would look free.
+    if shift.user_id not in minutes:
+        raise ValueError("Availability has not been built for this week; run: flask swap rebuild-availability")
+    eligible = sorted((minutes.get(uid, 0), uid) for uid in staff - blocked if minutes.get(uid, 0) <= room)[:limit]
+    people = {uid: (email, name) for uid, email, name in conn.execute(
+        select(User.id, User.email, User.name).where(User.id.in_([uid for _, uid in eligible])))}
+    return [{"user_id": uid, "email": people[uid][0], "name": people[uid][1], "week_minutes": used}
+            for used, uid in eligible]
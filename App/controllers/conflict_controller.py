@@ -0,0 +1,200 @@
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import select
+from ..database import db
+from ..models.core import User, Shift, LeaveRequest
+
+# Longest shift the range predicates allow for: a shift starting earlier than
+# `start - MAX_SHIFT` is assumed to have ended before `start`.
+MAX_SHIFT = timedelta(hours=24)
+
+class ConflictError(ValueError):
+    pass
+
+_priority = random.Random().random
+
+class _Node:
+    __slots__ = ("key", "item", "prio", "left", "right", "max_end")
+
+    def __init__(self, key, item):
+        self.key, self.item, self.prio = key, item, _priority()
+        self.left = self.right = None
+        self.max_end = item[1]
+
+def _pull(n):
+    """Recompute n.max_end from its own end and its children's."""
+    m = n.item[1]
+    if n.left is not None and n.left.max_end > m: m = n.left.max_end
+    if n.right is not None and n.right.max_end > m: m = n.right.max_end
+    n.max_end = m
+    return n
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+        if node.left.prio > node.prio:  # rotate right
+            top, node.left = node.left, node.left.right
+            top.right = _pull(node)
+            return _pull(top)
+    else:
+        node.right = _insert(node.right, new)
+        if node.right.prio > node.prio:  # rotate left
+            top, node.right = node.right, node.right.left
+            top.left = _pull(node)
+            return _pull(top)
+    return _pull(node)
+
+def _merge(a, b):
+    """Join two treaps where every key of `a` sorts before every key of `b`."""
+    if a is None or b is None:
+        return a if b is None else b
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        return _pull(a)
+    b.left = _merge(a, b.left)
+    return _pull(b)
+
+def _delete(node, key):
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    elif node.key < key:
+        node.right = _delete(node.right, key)
+    else:
+        return _merge(node.left, node.right)
+    return _pull(node)
+
+class IntervalIndex:
+    """
+    One user's busy intervals in a treap ordered by start, each node holding the latest end in its
+    subtree: add and remove are O(log n), a lookup O(log n) plus a step per interval it skips or returns.
+    """
+
+    def __init__(self, intervals=()):
+        self.root, self.seq, self.keys = None, 0, {}  # keys: interval -> [tree key, ...]
+        # Sorted input builds the tree in one pass: a stack holds its right spine.
+        spine = []
+        for it in sorted(intervals):
+            node, last = self._node(it), None
+            while spine and spine[-1].prio < node.prio:
+                last = _pull(spine.pop())
+            node.left = last
+            if spine: spine[-1].right = node
+            spine.append(node)
+        for node in reversed(spine):
+            _pull(node)
+        self.root = spine[0] if spine else None
+
+    def _node(self, it):
+        self.seq += 1
+        key = (it[0], self.seq)  # equal starts keep insertion order
+        self.keys.setdefault(it, []).append(key)
+        return _Node(key, it)
+
+    @property
+    def items(self):
+        """The intervals (start, end, kind, ref_id) in start order."""
+        out, stack, node = [], [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node); node = node.left
+            node = stack.pop()
+            out.append(node.item)
+            node = node.right
+        return out
+
+    def add(self, start, end, kind, ref_id=None):
+        self.root = _insert(self.root, self._node((start, end, kind, ref_id)))
+
+    def remove(self, start, end, kind, ref_id=None):
+        it = (start, end, kind, ref_id)
+        keys = self.keys[it]
+        key = keys.pop()
+        if not keys: del self.keys[it]
+        self.root = _delete(self.root, key)
+
+    def overlaps(self, start, end, ignore=None):
+        """Intervals overlapping [start, end), latest start first, skipping the (kind, ref_id) in `ignore`."""
+        stack, node = [], self.root
+        while True:
+            while node is not None:
+                if node.max_end <= start:  # nothing below ends after `start`
+                    node = None
+                elif node.item[0] >= end:  # it and all to its right start too late
+                    node = node.left
+                else:
+                    stack.append(node); node = node.right
+            if not stack:
+                return
+            node = stack.pop()
+            it = node.item
+            if it[1] > start and (it[2], it[3]) != ignore:
+                yield it
+            node = node.left
+
+    def overlapping(self, start, end, ignore=None):
+        return next(self.overlaps(start, end, ignore), None)
+
+def _leave_bounds(lr_start, lr_end):
+    return datetime.combine(lr_start, time.min), datetime.combine(lr_end + timedelta(days=1), time.min)
+
+def build_index(user_ids, start: datetime, end: datetime):
+    """IntervalIndex per user of their shifts and approved leave touching [start, end)."""
+    index = defaultdict(IntervalIndex)
+    rows = defaultdict(list)
+    shift_q = select(Shift.user_id, Shift.start_time, Shift.end_time, Shift.id).where(
+        Shift.start_time < end, Shift.start_time > start - MAX_SHIFT, Shift.end_time > start)
+    leave_q = select(LeaveRequest.requester_id, LeaveRequest.start_date, LeaveRequest.end_date, LeaveRequest.id).where(
+        LeaveRequest.status == 'approved',
+        LeaveRequest.start_date <= end.date(), LeaveRequest.end_date >= start.date())
+    if user_ids is not None:
+        shift_q = shift_q.where(Shift.user_id.in_(user_ids))
+        leave_q = leave_q.where(LeaveRequest.requester_id.in_(user_ids))
+    for uid, s, e, sid in db.session.execute(shift_q):
+        rows[uid].append((s, e, 'shift', sid))
+    for uid, s, e, lid in db.session.execute(leave_q):
+        rows[uid].append((*_leave_bounds(s, e), 'leave', lid))
+    for uid, intervals in rows.items():
+        index[uid] = IntervalIndex(intervals)
+    return index
+
+def describe(it):
+    start, end, kind, ref_id = it
+    if kind == 'leave':
+        return f"approved leave #{ref_id} ({start.date()} → {(end - timedelta(days=1)).date()})"
+    if kind == 'row':  # not yet inserted, e.g. an earlier row of the same import
+        return f"row {ref_id} ({start} → {end})"
+    return f"shift #{ref_id} ({start} → {end})"
+
+def check_shift(user_id: int, start: datetime, end: datetime, ignore_shift_id: int = None):
+    """Raise ConflictError if the user is already rostered or on approved leave in [start, end)."""
+    ignore = ('shift', ignore_shift_id) if ignore_shift_id else None
+    hit = build_index([user_id], start, end)[user_id].overlapping(start, end, ignore)
+    if hit:
+        raise ConflictError(f"Conflicts with {describe(hit)}")
+
+def audit(start: datetime, end: datetime):
+    """
+    Yield (user_id, shift interval, conflicting interval) for every clash involving a shift that
+    starts in the window, including one with a shift starting after it. Each pair of shifts is
+    reported once, as (later, earlier).
+    """
+    index = build_index(None, start, end + MAX_SHIFT)  # shifts starting in the window end by then
+    for uid in sorted(index):
+        idx, seen = index[uid], set()
+        for it in idx.items:
+            if it[2] != 'shift' or not (start <= it[0] < end):
+                continue
+            for hit in idx.overlaps(it[0], it[1], ignore=(it[2], it[3])):
+                if hit[2] == 'leave':
+                    yield uid, it, hit
+                    continue
+                pair = (min(it[3], hit[3]), max(it[3], hit[3]))
+                if pair not in seen:
+                    seen.add(pair)
+                    yield (uid, it, hit) if hit < it else (uid, hit, it)
+
+def emails(user_ids):
+    return dict(db.session.execute(select(User.id, User.email).where(User.id.in_(list(user_ids)))).all())
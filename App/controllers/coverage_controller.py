@@ -0,0 +1,98 @@
+from datetime import date, datetime, time, timedelta
+import numpy as np
+from sqlalchemy import select, func, literal, union_all, and_
+from ..database import db
+from ..models.core import User, Shift, LeaveRequest, elapsed_ms
+from .conflict_controller import MAX_SHIFT
+
+SLOT_MINUTES = 15
+MAX_DAYS = 366
+TOTAL = "all"  # every role together; usable as a role in minimums
+
+def parse_minimums(specs):
+    """{role: headcount} from "role:N" strings, as given to --min or ?min=."""
+    minimums = {}
+    for spec in specs:
+        role, _, count = spec.partition(':')
+        if not role or not count.isdigit(): raise ValueError(f"minimum must look like role:N, not {spec!r}")
+        minimums[role] = int(count)
+    return minimums
+
+def coverage_statement(lo: datetime, hi: datetime, slot_minutes: int = SLOT_MINUTES, roles=None):
+    """
+    Shifts overlapping [lo, hi), collapsed to (role, first slot, end slot, net count) with slots
+    numbered from `lo`; a shift covers every slot it overlaps. Missed shifts don't count, and
+    shifts on a day of the holder's approved leave count -1 again. That second branch starts from
+    the (few) approved leave rows, where a NOT EXISTS per shift would probe leave for every shift.
+    """
+    slot_ms = slot_minutes * 60000
+    first = elapsed_ms(literal(lo), Shift.start_time) // slot_ms
+    last = (elapsed_ms(literal(lo), Shift.end_time) + (slot_ms - 1)) // slot_ms
+    in_window = and_(Shift.start_time < hi, Shift.start_time > lo - MAX_SHIFT, Shift.end_time > lo,
+                     Shift.status != 'missed')
+    rostered = (select(User.role, first, last, literal(1))
+                .join(User, User.id == Shift.user_id).where(in_window))
+    # DISTINCT: a day inside two approved leave requests still takes a shift off only once.
+    leave = (select(Shift.id, User.role, first.label("first"), last.label("last")).distinct()
+             .select_from(LeaveRequest)
+             .join(Shift, and_(Shift.user_id == LeaveRequest.requester_id,
+                               Shift.work_date.between(LeaveRequest.start_date, LeaveRequest.end_date)))
+             .join(User, User.id == Shift.user_id)
+             .where(in_window, LeaveRequest.status == 'approved',
+                    LeaveRequest.start_date < hi.date(), LeaveRequest.end_date >= (lo - MAX_SHIFT).date()))
+    if roles:
+        rostered, leave = rostered.where(User.role.in_(roles)), leave.where(User.role.in_(roles))
+    leave = leave.subquery("leave_shifts")
+    on_leave = select(leave.c.role, leave.c.first, leave.c.last, literal(-1))
+    s = union_all(rostered, on_leave).subquery("coverage_shifts")
+    role, first, last, sign = s.c
+    return select(role, first, last, func.sum(sign)).group_by(role, first, last)
+
+def headcounts(start: date, end: date, slot_minutes: int = SLOT_MINUTES, roles=None, extra_roles=()):
+    """
+    (first slot start, role names, int matrix of staff on shift per role and slot) over the days
+    [start, end]. One query; the per-slot counts come from a difference array, so the cost grows
+    with distinct shift patterns and slots, not with shifts x slots.
+    """
+    if end < start: raise ValueError("to must not be before from")
+    if (end - start).days >= MAX_DAYS: raise ValueError(f"at most {MAX_DAYS} days at a time")
+    if slot_minutes <= 0 or 1440 % slot_minutes: raise ValueError("slot minutes must divide a day")
+    lo, hi = datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+    n = (hi - lo) // timedelta(minutes=slot_minutes)
+    rows = db.session.execute(coverage_statement(lo, hi, slot_minutes, roles)).all()
+    names = sorted({role for role, _, _, _ in rows} | set(roles or ()) | (set(extra_roles) - {TOTAL}))
+    code = {name: i for i, name in enumerate(names)}
+
+    role = np.fromiter((code[r[0]] for r in rows), np.int64, len(rows))
+    first = np.clip(np.fromiter((r[1] for r in rows), np.int64, len(rows)), 0, n)
+    last = np.clip(np.fromiter((r[2] for r in rows), np.int64, len(rows)), 0, n)
+    count = np.fromiter((r[3] for r in rows), np.int64, len(rows))
+    # +count where each pattern starts, -count where it ends; a running sum gives the headcount.
+    width, size = n + 1, len(names) * (n + 1)
+    diff = (np.bincount(role * width + first, weights=count, minlength=size)
+            - np.bincount(role * width + last, weights=count, minlength=size))
+    counts = np.cumsum(diff.reshape(len(names), width)[:, :n], axis=1).astype(np.int64)
+    return lo, names, counts
+
+def understaffed(counts, minimum):
+    """(first slot, end slot, lowest headcount) for each run of slots below `minimum`."""
+    short = np.concatenate(([False], counts < minimum, [False]))
+    edges = np.flatnonzero(short[1:] != short[:-1]).reshape(-1, 2)
+    return [(int(a), int(b), int(counts[a:b].min())) for a, b in edges]
+
+def coverage(start: date, end: date, slot_minutes: int = SLOT_MINUTES, roles=None, minimums=None):
+    """Headcount per role (and TOTAL) per slot, with the runs of slots below each role's minimum."""
+    minimums = minimums or {}
+    # Roles with a minimum but no shifts still show up (all zero), unless a role filter excludes them.
+    lo, names, counts = headcounts(start, end, slot_minutes, roles, () if roles else minimums)
+    series = dict(zip(names, counts))
+    series[TOTAL] = counts.sum(axis=0)
+    slot = timedelta(minutes=slot_minutes)
+    gaps = [{"role": role, "start": (lo + a * slot).isoformat(), "end": (lo + b * slot).isoformat(),
+             "staffed": low, "minimum": minimum}
+            for role, minimum in sorted(minimums.items()) if role in series
+            for a, b, low in understaffed(series[role], minimum)]
+    return {"from": start.isoformat(), "to": end.isoformat(), "slot_minutes": slot_minutes,
+            "slots": int(counts.shape[1]), "minimums": minimums,
+            "headcount": {role: values.tolist() for role, values in series.items()},
+            "understaffed": gaps}
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, exists, func, case, cast, literal, and_, or_, String
+from ..database import db
+from ..models.core import Shift, TimeLog, ExceptionFlag, SweepMark, elapsed_ms
+from .conflict_controller import MAX_SHIFT
+from . import attendance_controller as attendance
+
+SWEEP = "exceptions"
+# Default grace periods, in minutes.
+LATE_GRACE = 5
+EARLY_GRACE = 5
+OVERTIME_GRACE = 15
+
+def _minutes(ms):
+    return cast(ms // 60000, String)
+
+def _flag_rows(kind, shifts, logs, now, late_ms, early_ms, overtime_ms):
+    """SELECT of (shift_id, user_id, kind, reason, detected_at) for one exception kind."""
+    s, l = shifts, logs
+    if kind == 'late':
+        late = elapsed_ms(s.c.start_time, l.c.first_in)
+        cond, reason = late > late_ms, literal('clocked in ') + _minutes(late) + ' min late'
+    elif kind == 'early':
+        early = elapsed_ms(l.c.last_out, s.c.end_time)
+        cond, reason = and_(l.c.open == 0, early > early_ms), literal('clocked out ') + _minutes(early) + ' min early'
+    elif kind == 'overtime':
+        over = elapsed_ms(s.c.end_time, l.c.last_out)
+        cond = or_(l.c.open > 0, over > overtime_ms)
+        reason = case((l.c.open > 0, literal('still clocked in after shift end')),
+                      else_=literal('clocked out ') + _minutes(over) + ' min after shift end')
+    else:  # no_show
+        cond, reason = and_(l.c.shift_id.is_(None), s.c.status != 'completed'), literal('no clock-in')
+    already = exists().where(ExceptionFlag.shift_id == s.c.id, ExceptionFlag.kind == kind)
+    return (select(s.c.id, s.c.user_id, literal(kind), reason, literal(now))
+            .select_from(s.outerjoin(l, l.c.shift_id == s.c.id))
+            .where(cond, ~already))
+
+def _sweep_window(lo, hi, now, late_ms, early_ms, overtime_ms):
+    """Flag every shift ending in (lo, hi]; returns {kind: rows inserted, "missed": shifts marked}."""
+    # start_time bounds let the window ride ix_shifts_start_end instead of scanning by end_time.
+    in_window = and_(Shift.end_time > lo, Shift.end_time <= hi,
+                     Shift.start_time > lo - MAX_SHIFT, Shift.start_time <= hi)
+    shifts = select(Shift.id, Shift.user_id, Shift.start_time, Shift.end_time, Shift.status) \
+        .where(in_window).subquery("sweep_shifts")
+    logs = (select(TimeLog.shift_id,
+                   func.min(TimeLog.clock_in).label("first_in"),
+                   func.max(TimeLog.clock_out).label("last_out"),
+                   (func.count(TimeLog.id) - func.count(TimeLog.clock_out)).label("open"))
+            .where(TimeLog.shift_id.in_(select(shifts.c.id)))
+            .group_by(TimeLog.shift_id).subquery("sweep_logs"))
+    counts = {}
+    cols = ["shift_id", "user_id", "kind", "reason", "detected_at"]
+    for kind in ('late', 'early', 'overtime', 'no_show'):
+        rows = _flag_rows(kind, shifts, logs, now, late_ms, early_ms, overtime_ms)
+        counts[kind] = db.session.execute(insert(ExceptionFlag).from_select(cols, rows)).rowcount
+    worked = exists().where(TimeLog.shift_id == Shift.id)
+    counts["missed"] = db.session.execute(
+        update(Shift).where(in_window, Shift.status == 'scheduled', ~worked).values(status='missed')
+        .execution_options(synchronize_session=False)).rowcount
+    # Shifts marked missed were flagged no_show in the same pass.
+    flagged = exists().where(ExceptionFlag.shift_id == Shift.id, ExceptionFlag.detected_at == now)
+    attendance.refresh(db.session.execute(select(Shift.user_id, Shift.work_date).where(in_window, flagged)))
+    return counts
+
+def sweep_exceptions(now: datetime = None, late_grace: int = LATE_GRACE, early_grace: int = EARLY_GRACE,
+                     overtime_grace: int = OVERTIME_GRACE, batch: timedelta = timedelta(days=7)):
+    """
+    Flag late arrivals, early leaves, overtime and no-shows (marking those shifts missed) for shifts
+    that ended since the last sweep, once every grace period has run out. Works through the backlog
+    in `batch`-sized windows of end time, committing the high-water mark after each, so an
+    interrupted or repeated sweep picks up where it stopped and never flags a shift twice.
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(minutes=max(late_grace, early_grace, overtime_grace))
+    mark = db.session.get(SweepMark, SWEEP)
+    if mark is None:
+        first = db.session.scalar(select(func.min(Shift.end_time)))
+        if first is None:
+            return {"late": 0, "early": 0, "overtime": 0, "no_show": 0, "missed": 0, "through": None}
+        mark = SweepMark(name=SWEEP, high_water=first - timedelta(microseconds=1))
+        db.session.add(mark)
+    totals = {"late": 0, "early": 0, "overtime": 0, "no_show": 0, "missed": 0}
+    while mark.high_water < cutoff:
+        hi = min(mark.high_water + batch, cutoff)
+        for k, v in _sweep_window(mark.high_water, hi, now, late_grace * 60000,
+                                  early_grace * 60000, overtime_grace * 60000).items():
+            totals[k] += v
+        mark.high_water = hi
+        db.session.commit()
+    db.session.commit()
+    totals["through"] = mark.high_water
+    return totals
@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from ..database import db
+from ..models.core import User, Shift, TimeLog, KioskPunch
+from .conflict_controller import MAX_SHIFT
+from . import attendance_controller as attendance
+
+EARLY_CLOCK_IN = timedelta(hours=2)  # how long before its start a shift accepts a clock-in
+MAX_BATCH = 1000
+MAX_WAIT = 0.005  # seconds the flusher waits for more punches before committing
+TIMEOUT = 10.0  # seconds a request waits for its punches to commit
+
+def parse_punch(raw):
+    """Validate one punch dict {key, email, type: in|out, at?, shift_id?}; raises ValueError."""
+    if not isinstance(raw, dict): raise ValueError("Punch must be an object")
+    key, email, kind = raw.get('key'), raw.get('email'), raw.get('type')
+    if not isinstance(key, str) or not 0 < len(key) <= 64: raise ValueError("key must be a string of 1-64 chars")
+    if not isinstance(email, str): raise ValueError("email is required")
+    if kind not in ('in', 'out'): raise ValueError("type must be 'in' or 'out'")
+    at = raw.get('at')
+    if at is not None and not isinstance(at, str): raise ValueError("at must be an ISO 8601 datetime string")
+    at = datetime.fromisoformat(at) if at else datetime.now()
+    if at.tzinfo is not None:
+        at = at.astimezone().replace(tzinfo=None)  # shift times are naive local time
+    shift_id = raw.get('shift_id')
+    if shift_id is not None and not isinstance(shift_id, int): raise ValueError("shift_id must be an integer")
+    return {"key": key, "email": email, "kind": kind, "at": at, "shift_id": shift_id}
+
+def _pick_shift(candidates, at, shift_id):
+    """The shift a clock-in at `at` belongs to: the one asked for, else the nearest open window."""
+    if shift_id is not None:
+        return next((c for c in candidates if c[0] == shift_id), None)
+    fits = [c for c in candidates if c[1] - EARLY_CLOCK_IN <= at < c[2]]
+    return min(fits, key=lambda c: abs(c[1] - at), default=None)
+
+def record_punches(punches):
+    """
+    Apply parsed punches in one transaction: a handful of set-based statements however many
+    punches there are. Returns one {"key", "status", "timelog_id", "error"} per punch, where
+    status is 'ok', 'duplicate' (key seen before; the stored outcome is repeated) or 'refused'.
+    """
+    results = {}
+    known = db.session.execute(select(KioskPunch.key, KioskPunch.timelog_id, KioskPunch.error)
+                               .where(KioskPunch.key.in_({p["key"] for p in punches})))
+    for key, timelog_id, error in known:
+        results[key] = {"key": key, "status": 'duplicate', "timelog_id": timelog_id, "error": error}
+    fresh = []
+    for p in sorted(punches, key=lambda p: p["at"]):
+        if p["key"] not in results:
+            results[p["key"]] = None  # later copies in the same batch share this one's outcome
+            fresh.append(p)
+
+    users = dict(db.session.execute(select(User.email, User.id).where(
+        User.email.in_({p["email"] for p in fresh}), User.role == 'staff')).all())
+    user_ids = set(users.values())
+    shifts, open_logs = {}, {}
+    if fresh and user_ids:
+        lo, hi = min(p["at"] for p in fresh), max(p["at"] for p in fresh)
+        for sid, uid, start, end in db.session.execute(
+                select(Shift.id, Shift.user_id, Shift.start_time, Shift.end_time).where(
+                    Shift.user_id.in_(user_ids), Shift.start_time > lo - MAX_SHIFT,
+                    Shift.start_time <= hi + EARLY_CLOCK_IN)):
+            shifts.setdefault(uid, []).append((sid, start, end))
+        for tid, uid, sid in db.session.execute(
+                select(TimeLog.id, TimeLog.user_id, TimeLog.shift_id)
+                .where(TimeLog.user_id.in_(user_ids), TimeLog.clock_out.is_(None))
+                .order_by(TimeLog.clock_in)):
+            open_logs[uid] = {"id": tid, "shift_id": sid}
+
+    new_logs, closes, done_shifts, records = [], [], set(), []
+    for p in fresh:
+        uid, error, log = users.get(p["email"]), None, None
+        if uid is None:
+            error = "Staff not found"
+        elif p["kind"] == 'in':
+            shift = _pick_shift(shifts.get(uid, []), p["at"], p["shift_id"])
+            if uid in open_logs: error = "Already clocked in"
+            elif not shift: error = "No shift to clock in to"
+            else:
+                log = {"id": None, "user_id": uid, "shift_id": shift[0], "clock_in": p["at"],
+                       "clock_out": None, "source": 'kiosk'}
+                new_logs.append(log); open_logs[uid] = log
+        else:
+            log = open_logs.pop(uid, None)
+            if not log: error = "Not clocked in"
+            elif "clock_in" in log: log["clock_out"] = p["at"]  # opened earlier in this batch
+            else: closes.append({"b_id": log["id"], "b_out": p["at"]})
+            if log: done_shifts.add(log["shift_id"])
+        records.append((p, uid, log, error))
+
+    if new_logs:
+        ids = db.session.scalars(insert(TimeLog).returning(TimeLog.id, sort_by_parameter_order=True),
+                                 [{k: v for k, v in log.items() if k != "id"} for log in new_logs]).all()
+        for log, tid in zip(new_logs, ids):
+            log["id"] = tid
+    if closes:
+        timelogs = TimeLog.__table__
+        db.session.execute(update(timelogs).where(timelogs.c.id == bindparam('b_id'))
+                           .values(clock_out=bindparam('b_out')), closes)
+    if done_shifts:
+        db.session.execute(update(Shift).where(Shift.id.in_(done_shifts)).values(status='completed')
+                           .execution_options(synchronize_session=False))
+        attendance.refresh(attendance.shift_keys(done_shifts))
+    if records:
+        now = datetime.utcnow()
+        db.session.execute(insert(KioskPunch), [
+            {"key": p["key"], "user_id": uid, "kind": p["kind"], "punched_at": p["at"],
+             "timelog_id": log["id"] if log else None, "error": error, "received_at": now}
+            for p, uid, log, error in records])
+    db.session.commit()
+
+    for p, uid, log, error in records:
+        results[p["key"]] = {"key": p["key"], "status": 'refused' if error else 'ok',
+                             "timelog_id": log["id"] if log else None, "error": error}
+    return [results[p["key"]] for p in punches]
+
+class PunchQueue:
+    """
+    In-process group commit: request threads enqueue punches and wait; one flusher thread
+    drains up to `max_batch` of them (waiting at most `max_wait` seconds for company) and
+    writes them with a single record_punches() transaction.
+    """
+
+    def __init__(self, app, max_batch=MAX_BATCH, max_wait=MAX_WAIT, timeout=TIMEOUT):
+        self.app, self.max_batch, self.max_wait, self.timeout = app, max_batch, max_wait, timeout
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, punches):
+        """
+        Queue parsed punches and block until their batch has committed. Raises TimeoutError after
+        `timeout` seconds; the punches stay queued, so the kiosk can retry them with the same keys.
+        """
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="punch-flusher", daemon=True)
+                self.thread.start()
+        # Don't sit on a connection (and, on SQLite, a read lock the flusher must wait out) meanwhile.
+        db.session.close()
+        futures = []
+        for p in punches:
+            f = Future(); futures.append(f)
+            self.queue.put((p, f))
+        deadline = time.monotonic() + self.timeout
+        try:
+            return [f.result(max(deadline - time.monotonic(), 0)) for f in futures]
+        except FutureTimeout:
+            raise TimeoutError(f"punches not committed within {self.timeout:g} s") from None
+
+    def _drain(self):
+        batch = [self.queue.get()]
+        until = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = until - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            punches = [p for p, _ in batch]
+            with self.app.app_context():
+                try:
+                    try:
+                        results = record_punches(punches)
+                    except IntegrityError:
+                        # Another worker committed one of these keys first; now it reads as a duplicate.
+                        db.session.rollback()
+                        results = record_punches(punches)
+                except Exception as e:
+                    db.session.rollback()
+                    for _, f in batch: f.set_exception(e)
+                    continue
+                finally:
+                    db.session.remove()
+            for (_, f), result in zip(batch, results):
+                f.set_result(result)
+
+def punch_queue(app):
+    """The app's PunchQueue, created on first use."""
+    if 'punch_queue' not in app.extensions:
+        app.extensions['punch_queue'] = PunchQueue(app, app.config.get('KIOSK_MAX_BATCH', MAX_BATCH),
+                                                   app.config.get('KIOSK_MAX_WAIT', MAX_WAIT),
+                                                   app.config.get('KIOSK_TIMEOUT', TIMEOUT))
+    return app.extensions['punch_queue']
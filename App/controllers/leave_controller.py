@@ -1,12 +1,19 @@
-from datetime import date
+import re
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert, delete, func, distinct, exists, literal, union_all, true, String, Float
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
 from ..database import db
-from ..models.core import User, LeaveRequest
+from ..models.core import User, LeaveRequest, LeaveDay, LeaveLedger, LeaveBalance
+from . import availability_controller as availability
 
 def create_leave(requester_email: str, start_iso: str, end_iso: str, leave_type: str, reason: str = ""):
     req = User.query.filter_by(email=requester_email).first()
     if not req: raise ValueError("Requester not found")
     lr = LeaveRequest(requester_id=req.id, start_date=date.fromisoformat(start_iso),
                       end_date=date.fromisoformat(end_iso), type=leave_type, reason=reason, status='pending')
+    if lr.end_date < lr.start_date: raise ValueError("end date must not be before start date")
+    check_balance(req.id, leave_type, days_requested(lr))
     db.session.add(lr); db.session.commit()
     return lr
 
@@ -17,5 +24,196 @@ def decide_leave(leave_id: int, approver_email: str, decision: str):
     if not lr: raise ValueError("Leave request not found")
     approver = User.query.filter_by(email=approver_email).first()
     if not approver: raise ValueError("Approver not found")
-    lr.approver_id = approver.id; lr.status = decision
+    was_approved = lr.status == 'approved'
+    if decision == 'approved' and not was_approved:
+        check_balance(lr.requester_id, lr.type, days_requested(lr))
+    lr.approver_id, lr.status = approver.id, decision
+    if decision == 'approved' and not was_approved:
+        debit(lr)
+    elif was_approved and decision != 'approved':
+        reverse(lr)
+    if was_approved or decision == 'approved':
+        sync_calendar(lr)
+        availability.refresh(availability.leave_keys(lr))
     db.session.commit(); return lr
+
+def list_leave(status: str = None, requester_id: int = None, after_id: int = None, limit: int = None,
+               batch_size: int = 500):
+    """Leave requests in id order, requester/approver joined in; streamed in batches."""
+    stmt = (select(LeaveRequest)
+            .options(joinedload(LeaveRequest.requester), joinedload(LeaveRequest.approver))
+            .order_by(LeaveRequest.id.asc()))
+    if status: stmt = stmt.where(LeaveRequest.status == status)
+    if requester_id: stmt = stmt.where(LeaveRequest.requester_id == requester_id)
+    if after_id: stmt = stmt.where(LeaveRequest.id > after_id)
+    if limit: stmt = stmt.limit(limit)
+    return db.session.scalars(stmt.execution_options(yield_per=batch_size))
+
+CALENDAR_LIMIT = 1000  # requests listed by calendar(); the per-day counts always cover the whole range
+
+def leave_day_rows(leave_id, user_id, first, last):
+    return [{"day": first + timedelta(days=d), "user_id": user_id, "leave_id": leave_id}
+            for d in range((last - first).days + 1)]
+
+def sync_calendar(lr):
+    """Rewrite the request's leave_days rows: one per day while approved, none otherwise."""
+    db.session.execute(delete(LeaveDay).where(LeaveDay.leave_id == lr.id))
+    if lr.status == 'approved':
+        db.session.execute(insert(LeaveDay), leave_day_rows(lr.id, lr.requester_id, lr.start_date, lr.end_date))
+
+def _by_role(stmt, role):
+    return stmt.join(User, User.id == LeaveDay.user_id).where(User.role == role) if role else stmt
+
+def who_is_off_statement(start: date, end: date, role: str = None):
+    """Approved leave overlapping [start, end], by first day: a leave_days range scan, then requests by id."""
+    ids = _by_role(select(LeaveDay.leave_id).where(LeaveDay.day.between(start, end)), role).distinct()
+    return (select(LeaveRequest.id, User.email, User.name, LeaveRequest.start_date, LeaveRequest.end_date,
+                   LeaveRequest.type)
+            .join(User, User.id == LeaveRequest.requester_id)
+            .where(LeaveRequest.id.in_(ids))
+            .order_by(LeaveRequest.start_date, LeaveRequest.id))
+
+def absence_statement(start: date, end: date, role: str = None):
+    """(day, staff absent) for days in [start, end] with anyone off; people with overlapping requests count once."""
+    stmt = select(LeaveDay.day, func.count(distinct(LeaveDay.user_id))).where(LeaveDay.day.between(start, end))
+    return _by_role(stmt, role).group_by(LeaveDay.day)
+
+def calendar(start: date, end: date, role: str = None, limit: int = CALENDAR_LIMIT):
+    """
+    For every day in [start, end], how many staff are absent and their share of the headcount; and
+    the first `limit` approved requests overlapping the range, with `more` set if there are others.
+    """
+    if end < start: raise ValueError("to must not be before from")
+    headcount = db.session.scalar(select(func.count(User.id)).where(User.role == role) if role
+                                  else select(func.count(User.id)))
+    absent = dict(db.session.execute(absence_statement(start, end, role)).all())
+    days = []
+    for d in range((end - start).days + 1):
+        day = start + timedelta(days=d)
+        off = absent.get(day, 0)
+        days.append({"day": day.isoformat(), "absent": off,
+                     "share": round(off / headcount, 4) if headcount else 0.0})
+    off = [{"id": lid, "email": email, "name": name, "start_date": first.isoformat(),
+            "end_date": last.isoformat(), "type": kind}
+           for lid, email, name, first, last, kind
+           in db.session.execute(who_is_off_statement(start, end, role).limit(limit + 1))]
+    return {"from": start.isoformat(), "to": end.isoformat(), "role": role, "headcount": headcount,
+            "days": days, "off": off[:limit], "more": len(off) > limit}
+
+def rebuild_calendar(batch_size: int = 500):
+    """Rewrite leave_days from every approved request (repair after edits outside the app)."""
+    db.session.execute(delete(LeaveDay))
+    days = 0
+    stmt = (select(LeaveRequest.id, LeaveRequest.requester_id, LeaveRequest.start_date, LeaveRequest.end_date)
+            .where(LeaveRequest.status == 'approved').execution_options(yield_per=batch_size))
+    for part in db.session.execute(stmt).partitions():
+        rows = [row for leave in part for row in leave_day_rows(*leave)]
+        if rows: db.session.execute(insert(LeaveDay.__table__), rows)
+        days += len(rows)
+    db.session.commit()
+    return days
+
+BALANCE_EPSILON = 1e-9  # float slack when comparing day counts
+
+def days_requested(lr) -> float:
+    """Calendar days the request covers, both ends included."""
+    return float((lr.end_date - lr.start_date).days + 1)
+
+def parse_rates(specs):
+    """{leave type: days per period} from "type:days" strings, as given to --rate."""
+    rates = {}
+    for spec in specs:
+        kind, _, days = spec.partition(':')
+        if not kind or not re.fullmatch(r"\d+(\.\d+)?", days): raise ValueError(f"rate must look like type:days, not {spec!r}")
+        rates[kind] = float(days)
+    return rates
+
+def balance(user_id: int, leave_type: str):
+    """Days left from the balance snapshot; None if the type is not tracked for the user."""
+    return db.session.scalar(select(LeaveBalance.days)
+                             .where(LeaveBalance.user_id == user_id, LeaveBalance.type == leave_type))
+
+def balances(user_id: int):
+    return {kind: round(days, 2) for kind, days in db.session.execute(
+        select(LeaveBalance.type, LeaveBalance.days).where(LeaveBalance.user_id == user_id).order_by(LeaveBalance.type))}
+
+def check_balance(user_id: int, leave_type: str, days: float):
+    """Raise if a tracked balance can't cover `days`; one primary-key read, no ledger scan."""
+    left = balance(user_id, leave_type)
+    if left is not None and left + BALANCE_EPSILON < days:
+        raise ValueError(f"Insufficient {leave_type} leave: {left:g} days left, {days:g} requested")
+
+def _add_balance(rows=None, **values):
+    """Add to balance snapshots, creating missing ones: `rows` is a SELECT of (user_id, type, days), or pass them as keywords."""
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(LeaveBalance)
+    # The WHERE keeps SQLite from reading ON CONFLICT as part of the SELECT's join.
+    stmt = stmt.from_select(["user_id", "type", "days"], rows.where(true())) if rows is not None else stmt.values(**values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[LeaveBalance.user_id, LeaveBalance.type],
+                                                  set_={"days": LeaveBalance.days + stmt.excluded.days}))
+
+def post(user_id: int, leave_type: str, kind: str, days: float, leave_id: int = None, note: str = None):
+    """Append a ledger entry and move the snapshot with it, in the caller's transaction."""
+    db.session.execute(insert(LeaveLedger).values(user_id=user_id, type=leave_type, kind=kind, days=days,
+                                                  leave_id=leave_id, note=note, posted_at=datetime.utcnow()))
+    _add_balance(user_id=user_id, type=leave_type, days=days)
+
+def debit(lr):
+    """Take an approved request's days off its balance; untracked types post nothing."""
+    if balance(lr.requester_id, lr.type) is not None:
+        post(lr.requester_id, lr.type, 'debit', -days_requested(lr), leave_id=lr.id)
+
+def reverse(lr):
+    """Undo whatever is posted against a request that is no longer approved."""
+    net = db.session.scalar(select(func.sum(LeaveLedger.days)).where(LeaveLedger.leave_id == lr.id))
+    if net:
+        post(lr.requester_id, lr.type, 'reversal', -net, leave_id=lr.id)
+
+def adjust(email: str, leave_type: str, days: float, note: str = None):
+    """Post a manual adjustment (opening balance, correction); starts tracking the type for the user."""
+    user = User.query.filter_by(email=email).first()
+    if not user: raise ValueError("User not found")
+    post(user.id, leave_type, 'adjustment', days, note=note)
+    db.session.commit()
+    return balance(user.id, leave_type)
+
+def accrue(period: str, rates, roles=None):
+    """
+    Post one accrual per user (optionally only `roles`) and leave type for `period` (YYYY-MM), at
+    `rates` days each: one INSERT ... SELECT over the workforce for the ledger, one upsert for the
+    snapshots. Users already accrued for the period and type are skipped, so a rerun posts nothing.
+    """
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", period): raise ValueError("period must look like YYYY-MM")
+    if not rates: raise ValueError("no accrual rates given")
+    table = union_all(*(select(literal(kind, String).label("type"), literal(days, Float).label("days"))
+                        for kind, days in sorted(rates.items()))).subquery("rates")
+    already = exists().where(LeaveLedger.period == period, LeaveLedger.type == table.c.type,
+                             LeaveLedger.user_id == User.id)
+    due = (select(User.id, table.c.type, literal('accrual'), table.c.days, literal(period),
+                  literal(datetime.utcnow()))
+           .select_from(User).join(table, true()).where(~already))
+    if roles: due = due.where(User.role.in_(roles))
+    last = db.session.scalar(select(func.max(LeaveLedger.id))) or 0
+    posted = db.session.execute(insert(LeaveLedger).from_select(
+        ["user_id", "type", "kind", "days", "period", "posted_at"], due)).rowcount
+    _add_balance(select(LeaveLedger.user_id, LeaveLedger.type, LeaveLedger.days)
+                 .where(LeaveLedger.id > last, LeaveLedger.period == period))
+    db.session.commit()
+    return posted
+
+def ledger(user_id: int, leave_type: str = None, after_id: int = None, limit: int = None):
+    """A user's ledger entries in id order (keyset paged like list_leave)."""
+    stmt = select(LeaveLedger).where(LeaveLedger.user_id == user_id).order_by(LeaveLedger.id)
+    if leave_type: stmt = stmt.where(LeaveLedger.type == leave_type)
+    if after_id: stmt = stmt.where(LeaveLedger.id > after_id)
+    if limit: stmt = stmt.limit(limit)
+    return db.session.scalars(stmt)
+
+def rebuild_balances():
+    """Rewrite every snapshot from the ledger (repair after edits outside the app)."""
+    db.session.execute(delete(LeaveBalance))
+    db.session.execute(insert(LeaveBalance).from_select(
+        ["user_id", "type", "days"],
+        select(LeaveLedger.user_id, LeaveLedger.type, func.sum(LeaveLedger.days))
+        .group_by(LeaveLedger.user_id, LeaveLedger.type)))
+    db.session.commit()
@@ -1,5 +1,41 @@
+import logging
+import queue
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, bindparam, literal, true, tuple_, func, and_, or_, String, Integer, Boolean, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
 from ..database import db
-from ..models.core import User, Notification
+from ..models.core import User, Notification, UnreadCount
+
+log = logging.getLogger(__name__)
+
+CHUNK = 500  # notifications per delivery job
+WORKERS = 4
+MAX_ATTEMPTS = 5
+BACKOFF = 30.0  # seconds before the first retry; doubles after each failure
+LEASE = 300.0  # seconds a claimed ('sending') row stays claimed if its sender dies
+
+def _log_sender(email, message):
+    log.info("deliver to %s: %s", email, message)
+
+# channel -> fn(email, message); raising marks the attempt failed. Deployments swap in real
+# gateways with register_sender(); 'inapp' never goes through here.
+SENDERS = {'email': _log_sender, 'sms': _log_sender}
+
+def register_sender(channel: str, fn):
+    SENDERS[channel] = fn
+
+def known_channel(channel: str) -> bool:
+    return channel == 'inapp' or channel in SENDERS
+
+def _add_unread(rows=None, **values):
+    """Add to unread counters, creating missing ones: `rows` is a SELECT of (user_id, n), or pass user_id=, unread=."""
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(UnreadCount)
+    # The WHERE keeps SQLite from reading ON CONFLICT as part of the SELECT's join.
+    stmt = stmt.from_select(["user_id", "unread"], rows.where(true())) if rows is not None else stmt.values(**values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[UnreadCount.user_id],
+                                                  set_={"unread": UnreadCount.unread + stmt.excluded.unread}))
 
 def send_notification(recipient_email: str, message: str, channel: str = "inapp",
                       entity_type: str = None, entity_id: int = None):
@@ -7,5 +43,211 @@ def send_notification(recipient_email: str, message: str, channel: str = "inapp"
     if not user: raise ValueError("Recipient not found")
     n = Notification(recipient_id=user.id, channel=channel, message=message,
                      entity_type=entity_type, entity_id=entity_id)
-    db.session.add(n); db.session.commit()
+    if channel != 'inapp':
+        n.status, n.next_attempt_at = 'pending', datetime.utcnow()
+    else:
+        n.sent_at = datetime.utcnow()
+    db.session.add(n)
+    _add_unread(user_id=user.id, unread=1)
+    db.session.commit()
     return n
+
+def audience(role: str = None, emails=None):
+    """SELECT of the recipients' user ids: everyone, or narrowed to a role and/or a list of emails."""
+    stmt = select(User.id)
+    if role: stmt = stmt.where(User.role == role)
+    if emails is not None: stmt = stmt.where(User.email.in_(list(emails)))
+    return stmt
+
+def fan_out(message: str, channel: str = "inapp", role: str = None, emails=None,
+            entity_type: str = None, entity_id: int = None):
+    """
+    Store one notification per recipient with a single INSERT ... SELECT and commit.
+    Returns (count, ids to deliver); the ids are empty for 'inapp', which needs no delivery.
+    Unknown emails, or a channel with no sender, raise ValueError before anything is written.
+    """
+    if not known_channel(channel): raise ValueError(f"Unknown channel {channel!r}")
+    if emails is not None:
+        emails = set(emails)
+        found = set(db.session.scalars(select(User.email).where(User.email.in_(emails))))
+        if emails - found: raise ValueError(f"Recipients not found: {', '.join(sorted(emails - found))}")
+    now = datetime.utcnow()
+    inapp = channel == 'inapp'
+    rows = audience(role, emails).add_columns(
+        literal(message, String), literal(channel, String),
+        literal(entity_type, String), literal(entity_id, Integer),
+        literal(now, DateTime), literal(False, Boolean),
+        literal('sent' if inapp else 'pending', String), literal(0, Integer),
+        literal(None if inapp else now, DateTime), literal(now if inapp else None, DateTime))
+    stmt = insert(Notification).from_select(
+        ["recipient_id", "message", "channel", "entity_type", "entity_id", "created_at", "read",
+         "status", "attempts", "next_attempt_at", "sent_at"], rows)
+    if inapp:
+        count, ids = db.session.execute(stmt).rowcount, []
+    else:
+        ids = db.session.scalars(stmt.returning(Notification.id)).all()
+        count = len(ids)
+    _add_unread(audience(role, emails).add_columns(literal(1, Integer)))
+    db.session.commit()
+    return count, ids
+
+def unread_count(user_id: int) -> int:
+    counter = db.session.get(UnreadCount, user_id)
+    return counter.unread if counter else 0
+
+def inbox(user_id: int, before: datetime = None, before_id: int = None, limit: int = 50,
+          unread_only: bool = False):
+    """A page of the user's notifications, newest first, continuing after the (before, before_id) cursor."""
+    stmt = (select(Notification).where(Notification.recipient_id == user_id)
+            .order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit))
+    if before is not None and before_id is not None:
+        stmt = stmt.where(tuple_(Notification.created_at, Notification.id) < (before, before_id))
+    elif before is not None:
+        stmt = stmt.where(Notification.created_at < before)
+    if unread_only: stmt = stmt.where(Notification.read.is_(False))
+    return db.session.scalars(stmt).all()
+
+def mark_read(user_id: int, ids=None):
+    """Mark the given notifications (default: all) read; the counter drops by the rows that changed. Returns unread."""
+    stmt = update(Notification).where(Notification.recipient_id == user_id, Notification.read.is_(False))
+    if ids is not None: stmt = stmt.where(Notification.id.in_(list(ids)))
+    changed = db.session.execute(stmt.values(read=True).execution_options(synchronize_session=False)).rowcount
+    if changed:
+        db.session.execute(update(UnreadCount).where(UnreadCount.user_id == user_id)
+                           .values(unread=UnreadCount.unread - changed))
+    db.session.commit()
+    return unread_count(user_id)
+
+def recount_unread():
+    """Rebuild every counter from the notifications table (backfill, or repair after manual edits)."""
+    db.session.execute(delete(UnreadCount))
+    db.session.execute(insert(UnreadCount).from_select(
+        ["user_id", "unread"],
+        select(Notification.recipient_id, func.count(Notification.id))
+        .where(Notification.read.is_(False)).group_by(Notification.recipient_id)))
+    db.session.commit()
+
+def deliver(ids, now: datetime = None, max_attempts: int = MAX_ATTEMPTS, backoff: float = BACKOFF):
+    """
+    Try each pending notification in `ids` once and record the outcome in one executemany.
+    Rows are first claimed (status 'sending', committed) so concurrent callers never send the same
+    one; a claim whose sender died lapses after LEASE seconds. Failures are retried after
+    backoff * 2**(attempts - 1) seconds until max_attempts, then marked 'failed'.
+    Returns {"sent", "failed", "retry": [(seconds, id), ...]}.
+    """
+    now = now or datetime.utcnow()
+    outcomes, counts = [], {"sent": 0, "failed": 0, "retry": []}
+    claimable = or_(Notification.status == 'pending',
+                    and_(Notification.status == 'sending', Notification.next_attempt_at <= now))
+    claimed = db.session.scalars(
+        update(Notification).where(Notification.id.in_(list(ids)), claimable)
+        .values(status='sending', next_attempt_at=now + timedelta(seconds=LEASE))
+        .returning(Notification.id).execution_options(synchronize_session=False)).all()
+    db.session.commit()
+    if not claimed:
+        return counts
+    rows = db.session.execute(
+        select(Notification.id, Notification.channel, Notification.message, Notification.attempts, User.email)
+        .join(User, User.id == Notification.recipient_id).where(Notification.id.in_(claimed))).all()
+    for nid, channel, message, attempts, email in rows:
+        attempts = (attempts or 0) + 1
+        out = {"b_id": nid, "b_attempts": attempts, "b_status": 'sent', "b_next": None,
+               "b_sent": None, "b_error": None}
+        try:
+            sender = SENDERS.get(channel)
+            if sender is None: raise LookupError(f"No sender for channel {channel!r}")
+            sender(email, message)
+            out["b_sent"] = datetime.utcnow()
+            counts["sent"] += 1
+        except Exception as e:
+            out["b_error"] = str(e)[:255]
+            if attempts >= max_attempts or isinstance(e, LookupError):
+                out["b_status"] = 'failed'
+                counts["failed"] += 1
+            else:
+                delay = backoff * 2 ** (attempts - 1)
+                out["b_status"], out["b_next"] = 'pending', now + timedelta(seconds=delay)
+                counts["retry"].append((delay, nid))
+        outcomes.append(out)
+    if outcomes:
+        table = Notification.__table__
+        db.session.execute(update(table).where(table.c.id == bindparam('b_id')).values(
+            attempts=bindparam('b_attempts'), status=bindparam('b_status'), next_attempt_at=bindparam('b_next'),
+            sent_at=bindparam('b_sent'), last_error=bindparam('b_error')), outcomes)
+    db.session.commit()
+    return counts
+
+def deliver_pending(now: datetime = None, max_attempts: int = MAX_ATTEMPTS, backoff: float = BACKOFF,
+                    chunk: int = CHUNK):
+    """
+    Deliver every pending notification that is due, and every lapsed claim, in id-ordered chunks
+    (for cron and restarts).
+    """
+    now = now or datetime.utcnow()
+    totals, after_id = {"sent": 0, "failed": 0, "retry": 0}, 0
+    while True:
+        ids = db.session.scalars(
+            select(Notification.id).where(Notification.status.in_(('pending', 'sending')),
+                                          Notification.next_attempt_at <= now,
+                                          Notification.id > after_id)
+            .order_by(Notification.id).limit(chunk)).all()
+        if not ids:
+            return totals
+        counts = deliver(ids, now, max_attempts, backoff)
+        totals["sent"] += counts["sent"]; totals["failed"] += counts["failed"]
+        totals["retry"] += len(counts["retry"])
+        after_id = ids[-1]
+
+class DeliveryQueue:
+    """
+    In-process delivery: put() hands over notification ids and returns at once; a pool of
+    `workers` threads delivers them in chunks and re-queues failures after their backoff.
+    Rows still pending when the process exits are picked up by deliver_pending().
+    """
+
+    def __init__(self, app, workers=WORKERS, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF):
+        self.app, self.workers, self.max_attempts, self.backoff = app, workers, max_attempts, backoff
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def put(self, ids):
+        with self.lock:
+            self.threads = [t for t in self.threads if t.is_alive()]
+            while len(self.threads) < self.workers:
+                t = threading.Thread(target=self._run, name=f"notify-{len(self.threads)}", daemon=True)
+                t.start(); self.threads.append(t)
+        ids = list(ids)
+        for i in range(0, len(ids), CHUNK):
+            self.queue.put(ids[i:i + CHUNK])
+
+    def _retry_later(self, delay, ids):
+        timer = threading.Timer(delay, self.queue.put, (ids,))
+        timer.daemon = True
+        timer.start()
+
+    def _run(self):
+        while True:
+            ids = self.queue.get()
+            with self.app.app_context():
+                try:
+                    counts = deliver(ids, max_attempts=self.max_attempts, backoff=self.backoff)
+                except Exception:
+                    log.exception("notification delivery failed")
+                    db.session.rollback()
+                    continue
+                finally:
+                    db.session.remove()
+            by_delay = {}
+            for delay, nid in counts["retry"]:
+                by_delay.setdefault(delay, []).append(nid)
+            for delay, retry_ids in by_delay.items():
+                self._retry_later(delay, retry_ids)
+
+def delivery_queue(app):
+    """The app's DeliveryQueue, created on first use."""
+    if 'notify_queue' not in app.extensions:
+        app.extensions['notify_queue'] = DeliveryQueue(app, app.config.get('NOTIFY_WORKERS', WORKERS),
+                                                       app.config.get('NOTIFY_MAX_ATTEMPTS', MAX_ATTEMPTS),
+                                                       app.config.get('NOTIFY_BACKOFF', BACKOFF))
+    return app.extensions['notify_queue']
@@ -0,0 +1,99 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, and_, or_, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from ..database import db
+from ..models.core import Shift, TimeLog, BreakLog, LeaveRequest, SwapRequest, Notification, Availability, LeaveLedger
+from . import report_controller, timesheet_controller, attendance_controller, leave_controller
+
+class explain(Executable, ClauseElement):
+    """EXPLAIN wrapper that keeps the inner statement's bind parameters."""
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.statement = stmt
+
+@compiles(explain)
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+@compiles(explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+def hot_queries():
+    """The filters the CLI and controllers run against large tables, with sample parameters."""
+    from . import coverage_controller  # imports NumPy
+    now = datetime(2025, 10, 6)
+    week = now + timedelta(days=7)
+    return {
+        "roster window": select(Shift.id).where(Shift.start_time >= now, Shift.start_time < week)
+                                         .order_by(Shift.start_time),
+        "roster by user": select(Shift.id).where(Shift.user_id == 1, Shift.start_time >= now),
+        "timelogs window": select(TimeLog.id).where(TimeLog.clock_in >= now, TimeLog.clock_out <= week),
+        "timelogs by user": select(TimeLog.id).where(TimeLog.user_id == 1).order_by(TimeLog.clock_in),
+        "timelogs by shift": select(TimeLog.id).where(TimeLog.shift_id == 1),
+        "breaks by timelog": select(BreakLog.id).where(BreakLog.timelog_id == 1),
+        "leave by status": select(LeaveRequest.id).where(LeaveRequest.status == "pending")
+                                                 .order_by(LeaveRequest.id),
+        "leave by requester": select(LeaveRequest.id).where(LeaveRequest.requester_id == 1)
+                                                     .order_by(LeaveRequest.id),
+        "swaps by status": select(SwapRequest.id).where(SwapRequest.status == "pending")
+                                                .order_by(SwapRequest.id),
+        "swaps by user": select(SwapRequest.id).where(or_(SwapRequest.from_user_id == 1,
+                                                          SwapRequest.to_user_id == 1)),
+        "notifications inbox": select(Notification.id).where(Notification.recipient_id == 1)
+                                                      .order_by(Notification.created_at.desc()),
+        "notifications due": select(Notification.id).where(Notification.status == "pending",
+                                                          Notification.next_attempt_at <= now),
+        "exception sweep": select(Shift.id).where(Shift.end_time > now, Shift.end_time <= week,
+                                                  Shift.start_time > now - timedelta(days=1),
+                                                  Shift.start_time <= week),
+        "weekly report": report_controller.weekly_report_statement("2025-10-06"),
+        "timesheet export": timesheet_controller.timesheet_statement(now.date(), week.date()),
+        "attendance refresh": attendance_controller.rollup_statement(
+            lambda uid, day: and_(uid.in_([1]), tuple_(uid, day).in_([(1, now.date())]))),
+        "attendance summary": attendance_controller.summary_statement(now.date(), week.date()),
+        "coverage": coverage_controller.coverage_statement(now, week),
+        "leave calendar": leave_controller.absence_statement(now.date(), week.date()),
+        "who is off": leave_controller.who_is_off_statement(now.date(), week.date()),
+        "leave ledger": select(LeaveLedger).where(LeaveLedger.user_id == 1).order_by(LeaveLedger.id),
+        "leave reversal": select(func.sum(LeaveLedger.days)).where(LeaveLedger.leave_id == 1),
+        "availability weeks": select(Availability.user_id, Availability.shifts)
+                                  .where(Availability.week.in_([now.date(), week.date()])),
+    }
+
+def _sqlite_scans(rows, tables):
+    # Rows are (id, parent, notused, detail). "SCAN <table>" reads every row, even when it
+    # walks an index to save a sort; only "SEARCH" narrows the range.
+    scans = []
+    for row in rows:
+        m = re.match(r"SCAN (\w+)", row[-1])
+        if m and m.group(1) in tables:
+            scans.append(m.group(1))
+    return scans
+
+def _postgres_scans(plan, tables):
+    scans, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in tables:
+            scans.append(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return scans
+
+def check_query_plans():
+    """EXPLAIN every hot query; returns {name: [tables read by sequential scan]}."""
+    tables = set(db.metadata.tables)
+    conn = db.session.connection()
+    postgres = conn.dialect.name == "postgresql"
+    if postgres:
+        # Small tables make the planner prefer seq scans; ask whether an index *could* be used.
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    results = {}
+    for name, stmt in hot_queries().items():
+        rows = conn.execute(explain(stmt)).all()
+        results[name] = _postgres_scans(rows[0][0], tables) if postgres else _sqlite_scans(rows, tables)
+    db.session.rollback()
+    return results
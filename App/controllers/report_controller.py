@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, case, cast, literal, union, String
+from ..database import db
+from ..models.core import User, Shift, TimeLog
+
+def week_window(week_start: str):
+    start_dt = datetime.fromisoformat(f"{week_start}T00:00:00")
+    end_dt = start_dt + timedelta(days=7) - timedelta(seconds=1)
+    return start_dt, end_dt
+
+# The window is materialized before grouping: otherwise SQLite prefers walking the
+# user_id index (reading the whole table) just to avoid sorting for the GROUP BY.
+def _shift_counts(start_dt, end_dt):
+    window = (select(Shift.id, Shift.user_id, Shift.status)
+              .where(Shift.start_time >= start_dt, Shift.end_time <= end_dt)
+              .cte("week_shifts").prefix_with("MATERIALIZED"))
+    return (select(window.c.user_id,
+                   func.count(window.c.id).label("scheduled"),
+                   func.sum(case((window.c.status == "completed", 1), else_=0)).label("completed"),
+                   func.sum(case((window.c.status == "missed", 1), else_=0)).label("missed"))
+            .group_by(window.c.user_id)
+            .cte("shift_counts"))
+
+def _worked_minutes(start_dt, end_dt):
+    # Net minutes per timelog (TimeLog.net_minutes in SQL), then summed per user.
+    window = (select(TimeLog.user_id, TimeLog.net_minutes.label("minutes"))
+              .where(TimeLog.clock_out.is_not(None),
+                     TimeLog.clock_in >= start_dt, TimeLog.clock_out <= end_dt)
+              .cte("week_logs").prefix_with("MATERIALIZED"))
+    return (select(window.c.user_id, func.sum(window.c.minutes).label("worked_minutes"))
+            .group_by(window.c.user_id)
+            .cte("worked"))
+
+def weekly_report_statement(week_start: str):
+    start_dt, end_dt = week_window(week_start)
+    counts = _shift_counts(start_dt, end_dt)
+    worked = _worked_minutes(start_dt, end_dt)
+    ids = union(select(counts.c.user_id), select(worked.c.user_id)).cte("ids")
+
+    return (select(ids.c.user_id,
+                   func.coalesce(User.name, literal("User ") + cast(ids.c.user_id, String)),
+                   func.coalesce(counts.c.scheduled, 0),
+                   func.coalesce(counts.c.completed, 0),
+                   func.coalesce(counts.c.missed, 0),
+                   func.coalesce(worked.c.worked_minutes, 0))
+            .select_from(ids)
+            .outerjoin(User, User.id == ids.c.user_id)
+            .outerjoin(counts, counts.c.user_id == ids.c.user_id)
+            .outerjoin(worked, worked.c.user_id == ids.c.user_id))
+
+def weekly_report(week_start: str):
+    """Per-user shift counts and net worked minutes for the week, in a single query."""
+    start_dt, _ = week_window(week_start)
+    rows = [{
+        "user_id": uid,
+        "name": name,
+        "scheduled": int(scheduled),
+        "completed": int(completed),
+        "missed": int(missed),
+        "worked_minutes": int(minutes),
+    } for uid, name, scheduled, completed, missed, minutes in db.session.execute(weekly_report_statement(week_start))]
+    rows.sort(key=lambda r: r["name"].lower())
+    return {
+        "week_start": start_dt.date().isoformat(),
+        "week_end": (start_dt + timedelta(days=6)).date().isoformat(),
+        "rows": rows,
+    }
@@ -1,9 +1,21 @@
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import select
 from ..database import db
 from ..models.core import User, Shift, TimeLog
+from . import attendance_controller as attendance
 
-def view_roster():
-    return Shift.query.order_by(Shift.start_time.asc()).all()
+def view_roster(start: date = None, end: date = None, email: str = None, status: str = None,
+                batch_size: int = 500):
+    """Shifts starting within [start, end] (inclusive dates), streamed in start_time order."""
+    # User rides along as a second entity so sh.user resolves from the identity map.
+    stmt = (select(Shift, User)
+            .join(User, User.id == Shift.user_id)
+            .order_by(Shift.start_time.asc(), Shift.id.asc()))
+    if start: stmt = stmt.where(Shift.start_time >= datetime.combine(start, time.min))
+    if end: stmt = stmt.where(Shift.start_time < datetime.combine(end + timedelta(days=1), time.min))
+    if email: stmt = stmt.where(User.email == email)
+    if status: stmt = stmt.where(Shift.status == status)
+    return db.session.scalars(stmt.execution_options(yield_per=batch_size))
 
 def clock_in(user_email: str, shift_id: int):
     user = User.query.filter_by(email=user_email, role='staff').first()
@@ -20,5 +32,6 @@ def clock_out(user_email: str, timelog_id: int):
     tl = TimeLog.query.get(timelog_id)
     if not tl or tl.user_id != user.id: raise ValueError("TimeLog not found for this user")
     tl.clock_out = datetime.now(); tl.shift.status = 'completed'
+    attendance.refresh({(tl.user_id, tl.shift.work_date), (tl.shift.user_id, tl.shift.work_date)})
     db.session.commit()
     return tl
@@ -1,5 +1,10 @@
+from sqlalchemy import select, or_
+from sqlalchemy.orm import joinedload
 from ..database import db
 from ..models.core import User, Shift, SwapRequest
+from . import conflict_controller as conflicts
+from . import attendance_controller as attendance
+from . import availability_controller as availability
 
 def request_swap(from_email: str, shift_id: int, to_email: str, note: str = ""):
     from_user = User.query.filter_by(email=from_email).first()
@@ -16,6 +21,25 @@ def approve_swap(swap_id: int, approver_email: str, decision: str):
         raise ValueError("Decision must be approved/rejected/cancelled")
     sr = SwapRequest.query.get(swap_id)
     if not sr: raise ValueError("Swap request not found")
-    if decision == 'approved': sr.shift.user_id = sr.to_user_id
+    if decision == 'approved':
+        conflicts.check_shift(sr.to_user_id, sr.shift.start_time, sr.shift.end_time, ignore_shift_id=sr.shift_id)
+        old_user_id, sr.shift.user_id = sr.shift.user_id, sr.to_user_id
+        keys = {(old_user_id, sr.shift.work_date), (sr.to_user_id, sr.shift.work_date)}
+        attendance.refresh(keys)
+        availability.refresh(keys)
     sr.status = decision; db.session.commit()
     return sr
+
+def list_swaps(status: str = None, user_id: int = None, after_id: int = None, limit: int = None,
+               batch_size: int = 500):
+    """Swap requests in id order with both users and the shift loaded by the same query."""
+    # Shift rides along as a second entity so sr.shift resolves from the identity map.
+    stmt = (select(SwapRequest, Shift)
+            .outerjoin(Shift, Shift.id == SwapRequest.shift_id)
+            .options(joinedload(SwapRequest.from_user), joinedload(SwapRequest.to_user))
+            .order_by(SwapRequest.id.asc()))
+    if status: stmt = stmt.where(SwapRequest.status == status)
+    if user_id: stmt = stmt.where(or_(SwapRequest.from_user_id == user_id, SwapRequest.to_user_id == user_id))
+    if after_id: stmt = stmt.where(SwapRequest.id > after_id)
+    if limit: stmt = stmt.limit(limit)
+    return db.session.scalars(stmt.execution_options(yield_per=batch_size))
@@ -0,0 +1,193 @@
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import select, insert, update, delete, exists, bindparam, or_
+from ..database import db
+from ..models.core import User, Shift, ShiftTemplate, Holiday, TimeLog
+from . import attendance_controller as attendance
+from . import conflict_controller as conflicts
+from . import availability_controller as availability
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+BATCH = 1000
+
+def parse_weekdays(spec: str) -> str:
+    """'mon-fri' or 'mon,wed,sat' -> '0,1,2,3,4' / '0,2,5'."""
+    days = set()
+    for part in spec.lower().split(','):
+        lo, _, hi = part.strip().partition('-')
+        if lo not in WEEKDAYS or (hi and hi not in WEEKDAYS): raise ValueError(f"Bad weekday spec: {spec}")
+        a, b = WEEKDAYS.index(lo), WEEKDAYS.index(hi or lo)
+        days.update(range(a, b + 1) if a <= b else [*range(a, 7), *range(0, b + 1)])
+    return ','.join(str(d) for d in sorted(days))
+
+def parse_cycle(spec: str):
+    """'4/4' -> (4, 4): four days on, four days off."""
+    try:
+        on, off = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Cycle must look like ON/OFF, e.g. 4/4: {spec}")
+    if on < 1 or off < 0: raise ValueError("Cycle needs at least one day on")
+    return on, off
+
+def _apply(tpl: ShiftTemplate, start=None, end=None, anchor=None, weekdays=None, cycle=None,
+           until=None, skip_holidays=None):
+    if start: tpl.start_time = time.fromisoformat(start)
+    if end: tpl.end_time = time.fromisoformat(end)
+    if anchor: tpl.anchor_date = date.fromisoformat(anchor)
+    if until is not None: tpl.until_date = date.fromisoformat(until) if until else None
+    if skip_holidays is not None: tpl.skip_holidays = skip_holidays
+    if weekdays:
+        tpl.kind, tpl.weekdays, tpl.on_days, tpl.off_days = 'weekly', parse_weekdays(weekdays), None, None
+    if cycle:
+        tpl.kind, tpl.weekdays = 'cycle', None
+        tpl.on_days, tpl.off_days = parse_cycle(cycle)
+
+def create_template(user_email: str, name: str, start: str, end: str, anchor: str,
+                    weekdays: str = None, cycle: str = None, until: str = None, skip_holidays: bool = True):
+    if bool(weekdays) == bool(cycle): raise ValueError("Give exactly one of weekdays or cycle")
+    user = User.query.filter_by(email=user_email, role='staff').first()
+    if not user: raise ValueError("Staff not found")
+    tpl = ShiftTemplate(user_id=user.id, name=name, active=True)
+    _apply(tpl, start, end, anchor, weekdays, cycle, until or '', skip_holidays)
+    db.session.add(tpl); db.session.commit()
+    return tpl
+
+def update_template(template_id: int, user_email: str = None, active: bool = None, **changes):
+    """Edit a template; call expand_template() afterwards to bring its future shifts in line."""
+    tpl = db.session.get(ShiftTemplate, template_id)
+    if not tpl: raise ValueError("Template not found")
+    if user_email:
+        user = User.query.filter_by(email=user_email, role='staff').first()
+        if not user: raise ValueError("Staff not found")
+        tpl.user_id = user.id
+    if active is not None: tpl.active = active
+    _apply(tpl, **changes)
+    db.session.commit()
+    return tpl
+
+def add_holiday(day: str, name: str):
+    h = Holiday(date=date.fromisoformat(day), name=name)
+    db.session.add(h); db.session.commit()
+    return h
+
+def occurrence_dates(tpl: ShiftTemplate, first: date, last: date):
+    """Dates in [first, last] the template covers, stepped arithmetically per pattern day."""
+    first = max(first, tpl.anchor_date)
+    if tpl.until_date: last = min(last, tpl.until_date)
+    if last < first or not tpl.active: return []
+    if tpl.kind == 'weekly':
+        period = 7
+        starts = [first + timedelta(days=(int(wd) - first.weekday()) % 7) for wd in tpl.weekdays.split(',')]
+    else:
+        period = tpl.on_days + tpl.off_days
+        offset = (first - tpl.anchor_date).days
+        starts = []
+        for i in range(tpl.on_days):
+            # Whole cycles to skip so "on" day i lands on or after `first`.
+            cycles = -(-(offset - i) // period) if offset > i else 0
+            starts.append(tpl.anchor_date + timedelta(days=i + cycles * period))
+    return sorted(date.fromordinal(o) for s in starts
+                  for o in range(s.toordinal(), last.toordinal() + 1, period))
+
+def _window(tpl: ShiftTemplate, day: date):
+    start_dt = datetime.combine(day, tpl.start_time)
+    end_dt = datetime.combine(day, tpl.end_time)
+    if end_dt <= start_dt: end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+def expand_template(template_id: int, through: date, now: datetime = None):
+    """
+    Bring the template's shifts up to date through `through` (or the horizon already expanded, if later).
+    Only shifts that start after `now` and have no timelog are inserted, moved or removed;
+    matching dates are updated in place, so the horizon is never deleted and re-inserted.
+    A date whose shift would clash with another shift or approved leave is skipped (an existing
+    shift stays where it was) and reported in "conflicts" as (date, message).
+    """
+    tpl = db.session.get(ShiftTemplate, template_id)
+    if not tpl: raise ValueError("Template not found")
+    now = now or datetime.now()
+    first = now.date()
+    horizon = max(through, tpl.expanded_until or through)
+
+    holidays = set()
+    if tpl.skip_holidays:
+        holidays = set(db.session.scalars(select(Holiday.date).where(Holiday.date.between(first, horizon))))
+    wanted = {}
+    for day in occurrence_dates(tpl, first, horizon):
+        start_dt, end_dt = _window(tpl, day)
+        if day not in holidays and start_dt > now:
+            wanted[day] = (start_dt, end_dt)
+
+    worked = exists().where(TimeLog.shift_id == Shift.id)
+    existing = db.session.execute(
+        select(Shift.id, Shift.work_date, Shift.user_id, Shift.start_time, Shift.end_time,
+               or_(Shift.status != 'scheduled', Shift.start_time <= now, worked))
+        .where(Shift.template_id == tpl.id, Shift.work_date >= first, Shift.work_date <= horizon))
+
+    moves, deletes = {}, []  # moves: day -> (shift id, its current user)
+    for sid, day, user_id, start_dt, end_dt, locked in existing:
+        want = wanted.pop(day, None)
+        if locked:
+            continue
+        if want is None:
+            deletes.append((sid, user_id, day))
+        elif (user_id, start_dt, end_dt) != (tpl.user_id, *want):
+            moves[day] = (sid, user_id, want)
+    clashes = _clashes(tpl.user_id, {**{day: w for day, (_, _, w) in moves.items()}, **wanted},
+                       {sid for sid, _, _ in moves.values()} | {sid for sid, _, _ in deletes})
+    updates = [{"b_id": sid, "b_user": tpl.user_id, "b_start": want[0], "b_end": want[1]}
+               for day, (sid, _, want) in sorted(moves.items()) if day not in clashes]
+    inserts = [{"user_id": tpl.user_id, "work_date": day, "start_time": s, "end_time": e,
+                "status": 'scheduled', "template_id": tpl.id}
+               for day, (s, e) in sorted(wanted.items()) if day not in clashes]
+
+    shifts = Shift.__table__
+    for i in range(0, len(inserts), BATCH):
+        db.session.execute(insert(shifts), inserts[i:i + BATCH])
+    if updates:
+        stmt = (update(shifts).where(shifts.c.id == bindparam('b_id'))
+                .values(user_id=bindparam('b_user'), start_time=bindparam('b_start'), end_time=bindparam('b_end')))
+        for i in range(0, len(updates), BATCH):
+            db.session.execute(stmt, updates[i:i + BATCH])
+    ids = [sid for sid, _, _ in deletes]
+    for i in range(0, len(ids), BATCH):
+        db.session.execute(delete(shifts).where(shifts.c.id.in_(ids[i:i + BATCH])))
+    days = {(user_id, day) for _, user_id, day in deletes}
+    days.update((r["user_id"], r["work_date"]) for r in inserts)
+    for day, (_, user_id, _) in moves.items():
+        if day not in clashes:
+            days.update({(user_id, day), (tpl.user_id, day)})
+    attendance.refresh(days)
+    availability.refresh(days)
+    tpl.expanded_until = horizon
+    db.session.commit()
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes),
+            "conflicts": sorted(clashes.items())}
+
+def _clashes(user_id, windows, own_ids):
+    """
+    {day: message} for the {day: (start, end)} windows that would clash with the user's other
+    shifts or approved leave; `own_ids` are the template's shifts being moved or removed.
+    """
+    if not windows:
+        return {}
+    index = conflicts.build_index([user_id], min(s for s, _ in windows.values()),
+                                  max(e for _, e in windows.values()))[user_id]
+    found = {}
+    for day, (start, end) in sorted(windows.items()):
+        hit = next((it for it in index.overlaps(start, end) if not (it[2] == 'shift' and it[3] in own_ids)), None)
+        if hit:
+            found[day] = f"Conflicts with {conflicts.describe(hit)}"
+    return found
+
+def expand_all(through: date, now: datetime = None):
+    """Expand every template that is active or still has materialized future shifts."""
+    today = (now or datetime.now()).date()
+    ids = db.session.scalars(select(ShiftTemplate.id).where(
+        or_(ShiftTemplate.active.is_(True), ShiftTemplate.expanded_until >= today))).all()
+    totals = {"inserted": 0, "updated": 0, "deleted": 0, "conflicts": []}
+    for tid in ids:
+        counts = expand_template(tid, through, now)
+        for k in ("inserted", "updated", "deleted"):
+            totals[k] += counts[k]
+        totals["conflicts"] += [(f"template #{tid} {day}", message) for day, message in counts["conflicts"]]
+    return totals
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, func, Date
+from ..database import db
+from ..models.core import User, TimeLog
+
+BATCH = 1000  # rows fetched from the cursor, and written per output chunk
+FIELDS = ["user_id", "email", "name", "work_date", "first_in", "last_out", "timelogs", "worked_minutes"]
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def timesheet_statement(start: date, end: date, user_id: int = None):
+    """
+    Per user and clock-in day in [start, end]: closed timelogs and their net minutes, in user/day
+    order. Names are left out: joining users would cost SQLite a second sort after the GROUP BY.
+    """
+    day = func.date(TimeLog.clock_in, type_=Date)
+    stmt = (select(TimeLog.user_id, day.label("work_date"),
+                   func.min(TimeLog.clock_in).label("first_in"), func.max(TimeLog.clock_out).label("last_out"),
+                   func.count().label("timelogs"), func.sum(TimeLog.net_minutes).label("worked_minutes"))
+            .where(TimeLog.clock_out.is_not(None),
+                   TimeLog.clock_in >= datetime.combine(start, time.min),
+                   TimeLog.clock_in < datetime.combine(end + timedelta(days=1), time.min))
+            .group_by(TimeLog.user_id, day)
+            .order_by(TimeLog.user_id, day))
+    if user_id is not None: stmt = stmt.where(TimeLog.user_id == user_id)
+    return stmt
+
+def timesheet(start: date, end: date, email: str = None, batch_size: int = BATCH):
+    """
+    Timesheet rows as dicts, streamed from the cursor `batch_size` at a time. An unknown `email`
+    raises ValueError here, before the first row is asked for.
+    """
+    users = select(User.id, User.email, User.name)
+    if email: users = users.where(User.email == email)
+    people = {uid: (mail, name) for uid, mail, name in db.session.execute(users)}
+    if email and not people: raise ValueError("Staff not found")
+    return _rows(timesheet_statement(start, end, next(iter(people)) if email else None), people, batch_size)
+
+def _rows(stmt, people, batch_size):
+    for row in db.session.execute(stmt.execution_options(yield_per=batch_size)):
+        mail, name = people.get(row.user_id, (None, None))
+        yield {"user_id": row.user_id, "email": mail, "name": name,
+               "work_date": row.work_date.isoformat(), "first_in": row.first_in.isoformat(),
+               "last_out": row.last_out.isoformat(), "timelogs": row.timelogs,
+               "worked_minutes": int(row.worked_minutes)}
+
+def _csv(rows, batch_size):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(FIELDS)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([row[f] for f in FIELDS])
+        if i % batch_size == 0:
+            yield buf.getvalue()
+            buf.seek(0); buf.truncate()
+    if buf.tell(): yield buf.getvalue()
+
+def _ndjson(rows, batch_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row) + "\n")
+        if len(lines) == batch_size:
+            yield "".join(lines)
+            lines.clear()
+    if lines: yield "".join(lines)
+
+def export(start: date, end: date, fmt: str = 'csv', email: str = None, batch_size: int = BATCH):
+    """The timesheet as CSV (with a header) or NDJSON text chunks of `batch_size` rows; memory stays flat."""
+    if fmt not in FORMATS: raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if end < start: raise ValueError("to must not be before from")
+    writer = _ndjson if fmt == 'ndjson' else _csv
+    return writer(timesheet(start, end, email, batch_size), batch_size)
@@ -0,0 +1,58 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import Response, make_response, request
+from sqlalchemy import select
+from ..database import db
+from ..models.core import TableVersion
+
+# Clients may keep a copy but must revalidate it on every use; a 304 costs one small query.
+CACHE_CONTROL = "private, no-cache"
+
+def versions(tables):
+    """{table: (version, changed_at)} for the given tracked tables, in a single query."""
+    rows = db.session.execute(select(TableVersion.name, TableVersion.version, TableVersion.changed_at)
+                              .where(TableVersion.name.in_(tables)))
+    found = {name: (version, changed_at) for name, version, changed_at in rows}
+    return {name: found.get(name, (0, None)) for name in tables}
+
+def validators(key, tables, args=()):
+    """
+    (etag, last_modified) for a response built from `tables` under `key` and the query `args`.
+    changed_at goes into the tag too, so counters restarting on a fresh database never collide.
+    """
+    current = versions(tables)
+    token = repr((key, sorted(current.items()), sorted(args)))
+    etag = hashlib.sha1(token.encode()).hexdigest()[:20]
+    stamps = [changed_at for _, changed_at in current.values() if changed_at]
+    modified = max(stamps).replace(microsecond=0, tzinfo=timezone.utc) if stamps else None
+    return etag, modified
+
+def _not_modified(etag, modified):
+    if request.if_none_match:  # If-None-Match wins over If-Modified-Since (RFC 9110)
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return bool(modified and since and modified <= since)
+
+def conditional(*tables):
+    """
+    View decorator: answer 304 when the client's ETag (or date) still matches `tables`, without
+    running the view; otherwise tag the view's 200 response. Put it below @jwt_required().
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, modified = validators(request.endpoint, tables, request.args.items(multi=True))
+            if _not_modified(etag, modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if modified:
+                response.last_modified = modified
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorate
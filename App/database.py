@@ -1,7 +1,15 @@
+import logging
 import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.engine.url import make_url
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event, exc, text
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
@@ -12,6 +20,167 @@ def bind_app(app):
     global _bound_app
     _bound_app = app
 
+def init_migrate(app):
+    """
+    Make `flask db` work without importing Flask-Migrate (and Alembic) in processes that don't run it.
+    Flask-Migrate 3.x registers `db` as a flask.commands entry point, which takes the name before
+    app.cli; the flask CLI imports it while resolving the command, before it creates the app, so
+    it is set up right here then. Otherwise the LazyGroup below provides `db` and sets it up on use.
+    """
+    from .cli import LazyGroup
+
+    def setup():
+        if 'migrate' in app.extensions:
+            return
+        from flask_migrate import Migrate
+        # render_as_batch lets Alembic alter SQLite tables via copy-and-move
+        Migrate(app, db, render_as_batch=True)
+
+    if 'flask_migrate' in sys.modules:
+        setup()
+    app.cli.add_command(LazyGroup('db', 'flask_migrate.cli:db', setup=setup,
+                                  help='Database migrations (Flask-Migrate)'))
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection and how full it gets."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.checkouts = self.timeouts = self.peak_checked_out = 0
+            self.wait_total = self.wait_max = 0.0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - t0
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return conn
+
+def pool_stats(engine=None):
+    """Checkout waits and saturation (checked out / size + max_overflow) of the engine's pool."""
+    pool = (engine or db.engine).pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update(size=pool.size(), max_overflow=pool._max_overflow, checked_out=pool.checkedout(),
+                     saturation=round(pool.checkedout() / capacity, 3) if capacity else None)
+    if isinstance(pool, MeteredQueuePool):
+        stats.update(checkouts=pool.checkouts, timeouts=pool.timeouts,
+                     wait_avg_ms=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                     wait_max_ms=round(pool.wait_max * 1000, 3),
+                     peak_saturation=round(pool.peak_checked_out / capacity, 3) if capacity else None)
+    return stats
+
+def make_psycopg_green():
+    """
+    Let gevent run other greenlets while psycopg2 waits on the server. psycopg2 blocks in C, which
+    gevent's monkey-patching can't reach; gunicorn_config.py calls this in every gevent worker.
+    """
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    def wait(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == extensions.POLL_OK:
+                return
+            if state == extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+    extensions.set_wait_callback(wait)
+
+def tune_sqlite(engine, pragmas, begin=None, maintenance_interval=600.0):
+    """
+    Set `pragmas` on every new connection of a SQLite engine. At most every
+    `maintenance_interval` seconds, a connection returned to the pool runs PRAGMA optimize and a
+    passive WAL checkpoint.
+    By default the driver keeps opening transactions just before their first write, which
+    never deadlocks on the write lock. `begin='IMMEDIATE'` starts every transaction with
+    BEGIN IMMEDIATE instead: read-then-write transactions become atomic, at the cost of
+    read-only ones queueing for the write lock too.
+    """
+    last_run, lock = [time.monotonic()], threading.Lock()
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, _record):
+        if begin:
+            # Autocommit at the driver level; the 'begin' listener below issues BEGIN itself.
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if begin:
+        @event.listens_for(engine, 'begin')
+        def _begin(conn):
+            conn.exec_driver_sql(f"BEGIN {begin}")
+
+    @event.listens_for(engine, 'checkin')
+    def _maintain(dbapi_connection, _record):
+        if dbapi_connection is None or not maintenance_interval:
+            return
+        with lock:
+            if time.monotonic() - last_run[0] < maintenance_interval:
+                return
+            last_run[0] = time.monotonic()
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA optimize")
+            cursor.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            cursor.close()
+        except Exception as e:
+            log.warning("sqlite maintenance skipped: %s", e)
+
+def track_changes(engine, tables, versions="table_versions"):
+    """
+    Bump `versions`.version and .changed_at (UTC) for each of `tables` the first time a transaction
+    on `engine` writes it. The bump commits or rolls back with the write, and covers ORM flushes,
+    ORM bulk statements and Core INSERT/UPDATE/DELETE alike; raw SQL strings are not seen.
+    On PostgreSQL the counter row stays locked until commit, so writers of one table queue there.
+    """
+    tracked = frozenset(tables)
+    bump = text(f"UPDATE {versions} SET version = version + 1, changed_at = :now WHERE name = :name")
+    seed = text(f"INSERT INTO {versions} (name, version, changed_at) VALUES (:name, 1, :now)")
+
+    @event.listens_for(engine, 'after_execute')
+    def _bump(conn, clauseelement, _multiparams, _params, _options, _result):
+        if not getattr(clauseelement, 'is_dml', False):
+            return
+        name = getattr(getattr(clauseelement, 'table', None), 'name', None)
+        bumped = conn.info.setdefault('bumped_tables', set())
+        if name not in tracked or name in bumped:
+            return
+        bumped.add(name)
+        values = {"name": name, "now": datetime.now(timezone.utc).replace(tzinfo=None)}
+        if conn.execute(bump, values).rowcount == 0:
+            conn.execute(seed, values)
+
+    def _reset(conn, *_args):
+        conn.info.pop('bumped_tables', None)
+
+    for name in ('commit', 'rollback', 'rollback_savepoint'):
+        event.listen(engine, name, _reset)
+
 def _resolve_app(app):
     # Prefer explicit app, otherwise use bound app
     return app or _bound_app
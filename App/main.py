@@ -1,38 +1,54 @@
 import os
-from flask import Flask, render_template
-from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
-from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from werkzeug.datastructures import  FileStorage
+import threading
 
-from App.database import init_db
-from App.config import load_config
-
-from App.controllers import (
-    setup_jwt,
-    add_auth_context
-)
-
-from App.views import views, setup_admin
+# Delegate to the app factory and keep a global app context for tests
+from . import create_app as _create_app
+from .database import bind_app
 
 def add_views(app):
+    from App.views import views
     for view in views:
         app.register_blueprint(view)
 
-# Delegate to the app factory and keep a global app context for tests
-from . import create_app as _create_app
-from .database import bind_app
-
-def create_app(config_overrides=None):
-    app = _create_app(config_overrides)
+def add_web(app):
+    """JWT, the template auth context and the blueprints: what serving requests needs, and the CLI doesn't."""
+    from App.controllers import setup_jwt, add_auth_context
+    from App import metrics
 
     # Ensure JWT is configured for tests that call create_access_token
     if not app.config.get("JWT_SECRET_KEY"):
         app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "dev-secret")
     setup_jwt(app)
     add_auth_context(app)
+    metrics.init_web(app)
+    add_views(app)
+
+def _add_web_on_first_request(app):
+    # Flask accepts blueprints until a request has been dispatched, which happens inside the
+    # wsgi_app call this wraps; after that the wrapper takes itself out.
+    wsgi_app, lock, done = app.wsgi_app, threading.Lock(), []
+
+    def first_request(environ, start_response):
+        if not done:
+            with lock:
+                if not done:
+                    add_web(app)
+                    app.wsgi_app = wsgi_app
+                    done.append(True)
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = first_request
+
+def create_app(config_overrides=None):
+    app = _create_app(config_overrides)
+
+    # LAZY_STARTUP (FLASK_LAZY_STARTUP=true) keeps CLI processes from importing the web stack.
+    if app.config.get("LAZY_STARTUP"):
+        _add_web_on_first_request(app)
+    else:
+        add_web(app)
 
     bind_app(app)
     # Push a context so tests calling db.* without context still work
     app.app_context().push()
-    return app
\ No newline at end of file
+    return app
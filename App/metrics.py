@@ -0,0 +1,209 @@
+"""
+SQL statistics for each web request and CLI command, and their Prometheus export.
+
+instrument(engine) times every statement the engine runs into the QueryStats of the current
+scope (a request or a command; nothing is recorded outside one). init_web(app) opens a scope per
+request and, when the request is torn down, observes its latency and SQL figures per endpoint;
+instrument_group(group) does the same per CLI command. export() renders everything for /metrics.
+
+prometheus_client is imported with the first observation, not at startup. With
+PROMETHEUS_MULTIPROC_DIR set (gunicorn_config.py does), each process writes its samples to files
+there and export() sums them across workers. CLI commands are only exported in that mode; a plain
+process would take its samples with it when it exits.
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+import click
+from flask import g, request
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = 500  # a statement slower than this is logged with its request or command
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000, float("inf"))
+DB_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0, float("inf"))
+
+# Set by configure() from the app config: SQL_STATS_LOG, SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD.
+settings = {"log": False, "slow_ms": SLOW_QUERY_MS, "n_plus_one": 0}
+
+_scope = ContextVar("sql_scope", default=None)  # per thread and per greenlet
+_metrics = None
+
+# Bind lists of any length look alike: IN (?, ?, ?) and IN (?) are the same statement shape.
+_PARAM = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\?\))(?:\s*,\s*\(\?\))+", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    return _VALUES_LIST.sub(r"\1", _PARAM_LIST.sub("(?)", " ".join(statement.split())))
+
+
+class QueryStats:
+    """Query count, total and slowest statement time of one scope; statement shapes if `shapes`."""
+
+    def __init__(self, shapes=False):
+        self.count, self.seconds, self.slowest, self.slowest_statement = 0, 0.0, 0.0, None
+        self.shapes = Counter() if shapes else None
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest:
+            self.slowest, self.slowest_statement = seconds, statement
+        if self.shapes is not None:
+            self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """(shape, times) for statement shapes run more than `threshold` times, most first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold] if self.shapes else []
+
+
+def current():
+    """The QueryStats of the running request or command, or None."""
+    return _scope.get()
+
+
+def start():
+    """Open a scope in the current context; returns (stats, token) for finish()."""
+    stats = QueryStats(shapes=settings["n_plus_one"] > 0)
+    return stats, _scope.set(stats)
+
+
+def configure(config):
+    settings.update(log=bool(config.get("SQL_STATS_LOG", False)),
+                    slow_ms=float(config.get("SLOW_QUERY_MS", SLOW_QUERY_MS)),
+                    n_plus_one=int(config.get("N_PLUS_ONE_THRESHOLD", 0)))
+
+
+def instrument(engine):
+    """Time each statement on `engine` into the current scope; outside a scope it costs one lookup."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _scope.get() is not None:
+            context._metrics_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        stats, t0 = _scope.get(), getattr(context, "_metrics_t0", None)
+        if stats is not None and t0 is not None:
+            stats.record(statement, time.perf_counter() - t0)
+
+
+def _prom():
+    """The process's metric objects, created (and prometheus_client imported) on first use."""
+    global _metrics
+    if _metrics is None:
+        from prometheus_client import Counter as PromCounter, Gauge, Histogram
+        _metrics = {
+            "latency": Histogram("app_request_duration_seconds", "Request latency by endpoint",
+                                 ["endpoint", "method", "status"]),
+            "command": Histogram("app_command_duration_seconds", "CLI command run time", ["command", "status"]),
+            "queries": Histogram("app_db_queries", "SQL statements per request or command", ["scope", "name"],
+                                 buckets=QUERY_BUCKETS),
+            "db_seconds": Histogram("app_db_seconds", "Time in SQL per request or command", ["scope", "name"],
+                                    buckets=DB_SECONDS_BUCKETS),
+            "slowest": Gauge("app_db_slowest_statement_seconds", "Slowest statement seen, per request or command",
+                             ["scope", "name"], multiprocess_mode="max"),
+            "n_plus_one": PromCounter("app_db_repeated_statements", "Scopes where one statement shape ran more "
+                                      "than N_PLUS_ONE_THRESHOLD times", ["scope", "name"]),
+        }
+    return _metrics
+
+
+def _report(scope, name, stats, seconds, status, export=True):
+    """Log and (if `export`) observe one finished scope."""
+    repeated = stats.repeated(settings["n_plus_one"]) if settings["n_plus_one"] else []
+    for shape, times in repeated:
+        log.warning("possible N+1 in %s %s: ran %d times: %s", scope, name, times, shape)
+    if stats.slowest * 1000 >= settings["slow_ms"]:
+        log.warning("slow statement in %s %s (%.1f ms): %s", scope, name, stats.slowest * 1000,
+                    " ".join(stats.slowest_statement.split()))
+    if export:
+        m = _prom()
+        if scope == "request":
+            m["latency"].labels(name, request.method, str(status)).observe(seconds)
+        else:
+            m["command"].labels(name, status).observe(seconds)
+        m["queries"].labels(scope, name).observe(stats.count)
+        m["db_seconds"].labels(scope, name).observe(stats.seconds)
+        m["slowest"].labels(scope, name).set(max(stats.slowest, 0.0))
+        if repeated:
+            m["n_plus_one"].labels(scope, name).inc()
+    return (f"{name} {status} {seconds * 1000:.1f} ms, {stats.count} queries in {stats.seconds * 1000:.1f} ms"
+            + (f", slowest {stats.slowest * 1000:.1f} ms" if stats.count else ""))
+
+
+def init_web(app):
+    """Scope every request; observe it per endpoint when it is torn down (after a streamed body, too)."""
+
+    @app.before_request
+    def _open():
+        g._sql_scope = (time.perf_counter(),) + start()
+
+    @app.after_request
+    def _status(response):
+        g._sql_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _close(exc):
+        opened = g.pop("_sql_scope", None)
+        if opened is None:
+            return
+        t0, stats, token = opened
+        _scope.reset(token)
+        status = 500 if exc is not None else g.pop("_sql_status", 500)
+        line = _report("request", request.endpoint or "unmatched", stats, time.perf_counter() - t0, status)
+        if settings["log"]:
+            log.info("%s %s", request.method, line)
+
+
+def instrument_group(group):
+    """Scope each command of a click group; wraps the group's invoke (LazyGroup calls this on load)."""
+    invoke = group.invoke
+
+    def timed_invoke(ctx):
+        t0, (stats, token), status = time.perf_counter(), start(), "error"
+        try:
+            result = invoke(ctx)
+            status = "ok"
+            return result
+        except click.exceptions.Exit as e:
+            status = "ok" if e.exit_code == 0 else "error"
+            raise
+        finally:
+            _scope.reset(token)
+            name = f"{ctx.info_name} {ctx.invoked_subcommand or ''}".strip()
+            line = _report("command", name, stats, time.perf_counter() - t0, status,
+                           export=bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR")))
+            if settings["log"]:
+                click.echo(line, err=True)
+
+    group.invoke = timed_invoke
+    return group
+
+
+def export():
+    """(body, content type) in the Prometheus text format; summed over every worker in multiprocess mode."""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+    _prom()  # so the metric families show up before the first observation
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """gunicorn child_exit: drop a dead worker's live gauge files (its counters stay in the sums)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
@@ -1,7 +1,47 @@
 from datetime import datetime, date
+from sqlalchemy import BigInteger, event, select, func, case
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.expression import FunctionElement
 from ..database import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# ===== SQL helpers =====
+class elapsed_ms(FunctionElement):
+    """Whole milliseconds between two DateTime expressions, computed in SQL."""
+    type = BigInteger()
+    inherit_cache = True
+    name = "elapsed_ms"
+
+@compiles(elapsed_ms)
+def _elapsed_ms_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "CAST(ROUND((julianday(%s) - julianday(%s)) * 86400000.0) AS INTEGER)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw))
+
+@compiles(elapsed_ms, "postgresql")
+def _elapsed_ms_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return "CAST(ROUND(EXTRACT(EPOCH FROM (%s - %s)) * 1000) AS BIGINT)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw))
+
+class greatest(FunctionElement):
+    """The larger of two expressions; SQLite spells it max(a, b)."""
+    inherit_cache = True
+    name = "greatest"
+
+    @property
+    def type(self):
+        return list(self.clauses)[0].type
+
+@compiles(greatest)
+def _greatest_default(element, compiler, **kw):
+    return "max(%s)" % compiler.process(element.clauses, **kw)
+
+@compiles(greatest, "postgresql")
+def _greatest_postgresql(element, compiler, **kw):
+    return "greatest(%s)" % compiler.process(element.clauses, **kw)
+
 # ===== Users =====
 class User(db.Model):
     __tablename__ = "users"
@@ -36,20 +76,86 @@ class User(db.Model):
 # ===== Scheduling =====
 class Shift(db.Model):
     __tablename__ = "shifts"
+    __table_args__ = (
+        db.Index("ix_shifts_start_end", "start_time", "end_time"),
+        db.Index("ix_shifts_user_start", "user_id", "start_time"),
+        db.Index("ix_shifts_template_date", "template_id", "work_date"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     work_date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default="scheduled")  # scheduled, completed, missed
+    template_id = db.Column(db.Integer, db.ForeignKey("shift_templates.id"))  # set when expanded from a template
 
     timelogs = db.relationship("TimeLog", backref="shift", lazy=True)
     exception_flags = db.relationship("ExceptionFlag", backref="shift", lazy=True)
     swap_requests = db.relationship("SwapRequest", backref="shift", lazy=True)
 
+    def get_json(self):
+        return {
+            "id": self.id,
+            "user": self.user.email,
+            "work_date": self.work_date.isoformat(),
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "status": self.status,
+        }
+
+class ShiftTemplate(db.Model):
+    """A recurring pattern expanded into Shift rows: weekly on set weekdays, or an n-on/m-off cycle."""
+    __tablename__ = "shift_templates"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # weekly, cycle
+    weekdays = db.Column(db.String(20))  # weekly: "0,1,2,3,4" (Mon=0)
+    on_days = db.Column(db.Integer)  # cycle: days on ...
+    off_days = db.Column(db.Integer)  # ... then days off, counted from anchor_date
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)  # at or before start_time means the next day
+    anchor_date = db.Column(db.Date, nullable=False)  # first day the pattern applies
+    until_date = db.Column(db.Date)
+    skip_holidays = db.Column(db.Boolean, default=True)
+    active = db.Column(db.Boolean, default=True)
+    expanded_until = db.Column(db.Date)  # horizon already materialized into shifts
+
+    user = db.relationship("App.models.core.User", backref="shift_templates")
+    shifts = db.relationship("Shift", backref="template", lazy=True)
+
+    def get_json(self):
+        return {
+            "id": self.id,
+            "user": self.user.email,
+            "name": self.name,
+            "kind": self.kind,
+            "weekdays": self.weekdays,
+            "on_days": self.on_days,
+            "off_days": self.off_days,
+            "start_time": self.start_time.strftime("%H:%M"),
+            "end_time": self.end_time.strftime("%H:%M"),
+            "anchor_date": self.anchor_date.isoformat(),
+            "until_date": self.until_date.isoformat() if self.until_date else None,
+            "skip_holidays": self.skip_holidays,
+            "active": self.active,
+            "expanded_until": self.expanded_until.isoformat() if self.expanded_until else None,
+        }
+
+class Holiday(db.Model):
+    __tablename__ = "holidays"
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, unique=True, nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+
 # ===== Attendance =====
 class TimeLog(db.Model):
     __tablename__ = "timelogs"
+    __table_args__ = (
+        db.Index("ix_timelogs_clock_in_out", "clock_in", "clock_out"),
+        db.Index("ix_timelogs_user_clock_in", "user_id", "clock_in"),
+        db.Index("ix_timelogs_shift", "shift_id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     shift_id = db.Column(db.Integer, db.ForeignKey("shifts.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -59,7 +165,9 @@ class TimeLog(db.Model):
 
     breaklogs = db.relationship("BreakLog", backref="timelog", lazy=True)
 
-    def worked_minutes(self) -> int:
+    @hybrid_property
+    def net_minutes(self) -> int:
+        """Whole minutes clocked in, minus finished breaks; 0 while still clocked in."""
         if not self.clock_out:
             return 0
         total = (self.clock_out - self.clock_in).total_seconds()
@@ -68,15 +176,57 @@ class TimeLog(db.Model):
                 total -= (b.break_end - b.break_start).total_seconds()
         return max(0, int(total // 60))
 
+    @classmethod
+    def _break_ms(cls):
+        # A correlated subquery, so only the selected timelogs touch breaklogs.
+        return (select(func.coalesce(func.sum(elapsed_ms(BreakLog.break_start, BreakLog.break_end)), 0))
+                .where(BreakLog.timelog_id == cls.id, BreakLog.break_end.is_not(None))
+                .scalar_subquery())
+
+    @net_minutes.expression
+    def net_minutes(cls):
+        # greatest() rather than a CASE, which would run the subquery twice.
+        net_ms = greatest(elapsed_ms(cls.clock_in, cls.clock_out) - cls._break_ms(), 0)
+        return case((cls.clock_out.is_(None), 0), else_=net_ms // 60000)
+
+    @hybrid_property
+    def break_minutes(self) -> int:
+        """Whole minutes of finished breaks."""
+        return int(sum((b.break_end - b.break_start).total_seconds() for b in self.breaklogs if b.break_end) // 60)
+
+    @break_minutes.expression
+    def break_minutes(cls):
+        return cls._break_ms() // 60000
+
+    def worked_minutes(self) -> int:
+        return self.net_minutes
+
 class BreakLog(db.Model):
     __tablename__ = "breaklogs"
+    __table_args__ = (
+        db.Index("ix_breaklogs_timelog", "timelog_id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     timelog_id = db.Column(db.Integer, db.ForeignKey("timelogs.id"), nullable=False)
     break_start = db.Column(db.DateTime, nullable=False)
     break_end = db.Column(db.DateTime)
 
+class KioskPunch(db.Model):
+    """One kiosk punch by its idempotency key; a retried key gets the stored outcome back."""
+    __tablename__ = "kiosk_punches"
+    key = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    kind = db.Column(db.String(10), nullable=False)  # in, out
+    punched_at = db.Column(db.DateTime, nullable=False)
+    timelog_id = db.Column(db.Integer, db.ForeignKey("timelogs.id"))
+    error = db.Column(db.String(120))  # why the punch was refused, if it was
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class ExceptionFlag(db.Model):
     __tablename__ = "exception_flags"
+    __table_args__ = (
+        db.Index("ix_exception_flags_shift", "shift_id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     shift_id = db.Column(db.Integer, db.ForeignKey("shifts.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -84,9 +234,19 @@ class ExceptionFlag(db.Model):
     reason = db.Column(db.String(255))
     detected_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class SweepMark(db.Model):
+    """High-water mark of an incremental background job: everything up to `high_water` is done."""
+    __tablename__ = "sweep_marks"
+    name = db.Column(db.String(40), primary_key=True)
+    high_water = db.Column(db.DateTime, nullable=False)
+
 # ===== Leave =====
 class LeaveRequest(db.Model):
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        db.Index("ix_leave_requests_status_id", "status", "id"),
+        db.Index("ix_leave_requests_requester_id", "requester_id", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     requester_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     approver_id = db.Column(db.Integer, db.ForeignKey("users.id"))
@@ -99,9 +259,26 @@ class LeaveRequest(db.Model):
     requester = db.relationship("App.models.core.User", foreign_keys=[requester_id], backref="leave_requests_made")
     approver = db.relationship("App.models.core.User", foreign_keys=[approver_id], backref="leave_requests_approved")
 
+    def get_json(self):
+        return {
+            "id": self.id,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "type": self.type,
+            "status": self.status,
+            "reason": self.reason,
+            "requester": self.requester.email,
+            "approver": self.approver.email if self.approver else None,
+        }
+
 # ===== Swaps =====
 class SwapRequest(db.Model):
     __tablename__ = "swap_requests"
+    __table_args__ = (
+        db.Index("ix_swap_requests_status_id", "status", "id"),
+        db.Index("ix_swap_requests_from_user_id", "from_user_id", "id"),
+        db.Index("ix_swap_requests_to_user_id", "to_user_id", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     shift_id = db.Column(db.Integer, db.ForeignKey("shifts.id"), nullable=False)
     from_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -112,9 +289,24 @@ class SwapRequest(db.Model):
     from_user = db.relationship("App.models.core.User", foreign_keys=[from_user_id], backref="swap_sent")
     to_user = db.relationship("App.models.core.User", foreign_keys=[to_user_id], backref="swap_received")
 
+    def get_json(self):
+        return {
+            "id": self.id,
+            "shift_id": self.shift_id,
+            "shift_start": self.shift.start_time.isoformat() if self.shift else None,
+            "status": self.status,
+            "note": self.note,
+            "from": self.from_user.email,
+            "to": self.to_user.email,
+        }
+
 # ===== Notifications =====
 class Notification(db.Model):
     __tablename__ = "notifications"
+    __table_args__ = (
+        db.Index("ix_notifications_recipient_created", "recipient_id", "created_at"),
+        db.Index("ix_notifications_status_next", "status", "next_attempt_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     recipient_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     message = db.Column(db.String(255), nullable=False)
@@ -123,5 +315,142 @@ class Notification(db.Model):
     entity_id = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     read = db.Column(db.Boolean, default=False)
+    # Delivery outside the app; in-app notifications are 'sent' as soon as they are stored.
+    status = db.Column(db.String(20), default="sent")  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime)  # pending: not retried before this
+    sent_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(255))
 
     recipient = db.relationship("App.models.core.User", backref="notifications")
+
+    def get_json(self):
+        return {
+            "id": self.id,
+            "message": self.message,
+            "channel": self.channel,
+            "entity_type": self.entity_type,
+            "entity_id": self.entity_id,
+            "created_at": self.created_at.isoformat(),
+            "read": bool(self.read),
+            "status": self.status,
+        }
+
+class DailyAttendance(db.Model):
+    """
+    Per user and work date: shifts rostered/completed/missed, minutes worked and on break, and
+    exception flags. attendance_controller.refresh() recomputes the days each write touches.
+    """
+    __tablename__ = "daily_attendance"
+    __table_args__ = (
+        db.Index("ix_daily_attendance_day", "day"),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    scheduled = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    missed = db.Column(db.Integer, nullable=False, default=0)
+    worked_minutes = db.Column(db.Integer, nullable=False, default=0)
+    break_minutes = db.Column(db.Integer, nullable=False, default=0)
+    exceptions = db.Column(db.Integer, nullable=False, default=0)
+
+    def get_json(self):
+        return {
+            "user_id": self.user_id,
+            "day": self.day.isoformat(),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "missed": self.missed,
+            "worked_minutes": self.worked_minutes,
+            "break_minutes": self.break_minutes,
+            "exceptions": self.exceptions,
+        }
+
+class UnreadCount(db.Model):
+    """Per-user unread notifications, kept in step with every insert and mark-read so badges never COUNT(*)."""
+    __tablename__ = "unread_counts"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+class TableVersion(db.Model):
+    """
+    A change counter per table, bumped by database.track_changes() in every transaction that writes
+    the table; conditional GETs turn it into an ETag without reading the rows themselves.
+    """
+    __tablename__ = "table_versions"
+    TRACKED = ("users", "shifts", "user")  # "user": the login accounts behind /api/users
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime)  # UTC
+
+@event.listens_for(TableVersion.__table__, "after_create")
+def _seed_table_versions(target, connection, **kw):
+    # One row per tracked table up front, so bumping is always a plain UPDATE.
+    connection.execute(target.insert(), [{"name": name, "version": 0} for name in TableVersion.TRACKED])
+
+class Availability(db.Model):
+    """
+    Per staff member and week (keyed by its Monday): bitmaps of the 15-minute slots taken by shifts
+    and by approved leave, and the rostered minutes of shifts starting that week.
+    availability_controller.refresh() recomputes the weeks each write touches.
+    """
+    __tablename__ = "availability"
+    week = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    shifts = db.Column(db.LargeBinary, nullable=False)  # little-endian, bit i = slot i of the week
+    leave = db.Column(db.LargeBinary, nullable=False)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+
+class LeaveDay(db.Model):
+    """One row per day of each approved leave request; leave_controller keeps it in step with decisions."""
+    __tablename__ = "leave_days"
+    __table_args__ = (
+        db.Index("ix_leave_days_leave", "leave_id"),
+    )
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    leave_id = db.Column(db.Integer, db.ForeignKey("leave_requests.id"), primary_key=True)
+
+class LeaveLedger(db.Model):
+    """
+    Append-only leave entitlement postings, in days: accruals (+), debits when a request is approved
+    (-), reversals when it stops being approved (+), and manual adjustments.
+    """
+    __tablename__ = "leave_ledger"
+    __table_args__ = (
+        db.Index("ix_leave_ledger_user_type", "user_id", "type", "id"),
+        db.Index("ix_leave_ledger_leave", "leave_id"),
+        db.Index("ux_leave_ledger_accrual", "period", "type", "user_id", unique=True),  # NULL periods never clash
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    type = db.Column(db.String(20), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # accrual, debit, reversal, adjustment
+    days = db.Column(db.Float, nullable=False)
+    leave_id = db.Column(db.Integer, db.ForeignKey("leave_requests.id"))
+    period = db.Column(db.String(7))  # YYYY-MM, accruals only
+    note = db.Column(db.String(255))
+    posted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_json(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "type": self.type,
+            "kind": self.kind,
+            "days": self.days,
+            "leave_id": self.leave_id,
+            "period": self.period,
+            "note": self.note,
+            "posted_at": self.posted_at.isoformat() if self.posted_at else None,
+        }
+
+class LeaveBalance(db.Model):
+    """
+    Running total of leave_ledger per user and type, updated in the same transaction as every
+    posting. A type is only checked and debited for users who have a row here.
+    """
+    __tablename__ = "leave_balances"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    type = db.Column(db.String(20), primary_key=True)
+    days = db.Column(db.Float, nullable=False, default=0.0)
@@ -0,0 +1,1136 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import pytest
+from datetime import datetime, date, timedelta, timezone
+from sqlalchemy import create_engine, event, exc, func, select, text, update
+
+from App.main import create_app
+from App.database import db, MeteredQueuePool, pool_stats, tune_sqlite
+from App.config import apply_db_profile, pool_size
+from App.models.core import User, Shift, TimeLog, BreakLog, ExceptionFlag, LeaveRequest, SwapRequest, Notification, DailyAttendance, Availability, LeaveDay, LeaveLedger, LeaveBalance
+from App.controllers import create_user, login, update_user, identity_cache, load_identity
+from App.controllers import admin_controller, autofill_controller, conflict_controller, exception_controller, kiosk_controller, notify_controller, template_controller, report_controller, plan_controller, leave_controller, swap_controller, staff_controller, timesheet_controller, attendance_controller, coverage_controller, availability_controller
+
+
+@pytest.fixture(scope="module")
+def app():
+    return create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+
+# Each test gets fresh tables on the module's in-memory database
+@pytest.fixture(autouse=True)
+def roster_db(app):
+    db.create_all()
+    yield
+    db.session.remove()
+    db.drop_all()
+    identity_cache.clear()  # ids are reused by the next test's users
+
+
+def make_staff(name, email, role='staff'):
+    u = User(name=name, email=email, role=role)
+    db.session.add(u); db.session.commit()
+    return u
+
+
+def make_shift(user, start_iso, end_iso, status='scheduled'):
+    start, end = datetime.fromisoformat(start_iso), datetime.fromisoformat(end_iso)
+    sh = Shift(user_id=user.id, work_date=start.date(), start_time=start, end_time=end, status=status)
+    db.session.add(sh); db.session.commit()
+    return sh
+
+
+'''
+    Weekly report
+'''
+
+def test_weekly_report_counts_and_net_minutes():
+    alice = make_staff("alice", "alice@example.com")
+    bob = make_staff("Bob", "bob@example.com")
+    sh = make_shift(alice, "2025-10-01T09:00", "2025-10-01T17:00", status='completed')
+    make_shift(alice, "2025-10-02T09:00", "2025-10-02T17:00", status='missed')
+    make_shift(bob, "2025-10-03T09:00", "2025-10-03T17:00")
+    make_shift(bob, "2025-10-09T09:00", "2025-10-09T17:00")  # outside the week
+    tl = TimeLog(shift_id=sh.id, user_id=alice.id, clock_in=datetime(2025, 10, 1, 9, 0, 30),
+                 clock_out=datetime(2025, 10, 1, 17, 0))
+    db.session.add(tl); db.session.flush()
+    db.session.add(BreakLog(timelog_id=tl.id, break_start=datetime(2025, 10, 1, 12, 0),
+                            break_end=datetime(2025, 10, 1, 12, 30)))
+    db.session.add(BreakLog(timelog_id=tl.id, break_start=datetime(2025, 10, 1, 15, 0)))  # still open
+    db.session.commit()
+
+    report = report_controller.weekly_report("2025-10-01")
+
+    assert report["week_end"] == "2025-10-07"
+    assert [r["name"] for r in report["rows"]] == ["alice", "Bob"]
+    a, b = report["rows"]
+    assert (a["scheduled"], a["completed"], a["missed"]) == (2, 1, 1)
+    assert a["worked_minutes"] == tl.worked_minutes() == 449
+    assert (b["scheduled"], b["completed"], b["missed"], b["worked_minutes"]) == (1, 0, 0, 0)
+
+
+def test_weekly_report_empty_week():
+    assert report_controller.weekly_report("2030-01-01")["rows"] == []
+
+
+'''
+    Indexes
+'''
+
+def test_hot_queries_use_indexes():
+    assert plan_controller.check_query_plans() == {name: [] for name in plan_controller.hot_queries()}
+
+
+'''
+    Leave & swap listing
+'''
+
+def test_list_leave_keyset_pages():
+    alice, boss = make_staff("alice", "alice@example.com"), make_staff("Boss", "boss@example.com", 'supervisor')
+    for day in range(1, 6):
+        db.session.add(LeaveRequest(requester_id=alice.id, approver_id=boss.id if day % 2 else None,
+                                    start_date=date(2025, 10, day), end_date=date(2025, 10, day), type='annual'))
+    db.session.commit()
+
+    first = list(leave_controller.list_leave(limit=2))
+    rest = list(leave_controller.list_leave(after_id=first[-1].id))
+    assert [lr.id for lr in first + rest] == [1, 2, 3, 4, 5]
+    assert rest[0].get_json()["approver"] == "boss@example.com"
+    assert rest[1].get_json()["approver"] is None
+
+
+def test_swaps_api_filters_by_user(app):
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("Bob", "bob@example.com")
+    carol = make_staff("carol", "carol@example.com")
+    for u in (alice, carol, alice):
+        sh = make_shift(u, "2025-10-01T09:00", "2025-10-01T17:00")
+        db.session.add(SwapRequest(shift_id=sh.id, from_user_id=u.id, to_user_id=bob.id if u is alice else alice.id))
+    db.session.commit()
+
+    create_user("bob", "bobpass")
+    headers = {"Authorization": f"Bearer {login('bob', 'bobpass')}"}
+    client = app.test_client()
+    page = client.get("/api/swaps?email=bob@example.com&limit=1", headers=headers).get_json()
+    assert [sr["id"] for sr in page["items"]] == [1] and page["next_after_id"] == 1
+    page = client.get("/api/swaps?email=bob@example.com&limit=1&after_id=1", headers=headers).get_json()
+    assert page["items"][0]["shift_start"] == "2025-10-01T09:00:00"
+    assert [sr["id"] for sr in page["items"]] == [3]
+    assert client.get("/api/swaps?email=nobody@example.com", headers=headers).status_code == 404
+
+
+def test_leave_calendar_counts_each_absent_person_once_per_day(app):
+    for name in ("alice", "bob", "dan"):
+        make_staff(name, f"{name}@example.com")
+    make_staff("carol", "carol@example.com", role="supervisor")
+    def leave(email, first, last, decision="approved"):
+        lr = leave_controller.create_leave(email, first, last, "annual")
+        return leave_controller.decide_leave(lr.id, "carol@example.com", decision) if decision else lr
+    leave("alice@example.com", "2025-10-06", "2025-10-08")
+    leave("bob@example.com", "2025-10-07", "2025-10-07")
+    overlapping = leave("bob@example.com", "2025-10-07", "2025-10-09")
+    leave("carol@example.com", "2025-10-08", "2025-10-08", decision=None)  # pending: not off
+
+    cal = leave_controller.calendar(date(2025, 10, 5), date(2025, 10, 10))
+    assert cal["headcount"] == 4
+    assert [d["absent"] for d in cal["days"]] == [0, 1, 2, 2, 1, 0]
+    assert cal["days"][2] == {"day": "2025-10-07", "absent": 2, "share": 0.5}
+    assert [(lr["email"], lr["start_date"]) for lr in cal["off"]] == \
+        [("alice@example.com", "2025-10-06"), ("bob@example.com", "2025-10-07"), ("bob@example.com", "2025-10-07")]
+
+    leave_controller.decide_leave(overlapping.id, "carol@example.com", "cancelled")
+    staff_only = leave_controller.calendar(date(2025, 10, 8), date(2025, 10, 9), role="staff")
+    assert staff_only["headcount"] == 3 and [d["absent"] for d in staff_only["days"]] == [1, 0]
+    before = sorted((r.day, r.user_id, r.leave_id) for r in db.session.scalars(select(LeaveDay)))
+    assert leave_controller.rebuild_calendar() == len(before) == 4
+    assert sorted((r.day, r.user_id, r.leave_id) for r in db.session.scalars(select(LeaveDay))) == before
+
+    create_user("bob@example.com", "bobpass")
+    bob_headers = {"Authorization": f"Bearer {login('bob@example.com', 'bobpass')}"}
+    assert app.test_client().get("/api/leave/calendar?from=2025-10-06&to=2025-10-06",
+                                 headers=bob_headers).status_code == 403
+    create_user("carol@example.com", "carolpass")
+    headers = {"Authorization": f"Bearer {login('carol@example.com', 'carolpass')}"}
+    res = app.test_client().get("/api/leave/calendar?from=2025-10-06&to=2025-10-06", headers=headers).get_json()
+    assert res["days"] == [{"day": "2025-10-06", "absent": 1, "share": 0.25}]
+    assert app.test_client().get("/api/leave/calendar?from=2025-10-06", headers=headers).status_code == 400
+
+
+def test_leave_ledger_debits_on_approval_and_reverses_on_cancel(app):
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("bob", "bob@example.com")
+    make_staff("carol", "carol@example.com", role="supervisor")
+    assert leave_controller.accrue("2025-09", {"annual": 2.5, "sick": 1}, roles=["staff"]) == 4
+    assert leave_controller.accrue("2025-09", {"annual": 2.5, "sick": 1}, roles=["staff"]) == 0  # rerun: skipped
+    leave_controller.accrue("2025-10", {"annual": 2.5})
+    assert leave_controller.balances(alice.id) == {"annual": 5.0, "sick": 1.0}
+    assert leave_controller.balances(3) == {"annual": 2.5}
+
+    lr = leave_controller.create_leave("alice@example.com", "2025-10-06", "2025-10-09", "annual")
+    leave_controller.decide_leave(lr.id, "carol@example.com", "approved")
+    assert leave_controller.balance(alice.id, "annual") == 1.0
+    with pytest.raises(ValueError, match="Insufficient annual leave"):
+        leave_controller.create_leave("alice@example.com", "2025-10-13", "2025-10-14", "annual")
+    leave_controller.decide_leave(lr.id, "carol@example.com", "cancelled")
+    assert leave_controller.balance(alice.id, "annual") == 5.0
+    assert [e.kind for e in leave_controller.ledger(alice.id, "annual")] == ["accrual", "accrual", "debit", "reversal"]
+
+    # Untracked types (no balance row) are neither checked nor debited.
+    unpaid = leave_controller.create_leave("bob@example.com", "2025-10-01", "2025-10-31", "unpaid")
+    leave_controller.decide_leave(unpaid.id, "carol@example.com", "approved")
+    assert leave_controller.balances(bob.id) == {"annual": 5.0, "sick": 1.0}
+    db.session.execute(LeaveLedger.__table__.update().values(days=3.0).where(LeaveLedger.period == "2025-10"))
+    leave_controller.rebuild_balances()
+    assert leave_controller.balances(bob.id)["annual"] == 5.5
+
+    create_user("alice@example.com", "alicepass"); create_user("carol@example.com", "carolpass")
+    alice_headers = {"Authorization": f"Bearer {login('alice@example.com', 'alicepass')}"}
+    carol_headers = {"Authorization": f"Bearer {login('carol@example.com', 'carolpass')}"}
+    client = app.test_client()
+    assert client.get(f"/api/leave/balances/{alice.id}", headers=alice_headers).get_json()["balances"] == \
+        {"annual": 5.5, "sick": 1.0}
+    assert client.get(f"/api/leave/balances/{bob.id}", headers=alice_headers).status_code == 403
+    assert client.get(f"/api/leave/balances/{bob.id}?history=1", headers=carol_headers).get_json()["balances"] == \
+        {"annual": 5.5, "sick": 1.0}
+
+
+'''
+    Roster view
+'''
+
+def test_view_roster_window_and_filters():
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("Bob", "bob@example.com")
+    make_shift(alice, "2025-09-30T22:00", "2025-10-01T06:00")
+    make_shift(bob, "2025-10-01T09:00", "2025-10-01T17:00", status='completed')
+    make_shift(alice, "2025-10-02T09:00", "2025-10-02T17:00")
+    make_shift(alice, "2025-10-03T09:00", "2025-10-03T17:00")
+
+    window = list(staff_controller.view_roster(date(2025, 10, 1), date(2025, 10, 2)))
+    assert [sh.id for sh in window] == [2, 3]
+    assert [sh.id for sh in staff_controller.view_roster(email="alice@example.com")] == [1, 3, 4]
+    assert [sh.id for sh in staff_controller.view_roster(status='completed')] == [2]
+
+
+def test_roster_api_streams_json(app):
+    alice = make_staff("alice", "alice@example.com")
+    make_shift(alice, "2025-10-01T09:00", "2025-10-01T17:00")
+    make_shift(alice, "2025-10-05T09:00", "2025-10-05T17:00")
+    create_user("bob", "bobpass")
+    headers = {"Authorization": f"Bearer {login('bob', 'bobpass')}"}
+
+    rows = app.test_client().get("/api/roster?from=2025-10-01&to=2025-10-04", headers=headers).get_json()
+    assert rows == [{"id": 1, "user": "alice@example.com", "work_date": "2025-10-01",
+                     "start_time": "2025-10-01T09:00:00", "end_time": "2025-10-01T17:00:00",
+                     "status": "scheduled"}]
+
+
+def test_roster_and_users_answer_conditional_gets_from_table_versions(app):
+    alice = make_staff("alice", "alice@example.com")
+    make_shift(alice, "2025-10-01T09:00", "2025-10-01T17:00")
+    create_user("bob", "bobpass")
+    headers = {"Authorization": f"Bearer {login('bob', 'bobpass')}"}
+    client, url = app.test_client(), "/api/roster?from=2025-10-01&to=2025-10-07"
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "private, no-cache"
+    etag, modified = first.headers["ETag"], first.headers["Last-Modified"]
+    statements = []
+    listener = lambda conn, cursor, sql, *rest: statements.append(sql)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        again = client.get(url, headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert again.status_code == 304 and again.data == b"" and again.headers["ETag"] == etag
+    assert len(statements) == 1 and "table_versions" in statements[0]
+    assert client.get(url, headers={**headers, "If-Modified-Since": modified}).status_code == 304
+    assert client.get(url + "&status=missed", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+    # A rolled-back write leaves the tag alone; committed ones, ORM or Core, and renames change it.
+    db.session.add(Shift(user_id=alice.id, work_date=date(2025, 10, 2), start_time=datetime(2025, 10, 2, 9),
+                         end_time=datetime(2025, 10, 2, 17)))
+    db.session.flush(); db.session.rollback()
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+    db.session.execute(Shift.__table__.insert(), [{"user_id": alice.id, "work_date": date(2025, 10, 2),
+                       "start_time": datetime(2025, 10, 2, 9), "end_time": datetime(2025, 10, 2, 17)}])
+    db.session.commit()
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and len(changed.get_json()) == 2 and changed.headers["ETag"] != etag
+    etag = changed.headers["ETag"]
+    alice.email = "alice@example.org"; db.session.commit()
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 200
+
+    users = client.get("/api/users")
+    assert client.get("/api/users", headers={"If-None-Match": users.headers["ETag"]}).status_code == 304
+    create_user("carol", "carolpass")  # the accounts table, not the roster's users
+    changed = client.get("/api/users", headers={"If-None-Match": users.headers["ETag"]})
+    assert changed.status_code == 200 and changed.headers["ETag"] != users.headers["ETag"]
+    assert "carol" in [u["username"] for u in changed.get_json()]
+
+
+def test_coverage_counts_staff_per_slot_and_role_and_flags_understaffed_runs(app):
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("bob", "bob@example.com")
+    carol = make_staff("carol", "carol@example.com", role="supervisor")
+    dave, erin = make_staff("dave", "dave@example.com"), make_staff("erin", "erin@example.com")
+    make_shift(alice, "2025-10-06T09:00", "2025-10-06T17:00")
+    make_shift(bob, "2025-10-06T12:30", "2025-10-06T20:00")  # counts in the 12:00 slot too
+    make_shift(carol, "2025-10-05T22:00", "2025-10-06T06:00")  # overnight into the window
+    make_shift(dave, "2025-10-06T09:00", "2025-10-06T17:00", status='missed')
+    make_shift(erin, "2025-10-06T09:00", "2025-10-06T17:00")
+    db.session.add(LeaveRequest(requester_id=erin.id, start_date=date(2025, 10, 6), end_date=date(2025, 10, 6),
+                                type="annual", status="approved"))
+    db.session.commit()
+
+    result = coverage_controller.coverage(date(2025, 10, 6), date(2025, 10, 6), 60,
+                                          minimums={"staff": 1, "supervisor": 1, "all": 2})
+    staff_hours = [0] * 9 + [1] * 3 + [2] * 5 + [1] * 3 + [0] * 4
+    assert result["headcount"] == {"staff": staff_hours, "supervisor": [1] * 6 + [0] * 18,
+                                   "all": [a + b for a, b in zip(staff_hours, [1] * 6 + [0] * 18)]}
+    runs = [(g["role"], g["start"][11:16], g["end"][11:16], g["staffed"]) for g in result["understaffed"]]
+    assert runs == [("all", "00:00", "12:00", 0), ("all", "17:00", "00:00", 0),
+                    ("staff", "00:00", "09:00", 0), ("staff", "20:00", "00:00", 0),
+                    ("supervisor", "06:00", "00:00", 0)]
+    assert coverage_controller.coverage(date(2025, 10, 6), date(2025, 10, 7), roles=["hr"],
+                                        minimums={"hr": 1})["understaffed"][0]["end"] == "2025-10-08T00:00:00"
+
+    create_user("dave@example.com", "davepass")
+    dave_headers = {"Authorization": f"Bearer {login('dave@example.com', 'davepass')}"}
+    assert app.test_client().get("/api/coverage?from=2025-10-06&to=2025-10-06",
+                                 headers=dave_headers).status_code == 403
+    create_user("carol@example.com", "carolpass")
+    headers = {"Authorization": f"Bearer {login('carol@example.com', 'carolpass')}"}
+    res = app.test_client().get("/api/coverage?from=2025-10-06&to=2025-10-06&slot=60&role=supervisor&min=supervisor:2",
+                                headers=headers).get_json()
+    assert res["headcount"]["supervisor"] == [1] * 6 + [0] * 18 and len(res["understaffed"]) == 1
+    assert app.test_client().get("/api/coverage?from=2025-10-06&to=2025-10-06&min=staff",
+                                 headers=headers).status_code == 400
+
+
+'''
+    Bulk import
+'''
+
+def test_import_shifts_reports_bad_rows_and_keeps_the_rest():
+    make_staff("alice", "alice@example.com")
+    make_staff("Boss", "boss@example.com", 'supervisor')
+    rows = enumerate([
+        {"email": "alice@example.com", "start": "2025-10-01T09:00", "end": "2025-10-01T17:00"},
+        {"email": "boss@example.com", "start": "2025-10-01T09:00", "end": "2025-10-01T17:00"},
+        {"email": "alice@example.com", "start": "2025-10-02T17:00", "end": "2025-10-02T09:00"},
+        {"email": "alice@example.com", "start": "2025-10-03T09:00"},
+        {"email": "alice@example.com", "start": "2025-10-04T09:00", "end": "2025-10-04T17:00"},
+    ], start=1)
+
+    inserted, errors = admin_controller.import_shifts(rows, batch_size=1)
+
+    assert inserted == 2
+    assert [row for row, _ in errors] == [2, 3, 4]
+    assert [sh.work_date for sh in Shift.query.order_by(Shift.id)] == [date(2025, 10, 1), date(2025, 10, 4)]
+
+
+def test_import_shifts_reports_unparsable_file_rows_by_line(tmp_path):
+    make_staff("alice", "alice@example.com")
+    ndjson = tmp_path / "shifts.ndjson"
+    ndjson.write_text('{"email": "alice@example.com", "start": "2025-10-01T09:00", "end": "2025-10-01T17:00"}\n'
+                      '{"email": "alice@example.com", "start": \n'
+                      '\n'
+                      '{"email": "alice@example.com", "start": "2025-10-02T09:00", "end": "2025-10-02T17:00"}\n')
+    inserted, errors = admin_controller.import_shifts(admin_controller.read_shift_file(str(ndjson)))
+    assert inserted == 2 and [row for row, _ in errors] == [2] and errors[0][1].startswith("Invalid JSON")
+
+    table = tmp_path / "shifts.csv"
+    table.write_text("email,start,end\n"
+                     "alice@example.com,2025-10-03T09:00,2025-10-03T17:00\n"
+                     "alice@example.com,10/04/2025 09:00,2025-10-04T17:00\n"
+                     "alice@example.com,2025-10-05T09:00\n"
+                     "alice@example.com,2025-10-06T09:00,2025-10-06T17:00\n")
+    inserted, errors = admin_controller.import_shifts(admin_controller.read_shift_file(str(table)))
+    assert inserted == 2 and [row for row, _ in errors] == [3, 4] and errors[1][1] == "Missing end"
+
+
+def test_import_shifts_streams_json_arrays_and_looks_up_staff_per_batch(tmp_path):
+    make_staff("alice", "alice@example.com"); make_staff("boss", "boss@example.com", role="supervisor")
+    day = date(2025, 1, 1)
+    rows = [{"email": "boss@example.com" if i % 500 == 7 else "alice@example.com",
+             "start": f"{day + timedelta(days=i)}T09:00", "end": f"{day + timedelta(days=i)}T17:00"}
+            for i in range(2000)]  # well over one 64 KiB read
+    table = tmp_path / "shifts.json"
+    table.write_text(" [\n" + ",\n".join(json.dumps(r) for r in rows) + "\n] \n")
+    statements = []
+    listener = lambda conn, cursor, sql, *rest: statements.append(sql)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    inserted, errors = admin_controller.import_shifts(admin_controller.read_shift_file(str(table)), batch_size=500)
+    event.remove(db.engine, "before_cursor_execute", listener)
+    assert inserted == 1996 and errors == [(n, "Staff not found: boss@example.com") for n in (8, 508, 1008, 1508)]
+    assert sum("FROM users" in sql and " IN " in sql for sql in statements) == 4
+
+    for bad in ('[{"email": "alice@example.com"} {"email": "x"}]', '[{"email": "alice@example.com"},', '{"rows": []}'):
+        table.write_text(bad)
+        with pytest.raises(ValueError):
+            admin_controller.import_shifts(admin_controller.read_shift_file(str(table)))
+
+
+'''
+    Shift templates
+'''
+
+def test_cycle_template_dates():
+    alice = make_staff("alice", "alice@example.com")
+    tpl = template_controller.create_template("alice@example.com", "4on4off", "07:00", "19:00",
+                                              "2025-10-01", cycle="4/4")
+    days = template_controller.occurrence_dates(tpl, date(2025, 10, 3), date(2025, 10, 17))
+    assert [d.day for d in days] == [3, 4, 9, 10, 11, 12, 17]
+
+
+def test_template_reexpansion_only_touches_future_unworked_shifts():
+    alice = make_staff("alice", "alice@example.com")
+    tpl = template_controller.create_template("alice@example.com", "Weekdays", "09:00", "17:00",
+                                              "2025-10-06", weekdays="mon-fri")
+    template_controller.add_holiday("2025-10-10", "Founders day")
+    now = datetime(2025, 10, 6, 8, 0)
+    assert template_controller.expand_template(tpl.id, date(2025, 10, 12), now) == \
+        {"inserted": 4, "updated": 0, "deleted": 0, "conflicts": []}
+
+    monday = Shift.query.filter_by(template_id=tpl.id).order_by(Shift.start_time).first()
+    ids_before = {sh.id for sh in Shift.query.filter_by(template_id=tpl.id)}
+    db.session.add(TimeLog(shift_id=monday.id, user_id=alice.id, clock_in=monday.start_time))
+    db.session.commit()
+
+    template_controller.update_template(tpl.id, start="10:00", weekdays="mon-thu")
+    assert template_controller.expand_template(tpl.id, date(2025, 10, 12), now) == \
+        {"inserted": 0, "updated": 3, "deleted": 0, "conflicts": []}
+    shifts = Shift.query.filter_by(template_id=tpl.id).order_by(Shift.start_time).all()
+    assert {sh.id for sh in shifts} == ids_before
+    assert [sh.start_time.hour for sh in shifts] == [9, 10, 10, 10]
+
+
+def test_template_expansion_skips_dates_that_clash_with_shifts_or_leave():
+    alice = make_staff("alice", "alice@example.com")
+    make_staff("Boss", "boss@example.com", 'supervisor')
+    other = make_shift(alice, "2025-10-07T12:00", "2025-10-07T20:00")
+    lr = leave_controller.create_leave("alice@example.com", "2025-10-09", "2025-10-09", "annual")
+    leave_controller.decide_leave(lr.id, "boss@example.com", "approved")
+    tpl = template_controller.create_template("alice@example.com", "Weekdays", "09:00", "17:00",
+                                              "2025-10-06", weekdays="mon-fri")
+    counts = template_controller.expand_template(tpl.id, date(2025, 10, 12), datetime(2025, 10, 6, 8, 0))
+    assert (counts["inserted"], [day for day, _ in counts["conflicts"]]) == (3, [date(2025, 10, 7), date(2025, 10, 9)])
+    assert f"shift #{other.id}" in counts["conflicts"][0][1] and "leave" in counts["conflicts"][1][1]
+    assert [sh.work_date.day for sh in Shift.query.filter_by(template_id=tpl.id).order_by(Shift.work_date)] == [6, 8, 10]
+    assert list(conflict_controller.audit(datetime(2025, 10, 6), datetime(2025, 10, 13))) == []
+
+    # Moving the template's shifts is checked too: the clashing date keeps its old time.
+    make_shift(alice, "2025-10-08T19:00", "2025-10-08T23:00")
+    template_controller.update_template(tpl.id, start="13:00", end="21:00")
+    counts = template_controller.expand_template(tpl.id, date(2025, 10, 12), datetime(2025, 10, 6, 8, 0))
+    assert (counts["updated"], [day.day for day, _ in counts["conflicts"]]) == (2, [7, 8, 9])
+    assert [sh.start_time.hour for sh in Shift.query.filter_by(template_id=tpl.id).order_by(Shift.work_date)] == [13, 9, 13]
+
+
+'''
+    Conflicts
+'''
+
+def test_interval_index_overlaps():
+    at = lambda h: datetime(2025, 10, 1, h)
+    idx = conflict_controller.IntervalIndex([(at(0), at(23), 'shift', 1), (at(2), at(4), 'shift', 2)])
+    idx.add(at(10), at(12), 'shift', 3)
+    assert idx.overlapping(at(10), at(11))[3] == 3
+    assert idx.overlapping(at(10), at(11), ignore=('shift', 3))[3] == 1
+    assert conflict_controller.IntervalIndex([(at(2), at(4), 'shift', 2)]).overlapping(at(4), at(6)) is None
+
+    # Against a plain scan, through a run of adds and removes.
+    rng, base = random.Random(7), datetime(2025, 10, 1)
+    when = lambda q: base + timedelta(minutes=15 * q)
+    live = [(when(a), when(a + rng.randint(1, 40)), 'shift', k) for k, a in enumerate(rng.sample(range(500), 60))]
+    idx = conflict_controller.IntervalIndex(live)
+    for k in range(60, 400):
+        if live and rng.random() < 0.4:
+            idx.remove(*live.pop(rng.randrange(len(live))))
+        else:
+            a = rng.randrange(500)
+            live.append((when(a), when(a + rng.randint(1, 40)), 'shift', k)); idx.add(*live[-1])
+        a = rng.randrange(500)
+        lo, hi = when(a), when(a + rng.randint(1, 40))
+        assert sorted(idx.overlaps(lo, hi)) == sorted(it for it in live if it[0] < hi and it[1] > lo)
+    assert sorted(idx.items) == sorted(live) and [it[0] for it in idx.items] == sorted(it[0] for it in live)
+
+
+def test_assign_and_swap_respect_roster_and_leave():
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("Bob", "bob@example.com")
+    admin_controller.assign_shift("alice@example.com", "2025-10-01T09:00", "2025-10-01T17:00")
+    with pytest.raises(conflict_controller.ConflictError):
+        admin_controller.assign_shift("alice@example.com", "2025-10-01T16:00", "2025-10-01T20:00")
+    admin_controller.assign_shift("alice@example.com", "2025-10-01T17:00", "2025-10-01T20:00")
+
+    db.session.add(LeaveRequest(requester_id=bob.id, start_date=date(2025, 10, 1), end_date=date(2025, 10, 1),
+                                type='annual', status='approved'))
+    db.session.add(SwapRequest(shift_id=1, from_user_id=alice.id, to_user_id=bob.id))
+    db.session.commit()
+    with pytest.raises(conflict_controller.ConflictError, match="leave"):
+        swap_controller.approve_swap(1, "bob@example.com", "approved")
+    assert db.session.get(Shift, 1).user_id == alice.id
+
+
+def test_swap_candidates_skip_busy_on_leave_unrested_and_capped_staff(app):
+    names = ["alice", "bob", "carol", "dave", "erin", "frank", "gina", "ivan"]
+    for name in names:
+        make_staff(name, f"{name}@example.com")
+    make_staff("hank", "hank@example.com", role="supervisor")
+    assign = lambda who, start, end: admin_controller.assign_shift(f"{who}@example.com", start, end)
+    target = assign("alice", "2025-10-08T09:00", "2025-10-08T17:00")
+    assign("bob", "2025-10-08T12:00", "2025-10-08T20:00")  # overlaps
+    assign("carol", "2025-10-07T18:00", "2025-10-08T02:00")  # 7 h rest before it
+    for day in (6, 7, 9, 10):  # 36 h already that week
+        assign("erin", f"2025-10-{day:02d}T08:00", f"2025-10-{day:02d}T17:00")
+    assign("frank", "2025-10-07T09:00", "2025-10-07T17:00")
+    assign("ivan", "2025-10-07T20:00", "2025-10-07T22:00")  # exactly 11 h rest
+    lr = leave_controller.create_leave("dave@example.com", "2025-10-08", "2025-10-08", "annual")
+    leave_controller.decide_leave(lr.id, "hank@example.com", "approved")
+
+    found = availability_controller.candidates(target.id)
+    assert [(c["email"], c["week_minutes"]) for c in found] == \
+        [("gina@example.com", 0), ("ivan@example.com", 120), ("frank@example.com", 480)]
+    assert "erin@example.com" in [c["email"] for c in availability_controller.candidates(target.id, max_hours=44)]
+
+    # Leave and swaps move the bitmaps along; a rebuild lands on the same rows.
+    lr = leave_controller.create_leave("gina@example.com", "2025-10-08", "2025-10-09", "annual")
+    leave_controller.decide_leave(lr.id, "hank@example.com", "approved")
+    sr = swap_controller.request_swap("alice@example.com", target.id, "ivan@example.com")
+    swap_controller.approve_swap(sr.id, "hank@example.com", "approved")
+    assert [c["email"] for c in availability_controller.candidates(target.id)] == ["alice@example.com", "frank@example.com"]
+    snapshot = lambda: sorted((r.week, r.user_id, r.shifts, r.leave, r.minutes)
+                              for r in db.session.scalars(select(Availability)))
+    incremental = snapshot()
+    db.session.execute(Availability.__table__.delete()); db.session.commit()
+    availability_controller.rebuild()
+    assert snapshot() == incremental
+    make_shift(User.query.get(1), "2025-10-09T09:00", "2025-10-09T09:00")  # zero-length: no slots, no hours
+    availability_controller.rebuild()
+    assert snapshot() == incremental
+
+    make_staff("ina", "ina@example.com", role="hr")
+    create_user("ina@example.com", "inapass"); create_user("hank@example.com", "hankpass")
+    client, url = app.test_client(), f"/api/shifts/{target.id}/candidates"
+    hr_headers = {"Authorization": f"Bearer {login('ina@example.com', 'inapass')}"}
+    assert client.get(url, headers=hr_headers).status_code == 403
+    hank_headers = {"Authorization": f"Bearer {login('hank@example.com', 'hankpass')}"}
+    assert [c["email"] for c in client.get(url, headers=hank_headers).get_json()["items"]] == \
+        ["alice@example.com", "frank@example.com"]
+
+    db.session.execute(Availability.__table__.delete()); db.session.commit()
+    with pytest.raises(ValueError, match="rebuild-availability"):
+        availability_controller.candidates(target.id)
+
+
+def test_import_rejects_rows_overlapping_earlier_rows():
+    make_staff("alice", "alice@example.com")
+    rows = enumerate([
+        {"email": "alice@example.com", "start": "2025-10-01T09:00", "end": "2025-10-01T17:00"},
+        {"email": "alice@example.com", "start": "2025-10-01T12:00", "end": "2025-10-01T20:00"},
+        {"email": "alice@example.com", "start": "2025-10-01T17:00", "end": "2025-10-01T20:00"},
+    ], start=1)
+    inserted, errors = admin_controller.import_shifts(rows)
+    assert inserted == 2 and [row for row, _ in errors] == [2]
+
+    again = enumerate([{"email": "alice@example.com", "start": "2025-10-01T10:00", "end": "2025-10-01T11:00"}])
+    assert admin_controller.import_shifts(again)[0] == 0
+    assert [uid for uid, _, _ in conflict_controller.audit(datetime(2025, 10, 1), datetime(2025, 10, 2))] == []
+
+
+def test_audit_reports_each_clash_once_including_shifts_past_the_window():
+    alice = make_staff("alice", "alice@example.com")
+    late = make_shift(alice, "2025-10-01T20:00", "2025-10-02T04:00")
+    early = make_shift(alice, "2025-10-02T01:00", "2025-10-02T09:00")  # starts after the window
+    found = list(conflict_controller.audit(datetime(2025, 10, 1), datetime(2025, 10, 2)))
+    assert [(it[3], hit[3]) for _, it, hit in found] == [(early.id, late.id)]
+    found = list(conflict_controller.audit(datetime(2025, 10, 1), datetime(2025, 10, 3)))
+    assert [(it[3], hit[3]) for _, it, hit in found] == [(early.id, late.id)]
+
+
+'''
+    Autofill
+'''
+
+def test_autofill_respects_leave_rest_and_weekly_cap():
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("Bob", "bob@example.com")
+    make_staff("Boss", "boss@example.com", 'supervisor')
+    db.session.add(LeaveRequest(requester_id=bob.id, start_date=date(2025, 10, 7), end_date=date(2025, 10, 7),
+                                type='annual', status='approved'))
+    db.session.commit()
+    make_shift(alice, "2025-10-06T09:00", "2025-10-06T17:00")
+    # One person 09:00-17:00 every day, Monday 6 to Sunday 12 October.
+    demand = [(datetime(2025, 10, d, 9), datetime(2025, 10, d, 17), 1) for d in range(6, 13)]
+
+    plan = autofill_controller.autofill(demand, max_week_hours=24, time_budget=0.1)
+
+    by_day = {start.day: uid for uid, start, end in plan["shifts"]}
+    assert 6 not in by_day and by_day[7] == alice.id
+    assert all(uid in (alice.id, bob.id) for uid in by_day.values())
+    assert sum(uid == alice.id for uid in by_day.values()) == 2  # 8h already rostered + 2 x 8h
+    assert plan["uncovered_slots"] == 32 * (6 - len(by_day))
+
+    assert autofill_controller.apply_plan(plan["shifts"]) == len(by_day)
+    assert [uid for uid, _, _ in conflict_controller.audit(datetime(2025, 10, 6), datetime(2025, 10, 13))] == []
+
+
+'''
+    Exception sweep
+'''
+
+def test_exception_sweep_flags_once_and_marks_no_shows_missed():
+    alice = make_staff("alice", "alice@example.com")
+    at = lambda h, m=0: datetime(2025, 10, 1, h, m)
+    late, early, over, absent, fine = (make_shift(alice, f"2025-10-0{d}T09:00", f"2025-10-0{d}T17:00")
+                                       for d in range(1, 6))
+    later = make_shift(alice, "2025-10-06T09:00", "2025-10-06T17:00")
+    db.session.add_all([
+        TimeLog(shift_id=late.id, user_id=alice.id, clock_in=at(9, 20), clock_out=at(17)),
+        TimeLog(shift_id=early.id, user_id=alice.id, clock_in=late.start_time.replace(day=2),
+                clock_out=datetime(2025, 10, 2, 16, 0)),
+        TimeLog(shift_id=over.id, user_id=alice.id, clock_in=datetime(2025, 10, 3, 9)),  # never clocked out
+        TimeLog(shift_id=fine.id, user_id=alice.id, clock_in=datetime(2025, 10, 5, 9, 3),
+                clock_out=datetime(2025, 10, 5, 17, 10)),
+    ])
+    db.session.commit()
+
+    counts = exception_controller.sweep_exceptions(now=datetime(2025, 10, 6, 12), batch=timedelta(days=2))
+    assert {k: counts[k] for k in ("late", "early", "overtime", "no_show", "missed")} == \
+        {"late": 1, "early": 1, "overtime": 1, "no_show": 1, "missed": 1}
+    flags = {(f.shift_id, f.kind): f.reason for f in ExceptionFlag.query}
+    assert flags == {(late.id, 'late'): "clocked in 20 min late", (early.id, 'early'): "clocked out 60 min early",
+                     (over.id, 'overtime'): "still clocked in after shift end", (absent.id, 'no_show'): "no clock-in"}
+    assert db.session.get(Shift, absent.id).status == 'missed'
+
+    # Re-running covers only the newly ended shift.
+    counts = exception_controller.sweep_exceptions(now=datetime(2025, 10, 7))
+    assert (counts["no_show"], counts["late"]) == (1, 0) and ExceptionFlag.query.count() == 5
+    assert db.session.get(Shift, later.id).status == 'missed'
+
+
+'''
+    Kiosk punches
+'''
+
+def test_record_punches_in_out_and_refusals():
+    alice, bob = make_staff("alice", "alice@example.com"), make_staff("Bob", "bob@example.com")
+    sh = make_shift(alice, "2025-10-01T09:00", "2025-10-01T17:00")
+    punch = lambda key, email, kind, at: kiosk_controller.parse_punch(
+        {"key": key, "email": email, "type": kind, "at": at})
+    results = kiosk_controller.record_punches([
+        punch("k2", "alice@example.com", "out", "2025-10-01T17:02"),
+        punch("k1", "alice@example.com", "in", "2025-10-01T08:55"),
+        punch("k3", "bob@example.com", "in", "2025-10-01T08:55"),
+        punch("k4", "bob@example.com", "out", "2025-10-01T17:00"),
+    ])
+    assert [(r["status"], r["error"]) for r in results] == [
+        ('ok', None), ('ok', None), ('refused', "No shift to clock in to"), ('refused', "Not clocked in")]
+    tl = TimeLog.query.one()
+    assert (tl.shift_id, tl.source, tl.clock_out) == (sh.id, 'kiosk', datetime(2025, 10, 1, 17, 2))
+    assert db.session.get(Shift, sh.id).status == 'completed'
+
+    again = kiosk_controller.record_punches([punch("k1", "alice@example.com", "in", "2025-10-01T08:55")])
+    assert again == [{"key": "k1", "status": 'duplicate', "timelog_id": tl.id, "error": None}]
+    assert TimeLog.query.count() == 1
+
+
+def test_punch_endpoint_group_commits(app, monkeypatch):
+    make_staff("alice", "alice@example.com")
+    admin_controller.assign_shift("alice@example.com", "2025-10-01T09:00", "2025-10-01T17:00")
+    create_user("bob", "bobpass")
+    headers = {"Authorization": f"Bearer {login('bob', 'bobpass')}"}
+    client = app.test_client()
+
+    body = [{"key": "a", "email": "alice@example.com", "type": "in", "at": "2025-10-01T09:01"},
+            {"key": "a", "email": "alice@example.com", "type": "in", "at": "2025-10-01T09:01"}]
+    res = client.post("/api/punches", json=body, headers=headers).get_json()["results"]
+    assert [r["status"] for r in res] == ['ok', 'ok'] and res[0]["timelog_id"] == res[1]["timelog_id"]
+    res = client.post("/api/punches", json=body[0], headers=headers).get_json()["results"]
+    assert res[0]["status"] == 'duplicate' and TimeLog.query.count() == 1
+    assert client.post("/api/punches", json={"punches": [{"key": "b"}]}, headers=headers).status_code == 400
+    assert client.post("/api/punches", json={"key": "b", "email": "alice@example.com", "type": "out", "at": 5},
+                       headers=headers).status_code == 400
+
+    # A stuck flusher: the request gives up with a 503 and the punch can be retried under its key.
+    gate = threading.Event()
+    monkeypatch.setattr(kiosk_controller, "record_punches", lambda punches: gate.wait(5) and [
+        {"key": p["key"], "status": 'refused', "timelog_id": None, "error": "late"} for p in punches])
+    monkeypatch.setattr(kiosk_controller.punch_queue(app), "timeout", 0.05)
+    res = client.post("/api/punches", json={**body[0], "key": "c"}, headers=headers)
+    gate.set()
+    assert res.status_code == 503 and res.headers["Retry-After"] == "1"
+
+
+def test_parse_punch_normalises_aware_times():
+    raw = {"key": "k", "email": "a@example.com", "type": "in"}
+    aware = datetime(2025, 10, 1, 9, 0, tzinfo=timezone(timedelta(hours=2)))
+    at = kiosk_controller.parse_punch({**raw, "at": aware.isoformat()})["at"]
+    assert at.tzinfo is None and at == aware.astimezone().replace(tzinfo=None)
+    for bad in (5, ["2025-10-01"], "not a date"):
+        with pytest.raises(ValueError):
+            kiosk_controller.parse_punch({**raw, "at": bad})
+
+
+'''
+    Notifications
+'''
+
+def test_fan_out_to_role_and_retry_failed_delivery(monkeypatch):
+    for i in range(3):
+        make_staff(f"Staff {i}", f"staff{i}@example.com")
+    make_staff("Boss", "boss@example.com", 'supervisor')
+
+    assert notify_controller.fan_out("Roster published", role='staff') == (3, [])
+    assert Notification.query.filter_by(status='sent').count() == 3
+    with pytest.raises(ValueError, match="nobody@example.com"):
+        notify_controller.fan_out("Hi", emails=["boss@example.com", "nobody@example.com"])
+
+    calls = []
+    def flaky(email, message):
+        calls.append(email)
+        if email == "staff1@example.com": raise ConnectionError("gateway down")
+    monkeypatch.setitem(notify_controller.SENDERS, 'email', flaky)
+    count, ids = notify_controller.fan_out("Shift moved", channel='email', emails=["staff0@example.com", "staff1@example.com"])
+    assert count == 2 and len(ids) == 2
+
+    now = datetime(2025, 10, 1, 9)
+    counts = notify_controller.deliver(ids, now, max_attempts=2, backoff=60)
+    assert (counts["sent"], counts["failed"], counts["retry"]) == (1, 0, [(60, ids[1])])
+    retry = db.session.get(Notification, ids[1])
+    assert (retry.status, retry.attempts, retry.next_attempt_at) == ('pending', 1, now + timedelta(seconds=60))
+
+    assert notify_controller.deliver_pending(now) == {"sent": 0, "failed": 0, "retry": 0}  # not due yet
+    assert notify_controller.deliver_pending(now + timedelta(minutes=1), max_attempts=2) == {"sent": 0, "failed": 1, "retry": 0}
+    assert db.session.get(Notification, ids[1]).last_error == "gateway down"
+    assert calls == ["staff0@example.com", "staff1@example.com", "staff1@example.com"]
+    with pytest.raises(ValueError, match="fax"):
+        notify_controller.fan_out("Hi", channel='fax', role='staff')
+
+
+def test_fan_out_endpoint_is_for_managers_and_known_channels(app):
+    make_staff("Staff 0", "staff0@example.com")
+    make_staff("Hana", "hana@x.io", 'hr')
+    create_user("staff0@example.com", "staffpass")
+    create_user("hana@x.io", "hanapass")
+    as_staff = {"Authorization": f"Bearer {login('staff0@example.com', 'staffpass')}"}
+    as_hr = {"Authorization": f"Bearer {login('hana@x.io', 'hanapass')}"}
+    client, body = app.test_client(), {"message": "Rota is out", "all": True}
+    assert client.post("/api/notifications", json=body, headers=as_staff).status_code == 403
+    assert client.post("/api/notifications", json={**body, "channel": "fax"}, headers=as_hr).status_code == 400
+    res = client.post("/api/notifications", json=body, headers=as_hr)
+    assert res.status_code == 202 and res.get_json() == {"count": 2, "queued": 0}
+    assert Notification.query.count() == 2
+
+
+def test_deliver_claims_rows_so_concurrent_calls_send_once(monkeypatch):
+    make_staff("Staff 0", "staff0@example.com")
+    _, ids = notify_controller.fan_out("Shift moved", channel='email', emails=["staff0@example.com"])
+    now = datetime(2025, 10, 1, 9)
+
+    calls, overlapping = [], []
+    def sender(email, message):
+        calls.append(email)
+        overlapping.append(notify_controller.deliver(ids, now))  # a second worker given the same ids
+    monkeypatch.setitem(notify_controller.SENDERS, 'email', sender)
+    assert notify_controller.deliver(ids, now)["sent"] == 1
+    assert calls == ["staff0@example.com"] and overlapping == [{"sent": 0, "failed": 0, "retry": []}]
+
+    # A claim left by a sender that died is picked up again once its lease has run out.
+    db.session.execute(update(Notification).where(Notification.id == ids[0])
+                       .values(status='sending', next_attempt_at=now))
+    db.session.commit()
+    assert notify_controller.deliver_pending(now - timedelta(seconds=1))["sent"] == 0
+    monkeypatch.setitem(notify_controller.SENDERS, 'email', lambda email, message: calls.append(email))
+    assert notify_controller.deliver_pending(now)["sent"] == 1 and len(calls) == 2
+
+
+def test_inbox_pages_by_cursor_and_keeps_unread_counter(app):
+    alice = make_staff("alice", "alice@example.com")
+    make_staff("Bob", "bob@example.com")
+    for i in range(3):
+        notify_controller.fan_out(f"Update {i}", emails=["alice@example.com"])
+    notify_controller.send_notification("alice@example.com", "Direct")
+    notify_controller.fan_out("Everyone")
+    assert notify_controller.unread_count(alice.id) == 5
+
+    first = notify_controller.inbox(alice.id, limit=3)
+    rest = notify_controller.inbox(alice.id, first[-1].created_at, first[-1].id, limit=3)
+    assert [n.message for n in first + rest] == ["Everyone", "Direct", "Update 2", "Update 1", "Update 0"]
+
+    assert notify_controller.mark_read(alice.id, [first[0].id, first[1].id]) == 3
+    assert notify_controller.mark_read(alice.id, [first[0].id]) == 3  # already read
+    assert [n.message for n in notify_controller.inbox(alice.id, unread_only=True)] == \
+        ["Update 2", "Update 1", "Update 0"]
+
+    make_staff("Boss", "boss@x.io", 'supervisor')
+    create_user("bob@example.com", "bobpass")
+    create_user("boss@x.io", "bosspass")
+    headers = {"Authorization": f"Bearer {login('bob@example.com', 'bobpass')}"}
+    as_boss = {"Authorization": f"Bearer {login('boss@x.io', 'bosspass')}"}
+    client = app.test_client()
+    # Staff see their own inbox; naming someone else's takes a supervisor or admin.
+    assert client.get("/api/notifications/unread", headers=headers).get_json() == {"unread": 1}
+    assert client.get("/api/notifications?email=alice@example.com", headers=headers).status_code == 403
+    assert client.post("/api/notifications/read", json={"email": "alice@example.com", "all": True},
+                       headers=headers).status_code == 403
+    res = client.post("/api/notifications/read", json={"email": "alice@example.com", "all": True}, headers=as_boss)
+    assert res.get_json() == {"unread": 0}
+    res = client.post("/api/notifications/read", json={"all": True}, headers=headers)
+    assert res.get_json() == {"unread": 0} and notify_controller.unread_count(alice.id) == 0
+
+
+'''
+    JWT identity cache
+'''
+
+def test_identity_lookups_are_cached_until_the_user_changes(app):
+    bob_id = create_user("bob", "bobpass").id
+    identity_cache.clear()
+    db.session.expunge_all()
+    statements = []
+    count = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        with app.test_request_context():
+            assert load_identity(bob_id) is load_identity(bob_id)  # one SELECT, then the request memo
+        db.session.expunge_all()
+        with app.test_request_context():
+            assert load_identity(bob_id).username == "bob"  # served from the process cache
+        assert len(statements) == 1
+
+        update_user(bob_id, "robert")
+        db.session.expunge_all()
+        with app.test_request_context():
+            assert load_identity(bob_id).username == "robert"
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+
+'''
+    Startup
+'''
+
+def test_lazy_startup_defers_the_web_stack_until_the_first_request():
+    code = ("import sys, wsgi\n"
+            "print(sorted(m for m in ('alembic', 'flask_admin', 'flask_jwt_extended', 'App.views', 'App.cli.roster')"
+            " if m in sys.modules))\n"
+            "print(wsgi.app.test_client().get('/health').status_code)")
+    env = dict(os.environ, FLASK_LAZY_STARTUP="true", FLASK_SQLALCHEMY_DATABASE_URI="sqlite://")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.split("\n")[:2] == ["[]", "200"]
+
+
+def test_flask_db_upgrade_builds_an_empty_sqlite_file(tmp_path):
+    # Flask-Migrate 3.x claims `flask db` through an entry point; declare one so both paths are run.
+    dist = tmp_path / "eps" / "migrate_ep-3.1.0.dist-info"
+    dist.mkdir(parents=True)
+    (dist / "METADATA").write_text("Metadata-Version: 2.1\nName: migrate-ep\nVersion: 3.1.0\n")
+    (dist / "entry_points.txt").write_text("[flask.commands]\ndb = flask_migrate.cli:db\n")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for extra in ([], [str(tmp_path / "eps")]):
+        path = tmp_path / f"upgrade{len(extra)}.db"
+        env = dict(os.environ, FLASK_LAZY_STARTUP="true", FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+                   PYTHONPATH=os.pathsep.join(extra + [root, os.environ.get("PYTHONPATH", "")]))
+        subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "db", "upgrade"], cwd=root, env=env,
+                       capture_output=True, text=True, check=True)
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.connect() as conn:
+            tables = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+        engine.dispose()
+        assert {"alembic_version", "users", "shifts", "leave_ledger"} <= tables
+
+
+def test_availability_migration_backfills_existing_shifts_and_leave(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = tmp_path / "old.db"
+    env = dict(os.environ, FLASK_LAZY_STARTUP="true", FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+               PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    upgrade = lambda to: subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "db", "upgrade", to],
+                                        cwd=root, env=env, capture_output=True, text=True, check=True)
+    users = [{"id": 1, "name": "alice", "email": "alice@example.com", "role": "staff"},
+             {"id": 2, "name": "Bob", "email": "bob@example.com", "role": "staff"}]
+    shifts = [{"id": 1, "user_id": 1, "work_date": date(2025, 10, 8), "status": "scheduled",
+               "start_time": datetime(2025, 10, 8, 9), "end_time": datetime(2025, 10, 8, 17)},
+              {"id": 2, "user_id": 2, "work_date": date(2025, 10, 12), "status": "scheduled",  # Sunday night
+               "start_time": datetime(2025, 10, 12, 22), "end_time": datetime(2025, 10, 13, 6)}]
+    leave = [{"id": 1, "requester_id": 2, "start_date": date(2025, 10, 8), "end_date": date(2025, 10, 9),
+              "type": "annual", "status": "approved"}]
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade("0009")
+    with engine.begin() as conn:
+        for table, rows in ((User, users), (Shift, shifts), (LeaveRequest, leave)):
+            conn.execute(table.__table__.insert(), rows)
+    upgrade("0010")
+    columns = [Availability.week, Availability.user_id, Availability.shifts, Availability.leave, Availability.minutes]
+    with engine.connect() as conn:
+        migrated = sorted(conn.execute(select(*columns)).all())
+    engine.dispose()
+
+    for table, rows in ((User, users), (Shift, shifts), (LeaveRequest, leave)):
+        db.session.execute(table.__table__.insert(), rows)
+    availability_controller.rebuild()
+    assert len(migrated) == 3 and migrated == sorted(db.session.execute(select(*columns)).all())
+
+
+def test_attendance_migration_backfills_the_rollup(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = tmp_path / "old.db"
+    env = dict(os.environ, FLASK_LAZY_STARTUP="true", FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+               PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    upgrade = lambda to: subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "db", "upgrade", to],
+                                        cwd=root, env=env, capture_output=True, text=True, check=True)
+    users = [{"id": 1, "name": "alice", "email": "alice@example.com", "role": "staff"},
+             {"id": 2, "name": "Bob", "email": "bob@example.com", "role": "staff"}]
+    shifts = [{"id": 1, "user_id": 1, "work_date": date(2025, 10, 1), "status": "completed",
+               "start_time": datetime(2025, 10, 1, 9), "end_time": datetime(2025, 10, 1, 17)},
+              {"id": 2, "user_id": 1, "work_date": date(2025, 10, 2), "status": "missed",
+               "start_time": datetime(2025, 10, 2, 9), "end_time": datetime(2025, 10, 2, 17)},
+              {"id": 3, "user_id": 2, "work_date": date(2025, 10, 1), "status": "scheduled",
+               "start_time": datetime(2025, 10, 1, 22), "end_time": datetime(2025, 10, 2, 6)}]
+    timelogs = [{"id": 1, "shift_id": 1, "user_id": 1, "clock_in": datetime(2025, 10, 1, 9, 0, 30),
+                 "clock_out": datetime(2025, 10, 1, 17, 0, 0, 500)},
+                {"id": 2, "shift_id": 3, "user_id": 2, "clock_in": datetime(2025, 10, 1, 22), "clock_out": None}]
+    breaks = [{"id": 1, "timelog_id": 1, "break_start": datetime(2025, 10, 1, 12),
+               "break_end": datetime(2025, 10, 1, 12, 45)},
+              {"id": 2, "timelog_id": 1, "break_start": datetime(2025, 10, 1, 15), "break_end": None},
+              {"id": 3, "timelog_id": 2, "break_start": datetime(2025, 10, 2, 1),
+               "break_end": datetime(2025, 10, 2, 1, 30)}]
+    flags = [{"id": 1, "shift_id": 2, "user_id": 1, "kind": "no_show"},
+             {"id": 2, "shift_id": 1, "user_id": 1, "kind": "late"}]
+    sources = ((User, users), (Shift, shifts), (TimeLog, timelogs), (BreakLog, breaks), (ExceptionFlag, flags))
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade("0007")
+    with engine.begin() as conn:
+        for table, rows in sources:
+            conn.execute(table.__table__.insert(), rows)
+    upgrade("0008")
+    with engine.connect() as conn:
+        migrated = sorted(conn.execute(select(DailyAttendance.__table__)).all())
+    engine.dispose()
+
+    for table, rows in sources:
+        db.session.execute(table.__table__.insert(), rows)
+    attendance_controller.rebuild()
+    assert len(migrated) == 3 and migrated == sorted(db.session.execute(select(DailyAttendance.__table__)).all())
+    assert migrated[0] == (1, date(2025, 10, 1), 1, 1, 0, 434, 45, 1)
+
+
+def test_leave_ledger_migration_debits_leave_approved_before_it(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = tmp_path / "old.db"
+    env = dict(os.environ, FLASK_LAZY_STARTUP="true", FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+               PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    upgrade = lambda to: subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "db", "upgrade", to],
+                                        cwd=root, env=env, capture_output=True, text=True, check=True)
+    users = [{"id": 1, "name": "alice", "email": "alice@example.com", "role": "staff"},
+             {"id": 2, "name": "Bob", "email": "bob@example.com", "role": "staff"}]
+    leave = [{"id": 1, "requester_id": 1, "start_date": date(2025, 10, 6), "end_date": date(2025, 10, 8),
+              "type": "annual", "status": "approved"},
+             {"id": 2, "requester_id": 1, "start_date": date(2025, 10, 20), "end_date": date(2025, 10, 20),
+              "type": "annual", "status": "approved"},
+             {"id": 3, "requester_id": 2, "start_date": date(2025, 10, 6), "end_date": date(2025, 10, 10),
+              "type": "annual", "status": "rejected"}]
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade("0011")
+    with engine.begin() as conn:
+        for table, rows in ((User, users), (LeaveRequest, leave)):
+            conn.execute(table.__table__.insert(), rows)
+    upgrade("0012")
+    with engine.connect() as conn:
+        debits = conn.execute(select(LeaveLedger.leave_id, LeaveLedger.kind, LeaveLedger.days)
+                              .order_by(LeaveLedger.id)).all()
+        snapshots = conn.execute(select(LeaveBalance.user_id, LeaveBalance.type, LeaveBalance.days)).all()
+    engine.dispose()
+    assert debits == [(1, "debit", -3.0), (2, "debit", -1.0)]
+    assert snapshots == [(1, "annual", -4.0)]
+
+
+'''
+    Connection pool
+'''
+
+def test_production_pool_splits_the_connection_budget_and_reports_saturation():
+    assert pool_size(workers=9, greenlets=1000) == (6, 4)  # 90 usable connections, 10 per worker
+    assert pool_size(workers=1, greenlets=3) == (2, 1)
+    config = {'DB_PROFILE': 'production', 'DB_WORKERS': 4, 'DB_GREENLETS': 1000,
+              'SQLALCHEMY_DATABASE_URI': 'postgresql+psycopg2://app@db/roster'}
+    apply_db_profile(config)
+    options = config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert (options['poolclass'], options['pool_size'], options['max_overflow'], options['pool_pre_ping']) == \
+        (MeteredQueuePool, 14, 8, True)
+
+    engine = create_engine("sqlite://", poolclass=MeteredQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = engine.connect()
+    errors = []
+    def checkout():
+        try:
+            engine.connect()
+        except exc.TimeoutError as e:
+            errors.append(e)
+    worker = threading.Thread(target=checkout); worker.start(); worker.join()
+    stats = pool_stats(engine)
+    assert len(errors) == 1
+    assert (stats['checkouts'], stats['timeouts'], stats['saturation'], stats['peak_saturation']) == (1, 1, 1.0, 1.0)
+    held.close()
+    assert pool_stats(engine)['saturation'] == 0.0
+
+
+def test_tuned_sqlite_profile_sets_pragmas_on_connect(tmp_path):
+    config = {'DB_PROFILE': 'production', 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'site.db'}"}
+    apply_db_profile(config)
+    assert 'SQLALCHEMY_ENGINE_OPTIONS' not in config
+    engine = create_engine(config['SQLALCHEMY_DATABASE_URI'])
+    tune_sqlite(engine, config['SQLITE_PRAGMAS'], begin='IMMEDIATE', maintenance_interval=0)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        pragmas = [conn.execute(text(f"PRAGMA {name}")).scalar() for name in ('journal_mode', 'synchronous', 'busy_timeout')]
+        assert pragmas == ['wal', 1, 5000]  # synchronous 1 = NORMAL
+        assert conn.connection.dbapi_connection.in_transaction  # BEGIN IMMEDIATE, issued by the listener
+    engine.dispose()
+
+
+'''
+    Timesheet export
+'''
+
+def test_timesheet_export_streams_net_minutes_per_user_and_day(app):
+    alice = make_staff("alice", "alice@example.com")
+    bob = make_staff("Bob", "bob@example.com")
+    sh = make_shift(alice, "2025-10-01T09:00", "2025-10-01T17:00", status='completed')
+    logs = [TimeLog(shift_id=sh.id, user_id=alice.id, clock_in=datetime(2025, 10, 1, 9, 0, 30),
+                    clock_out=datetime(2025, 10, 1, 12, 0)),
+            TimeLog(shift_id=sh.id, user_id=alice.id, clock_in=datetime(2025, 10, 1, 13, 0),
+                    clock_out=datetime(2025, 10, 1, 17, 0)),
+            TimeLog(shift_id=sh.id, user_id=bob.id, clock_in=datetime(2025, 10, 2, 9, 0),
+                    clock_out=datetime(2025, 10, 2, 10, 0)),
+            TimeLog(shift_id=sh.id, user_id=bob.id, clock_in=datetime(2025, 10, 3, 9, 0))]  # still clocked in
+    db.session.add_all(logs); db.session.flush()
+    db.session.add(BreakLog(timelog_id=logs[1].id, break_start=datetime(2025, 10, 1, 15, 0),
+                            break_end=datetime(2025, 10, 1, 15, 20)))
+    db.session.commit()
+    sql_minutes = db.session.scalars(select(TimeLog.net_minutes).order_by(TimeLog.id)).all()
+    assert sql_minutes == [tl.worked_minutes() for tl in logs] == [179, 220, 60, 0]
+
+    chunks = list(timesheet_controller.export(date(2025, 10, 1), date(2025, 10, 3), batch_size=1))
+    assert chunks == ["user_id,email,name,work_date,first_in,last_out,timelogs,worked_minutes\n"
+                      "1,alice@example.com,alice,2025-10-01,2025-10-01T09:00:30,2025-10-01T17:00:00,2,399\n",
+                      "2,bob@example.com,Bob,2025-10-02,2025-10-02T09:00:00,2025-10-02T10:00:00,1,60\n"]
+
+    with pytest.raises(ValueError, match="Staff not found"):
+        timesheet_controller.export(date(2025, 10, 1), date(2025, 10, 3), email="nobody@example.com")
+
+    make_staff("Carol", "carol@x.io", 'hr')
+    create_user("carol@x.io", "carolpass")
+    create_user("bob@example.com", "bobpass")
+    headers = {"Authorization": f"Bearer {login('carol@x.io', 'carolpass')}"}
+    as_staff = {"Authorization": f"Bearer {login('bob@example.com', 'bobpass')}"}
+    assert app.test_client().get("/api/timesheet?from=2025-10-02&to=2025-10-31", headers=as_staff).status_code == 403
+    assert app.test_client().get("/api/timesheet?from=2025-10-02&to=2025-10-31&email=nobody@example.com",
+                                 headers=headers).status_code == 400
+    res = app.test_client().get("/api/timesheet?from=2025-10-02&to=2025-10-31&format=ndjson", headers=headers)
+    assert res.mimetype == "application/x-ndjson"
+    assert [r["worked_minutes"] for r in map(json.loads, res.get_data(as_text=True).splitlines())] == [60]
+    assert app.test_client().get("/api/timesheet?from=2025-10-02", headers=headers).status_code == 400
+
+
+'''
+    Daily attendance rollup
+'''
+
+def test_attendance_rollup_follows_each_write_and_matches_a_rebuild():
+    alice = make_staff("alice", "alice@example.com")
+    bob = make_staff("bob", "bob@example.com")
+    day = date(2025, 10, 1)
+    rollup = lambda: {(r.user_id, r.day): (r.scheduled, r.completed, r.missed, r.worked_minutes, r.exceptions)
+                      for r in db.session.scalars(select(DailyAttendance))}
+
+    worked = admin_controller.assign_shift("alice@example.com", "2025-10-01T09:00", "2025-10-01T17:00")
+    idle = admin_controller.assign_shift("alice@example.com", "2025-10-01T18:00", "2025-10-01T20:00")
+    assert rollup() == {(alice.id, day): (2, 0, 0, 0, 0)}
+
+    tl = staff_controller.clock_in("alice@example.com", worked.id)
+    tl.clock_in = datetime(2025, 10, 1, 9, 0)
+    tl = staff_controller.clock_out("alice@example.com", tl.id)
+    minutes = tl.worked_minutes()
+    assert rollup() == {(alice.id, day): (2, 1, 0, minutes, 0)}
+
+    sr = swap_controller.request_swap("alice@example.com", idle.id, "bob@example.com")
+    swap_controller.approve_swap(sr.id, "alice@example.com", "approved")
+    assert rollup() == {(alice.id, day): (1, 1, 0, minutes, 0), (bob.id, day): (1, 0, 0, 0, 0)}
+
+    exception_controller.sweep_exceptions(now=datetime(2025, 10, 2, 9, 0))
+    assert rollup()[(bob.id, day)] == (1, 0, 1, 0, 1)  # no-show: missed and flagged
+
+    incremental = rollup()
+    db.session.execute(DailyAttendance.__table__.delete()); db.session.commit()
+    assert attendance_controller.rebuild() == 2
+    assert rollup() == incremental
+    report = attendance_controller.weekly_report("2025-09-29")
+    assert [(r["name"], r["scheduled"], r["missed"], r["exceptions"]) for r in report["rows"]] == \
+        [("alice", 1, 0, rollup()[(alice.id, day)][4]), ("bob", 1, 1, 1)]
+
+
+'''
+    Benchmark harness
+'''
+
+def test_generator_is_seeded_and_the_suite_flags_regressions():
+    from benchmarks.generate import generate
+    from benchmarks.suite import compare
+    data = generate(staff=30, weeks=2, seed=3)
+    assert data["users"] == 33 and data["shifts"] == db.session.scalar(select(func.count(Shift.id)))
+    assert leave_controller.balance(1, "annual") is not None
+    for sid in data["pending_swaps"]:  # targets are free, so every pending swap can go through
+        swap_controller.approve_swap(sid, "admin@bench.local", "approved")
+    staff_controller.clock_in(*data["clockable"][0])
+
+    db.session.remove(); db.drop_all(); db.create_all()
+    assert generate(staff=30, weeks=2, seed=3)["shifts"] == data["shifts"]
+
+    old = {"view_roster @200": {"seconds": 0.010, "queries": 1, "peak_kib": 1000.0}}
+    assert compare({"view_roster @200": {"seconds": 0.012, "queries": 1, "peak_kib": 1100.0}}, old) == []
+    assert compare({"view_roster @200": {"seconds": 0.030, "queries": 2, "peak_kib": 2000.0}}, old) == [
+        "view_roster @200: 1 -> 2 queries", "view_roster @200: 10.0 -> 30.0 ms",
+        "view_roster @200: 1000 -> 2000 KiB peak"]
+    assert compare({"new case @200": {"seconds": 1.0, "queries": 9, "peak_kib": 9e6}}, old) == []
+
+
+'''
+    Metrics
+'''
+
+def test_requests_and_commands_record_sql_stats_and_flag_repeated_statements(app, monkeypatch, caplog):
+    import click
+    from App import metrics
+    make_staff("alice", "alice@example.com")
+    create_user("bob", "bobpass")
+    headers = {"Authorization": f"Bearer {login('bob', 'bobpass')}"}
+    client = app.test_client()
+    assert client.get("/api/leave", headers=headers).status_code == 200
+    body = client.get("/metrics").get_data(as_text=True)
+    labels = 'endpoint="roster_views.list_leave_action",method="GET",status="200"'
+    assert f"app_request_duration_seconds_count{{{labels}}}" in body
+    assert 'app_db_queries_bucket{le="1.0",name="roster_views.list_leave_action",scope="request"}' in body
+
+    monkeypatch.setitem(metrics.settings, "n_plus_one", 3)
+    group = click.Group("probe")
+
+    @group.command("lookups")
+    def lookups():
+        for uid in range(5):
+            db.session.execute(select(User.email).where(User.id == uid)).all()
+        stats = metrics.current()
+        assert stats.count == 5 and stats.slowest_statement.startswith("SELECT users.email")
+
+    metrics.instrument_group(group)
+    outer = metrics.current()
+    with caplog.at_level("WARNING", logger="App.metrics"):
+        # Called directly: CliRunner swaps out the streams the live-log handler writes to.
+        group.main(["lookups"], prog_name="probe", standalone_mode=False)
+    assert [r.getMessage() for r in caplog.records] == \
+        ["possible N+1 in command probe lookups: ran 5 times: SELECT users.email FROM users WHERE users.id = ?"]
+    assert metrics.current() is outer  # the command's scope is closed again
+    assert metrics.statement_shape("SELECT x FROM t WHERE id IN (?, ?, ?)") == \
+        metrics.statement_shape("SELECT x FROM t\n WHERE id IN (?)")
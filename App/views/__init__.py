@@ -3,8 +3,13 @@
 from .user import user_views
 from .index import index_views
 from .auth import auth_views
-from .admin import setup_admin
+from .roster import roster_views
 
 
-views = [user_views, index_views, auth_views] 
-# blueprints must be added to this list
\ No newline at end of file
+views = [user_views, index_views, auth_views, roster_views]
+# blueprints must be added to this list
+
+def setup_admin(app):
+    # Flask-Admin is only imported when the admin UI is actually mounted.
+    from .admin import setup_admin
+    return setup_admin(app)
@@ -1,5 +1,7 @@
-from flask import Blueprint, redirect, render_template, request, send_from_directory, jsonify
+from flask import Blueprint, Response, redirect, render_template, request, send_from_directory, jsonify
 from App.controllers import create_user, initialize
+from App.database import pool_stats
+from App import metrics
 
 index_views = Blueprint('index_views', __name__, template_folder='../templates')
 
@@ -14,4 +16,14 @@ def init():
 
 @index_views.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status':'healthy'})
\ No newline at end of file
+    return jsonify({'status':'healthy'})
+
+@index_views.route('/health/db', methods=['GET'])
+def db_pool_check():
+    return jsonify(pool_stats())
+
+@index_views.route('/metrics', methods=['GET'])
+def metrics_page():
+    """Prometheus scrape target: request latency and SQL figures per endpoint, summed over workers."""
+    body, content_type = metrics.export()
+    return Response(body, content_type=content_type)
\ No newline at end of file
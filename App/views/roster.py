@@ -0,0 +1,273 @@
+import json
+from functools import wraps
+from datetime import date, datetime
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, current_user
+
+from App.models.core import User
+from App.controllers import leave_controller as leave
+from App.controllers import swap_controller as swap
+from App.controllers import staff_controller as staff
+from App.controllers import kiosk_controller as kiosk
+from App.controllers import notify_controller as notify
+from App.controllers import timesheet_controller as timesheets
+from App.controllers import availability_controller as availability
+from App.controllers.version_controller import conditional
+
+roster_views = Blueprint('roster_views', __name__, template_folder='../templates')
+
+MAX_PAGE = 1000
+
+def _page_args():
+    limit = min(request.args.get('limit', 100, type=int), MAX_PAGE)
+    return request.args.get('status'), request.args.get('after_id', type=int), max(limit, 1)
+
+def _account_user():
+    """The roster user behind the JWT: the one whose email is the signed-in account's username."""
+    return User.query.filter_by(email=current_user.username).first() if current_user else None
+
+def require_roles(*roles):
+    """Like App.cli.require_roles, for views under @jwt_required(): a 403 for any other role."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            u = _account_user()
+            if not u or u.role not in roles:
+                return jsonify(message=f"Forbidden (need one of {', '.join(roles)})"), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def _user_id(email):
+    u = User.query.filter_by(email=email).first()
+    return u.id if u else None
+
+def _recipient_id(email):
+    """
+    (user_id, error response) for the notification endpoints: the JWT's own roster user, or with
+    `email` someone else's, which only admins and supervisors may name.
+    """
+    me = _account_user()
+    if email and not (me and email == me.email):
+        if not me or me.role not in ('admin', 'supervisor'):
+            return None, (jsonify(message="Forbidden (need one of admin, supervisor for another's inbox)"), 403)
+        user_id = _user_id(email)
+    else:
+        user_id = me.id if me else None
+    return user_id, None if user_id else (jsonify(message='no such user'), 404)
+
+def _date_arg(name):
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else None
+
+def _json_array(rows):
+    # Emit one element at a time so the response never holds the whole result set.
+    yield '['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + json.dumps(row.get_json())
+    yield ']'
+
+def _page(items, limit):
+    return jsonify(items=items, next_after_id=(items[-1]['id'] if len(items) == limit else None))
+
+'''
+API Routes
+'''
+
+@roster_views.route('/api/leave', methods=['GET'])
+@jwt_required()
+def list_leave_action():
+    status, after_id, limit = _page_args()
+    email = request.args.get('email')
+    requester_id = _user_id(email) if email else None
+    if email and not requester_id:
+        return jsonify(message='no such user'), 404
+    items = [lr.get_json() for lr in leave.list_leave(status, requester_id, after_id, limit)]
+    return _page(items, limit)
+
+@roster_views.route('/api/leave/calendar', methods=['GET'])
+@jwt_required()
+@require_roles('admin', 'supervisor', 'hr')
+def leave_calendar_action():
+    """?from=&to=[&role=][&limit=]: staff absent per day, and approved leave overlapping the range."""
+    try:
+        start, end = _date_arg('from'), _date_arg('to')
+        if not (start and end): raise ValueError('from and to are required (YYYY-MM-DD)')
+        limit = max(min(request.args.get('limit', leave.CALENDAR_LIMIT, type=int), MAX_PAGE), 1)
+        return jsonify(leave.calendar(start, end, request.args.get('role'), limit))
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+@roster_views.route('/api/leave/balances/<int:user_id>', methods=['GET'])
+@jwt_required()
+def leave_balances_action(user_id):
+    """
+    Days left per leave type; ?history=1 adds the ledger entries (?type=, ?after_id=, ?limit= page them).
+    Staff see only their own; admins, supervisors and hr anyone's.
+    """
+    me = _account_user()
+    if not me or (me.id != user_id and me.role not in ('admin', 'supervisor', 'hr')):
+        return jsonify(message="Forbidden (need one of admin, supervisor, hr for another's balances)"), 403
+    if not User.query.get(user_id):
+        return jsonify(message='no such user'), 404
+    body = {"user_id": user_id, "balances": leave.balances(user_id)}
+    if request.args.get('history'):
+        _, after_id, limit = _page_args()
+        body["ledger"] = [e.get_json() for e in leave.ledger(user_id, request.args.get('type'), after_id, limit)]
+    return jsonify(body)
+
+@roster_views.route('/api/swaps', methods=['GET'])
+@jwt_required()
+def list_swaps_action():
+    status, after_id, limit = _page_args()
+    email = request.args.get('email')
+    user_id = _user_id(email) if email else None
+    if email and not user_id:
+        return jsonify(message='no such user'), 404
+    items = [sr.get_json() for sr in swap.list_swaps(status, user_id, after_id, limit)]
+    return _page(items, limit)
+
+@roster_views.route('/api/roster', methods=['GET'])
+@jwt_required()
+@conditional('shifts', 'users')
+def view_roster_action():
+    try:
+        start, end = _date_arg('from'), _date_arg('to')
+    except ValueError:
+        return jsonify(message='from/to must be YYYY-MM-DD'), 400
+    rows = staff.view_roster(start, end, request.args.get('email'), request.args.get('status'))
+    return Response(stream_with_context(_json_array(rows)), mimetype='application/json')
+
+@roster_views.route('/api/timesheet', methods=['GET'])
+@jwt_required()
+@require_roles('admin', 'supervisor', 'hr')
+def timesheet_export_action():
+    """?from=&to=[&format=csv|ndjson][&email=]: per-user, per-day worked minutes, streamed."""
+    fmt = request.args.get('format', 'csv')
+    try:
+        start, end = _date_arg('from'), _date_arg('to')
+        if not (start and end): raise ValueError('from and to are required (YYYY-MM-DD)')
+        chunks = timesheets.export(start, end, fmt, request.args.get('email'))
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    filename = f"timesheet-{start.isoformat()}-{end.isoformat()}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=timesheets.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@roster_views.route('/api/shifts/<int:shift_id>/candidates', methods=['GET'])
+@jwt_required()
+@require_roles('staff', 'admin', 'supervisor')
+def swap_candidates_action(shift_id):
+    """[?max_hours=40][&min_rest=11][&limit=20]: staff who could take the shift, fewest hours that week first."""
+    try:
+        found = availability.candidates(shift_id,
+                                        request.args.get('max_hours', availability.MAX_WEEK_HOURS, type=float),
+                                        request.args.get('min_rest', availability.MIN_REST_HOURS, type=float),
+                                        min(request.args.get('limit', availability.LIMIT, type=int), MAX_PAGE))
+    except ValueError as e:
+        return jsonify(message=str(e)), 404
+    return jsonify(items=found)
+
+@roster_views.route('/api/coverage', methods=['GET'])
+@jwt_required()
+@require_roles('admin', 'supervisor')
+def coverage_action():
+    """?from=&to=[&slot=15][&role=...][&min=role:N...]: staff on shift per slot, with understaffed runs."""
+    # NumPy loads with the first coverage request rather than with every worker.
+    from App.controllers import coverage_controller as coverage
+    try:
+        start, end = _date_arg('from'), _date_arg('to')
+        if not (start and end): raise ValueError('from and to are required (YYYY-MM-DD)')
+        minimums = {**current_app.config.get('COVERAGE_MINIMUMS', {}),
+                    **coverage.parse_minimums(request.args.getlist('min'))}
+        result = coverage.coverage(start, end, request.args.get('slot', coverage.SLOT_MINUTES, type=int),
+                                   request.args.getlist('role') or None, minimums)
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    return jsonify(result)
+
+@roster_views.route('/api/punches', methods=['POST'])
+@jwt_required()
+def kiosk_punch_action():
+    """One punch object, a list of them, or {"punches": [...]}; answers once they are committed."""
+    body = request.get_json(silent=True)
+    if isinstance(body, dict) and 'punches' in body:
+        body = body['punches']
+    raw = body if isinstance(body, list) else [body]
+    if not 0 < len(raw) <= kiosk.MAX_BATCH:
+        return jsonify(message=f'send 1 to {kiosk.MAX_BATCH} punches'), 400
+    try:
+        punches = [kiosk.parse_punch(p) for p in raw]
+    except (ValueError, TypeError) as e:
+        return jsonify(message=str(e)), 400
+    try:
+        results = kiosk.punch_queue(current_app._get_current_object()).submit(punches)
+    except TimeoutError as e:
+        return jsonify(message=f'{e}; retry with the same keys'), 503, {'Retry-After': '1'}
+    return jsonify(results=results)
+
+@roster_views.route('/api/notifications', methods=['POST'])
+@jwt_required()
+@require_roles('admin', 'supervisor', 'hr')
+def fan_out_action():
+    """{"message", "channel"?, "role"? | "emails"? | "all": true}; answers 202 before delivery starts."""
+    body = request.get_json(silent=True) or {}
+    message, emails = body.get('message'), body.get('emails')
+    if not isinstance(message, str) or not message:
+        return jsonify(message='message is required'), 400
+    if not (body.get('all') or body.get('role') or emails):
+        return jsonify(message='give role, emails or all'), 400
+    if emails is not None and not (isinstance(emails, list) and all(isinstance(e, str) for e in emails)):
+        return jsonify(message='emails must be a list of strings'), 400
+    channel = body.get('channel') or 'inapp'
+    if not notify.known_channel(channel):
+        return jsonify(message=f'unknown channel {channel!r}'), 400
+    try:
+        count, ids = notify.fan_out(message, channel, body.get('role'), emails,
+                                    body.get('entity_type'), body.get('entity_id'))
+    except ValueError as e:
+        return jsonify(message=str(e)), 404
+    if ids:
+        notify.delivery_queue(current_app._get_current_object()).put(ids)
+    return jsonify(count=count, queued=len(ids)), 202
+
+@roster_views.route('/api/notifications', methods=['GET'])
+@jwt_required()
+def inbox_action():
+    """[?email=] Newest first; pass back next_before/next_before_id as before/before_id for the next page."""
+    user_id, error = _recipient_id(request.args.get('email'))
+    if error:
+        return error
+    try:
+        before = request.args.get('before')
+        before = datetime.fromisoformat(before) if before else None
+    except ValueError:
+        return jsonify(message='before must be an ISO timestamp'), 400
+    limit = max(min(request.args.get('limit', 50, type=int), MAX_PAGE), 1)
+    rows = notify.inbox(user_id, before, request.args.get('before_id', type=int), limit,
+                        request.args.get('unread') in ('1', 'true'))
+    more = len(rows) == limit
+    return jsonify(items=[n.get_json() for n in rows], unread=notify.unread_count(user_id),
+                   next_before=rows[-1].created_at.isoformat() if more else None,
+                   next_before_id=rows[-1].id if more else None)
+
+@roster_views.route('/api/notifications/unread', methods=['GET'])
+@jwt_required()
+def unread_action():
+    user_id, error = _recipient_id(request.args.get('email'))
+    if error:
+        return error
+    return jsonify(unread=notify.unread_count(user_id))
+
+@roster_views.route('/api/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_read_action():
+    """{"ids": [...]} or {"all": true}, plus "email"?; answers with the new unread count."""
+    body = request.get_json(silent=True) or {}
+    user_id, error = _recipient_id(body.get('email'))
+    if error:
+        return error
+    ids = body.get('ids')
+    if not body.get('all') and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+        return jsonify(message='give ids (a list of integers) or all'), 400
+    return jsonify(unread=notify.mark_read(user_id, None if body.get('all') else ids))
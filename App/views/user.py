@@ -9,6 +9,7 @@ from App.controllers import (
     get_all_users_json,
     jwt_required
 )
+from App.controllers.version_controller import conditional
 
 user_views = Blueprint('user_views', __name__, template_folder='../templates')
 
@@ -25,6 +26,7 @@ def create_user_action():
     return redirect(url_for('user_views.get_user_page'))
 
 @user_views.route('/api/users', methods=['GET'])
+@conditional('user')
 def get_users_action():
     users = get_all_users_json()
     return jsonify(users)
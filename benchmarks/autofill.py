@@ -0,0 +1,70 @@
+"""Benchmark `flask roster autofill` on generated demand: N staff, W weeks of 15-minute slots.
+
+    python -m benchmarks.autofill --staff 1000 --weeks 4 --time-budget 3
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from App.database import db
+from App.models.core import User, LeaveRequest
+from App.controllers import autofill_controller as autofill
+from benchmarks.common import make_app, measure
+
+# Headcount per hour of day, as a share of peak.
+PROFILE = [0.3] * 6 + [0.6, 0.8] + [1.0] * 10 + [0.8, 0.6] + [0.4] * 4
+
+
+def generate_demand(start, weeks, peak):
+    rows = []
+    for day in range(weeks * 7):
+        weekend = (start + timedelta(days=day)).weekday() >= 5
+        for hour, share in enumerate(PROFILE):
+            s = start + timedelta(days=day, hours=hour)
+            rows.append((s, s + timedelta(hours=1), int(peak * share * (0.6 if weekend else 1.0))))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=1000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--time-budget", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    start = datetime(2026, 1, 5)
+    with make_app().app_context():
+        db.session.execute(insert(User), [
+            {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+            for i in range(1, args.staff + 1)
+        ])
+        leave = []
+        for uid in rng.sample(range(1, args.staff + 1), args.staff // 10):
+            d = (start + timedelta(days=rng.randrange(args.weeks * 7))).date()
+            leave.append({"requester_id": uid, "start_date": d, "end_date": d + timedelta(days=rng.randint(0, 4)),
+                          "type": "annual", "status": "approved"})
+        db.session.execute(insert(LeaveRequest), leave)
+        db.session.commit()
+
+        # Peak headcount the workforce can sustain at 40h/week with 8h shifts.
+        peak = int(args.staff * 40 / (sum(PROFILE) * 7) * 0.75)
+        demand = generate_demand(start, args.weeks, peak)
+        slots = args.weeks * 7 * 24 * 4
+        print(f"staff={args.staff} weeks={args.weeks} slots={slots} peak={peak}")
+
+        t0 = time.perf_counter()
+        with measure("autofill"):
+            plan = autofill.autofill(demand, time_budget=args.time_budget)
+        print(f"shifts={len(plan['shifts'])} uncovered slot-heads={plan['uncovered_slots']} "
+              f"overstaffed slot-heads={plan['overstaffed_slots']} ({time.perf_counter() - t0:.2f}s)")
+        with measure("autofill (greedy only)"):
+            greedy = autofill.autofill(demand, time_budget=0)
+        print(f"greedy: uncovered={greedy['uncovered_slots']} overstaffed={greedy['overstaffed_slots']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Shared helpers for the benchmark scripts: an isolated app, synthetic data and query counting."""
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from App import create_app
+from App.database import db
+from App.models.core import User, Shift, TimeLog, BreakLog
+
+
+def make_app(uri="sqlite://", **config):
+    return create_app({"SQLALCHEMY_DATABASE_URI": uri, "TESTING": True, "CREATE_SCHEMA": True, **config})
+
+
+def seed_week(week_start: datetime, staff: int = 2000, seed: int = 42):
+    """Bulk-insert `staff` users with a week of shifts, timelogs and breaks."""
+    rng = random.Random(seed)
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+        for i in range(1, staff + 1)
+    ])
+    shifts, logs, breaks = [], [], []
+    for uid in range(1, staff + 1):
+        for day in range(5):
+            start = week_start + timedelta(days=day, hours=rng.choice((6, 9, 14)))
+            end = start + timedelta(hours=8)
+            sid = len(shifts) + 1
+            status = rng.choices(("completed", "missed", "scheduled"), (8, 1, 1))[0]
+            shifts.append({"id": sid, "user_id": uid, "work_date": start.date(),
+                           "start_time": start, "end_time": end, "status": status})
+            if status != "completed":
+                continue
+            tid = len(logs) + 1
+            clock_in = start + timedelta(minutes=rng.randint(-5, 15), seconds=rng.randint(0, 59))
+            logs.append({"id": tid, "shift_id": sid, "user_id": uid, "clock_in": clock_in,
+                         "clock_out": end + timedelta(minutes=rng.randint(-10, 20)), "source": "app"})
+            b_start = clock_in + timedelta(hours=4)
+            breaks.append({"timelog_id": tid, "break_start": b_start,
+                           "break_end": b_start + timedelta(minutes=rng.choice((15, 30, 45)))})
+    db.session.execute(insert(Shift), shifts)
+    db.session.execute(insert(TimeLog), logs)
+    db.session.execute(insert(BreakLog), breaks)
+    db.session.commit()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@contextmanager
+def measure(label, results=None):
+    """Time a block and count the SQL statements it issues."""
+    counter = QueryCounter()
+    event.listen(db.engine, "before_cursor_execute", counter)
+    t0 = time.perf_counter()
+    try:
+        yield counter
+    finally:
+        elapsed = time.perf_counter() - t0
+        event.remove(db.engine, "before_cursor_execute", counter)
+        print(f"{label:<32} {elapsed * 1000:10.1f} ms {counter.count:8d} queries")
+        if results is not None:
+            results[label] = {"seconds": elapsed, "queries": counter.count}
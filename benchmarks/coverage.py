@@ -0,0 +1,92 @@
+"""Benchmark the coverage heatmap over a quarter against a per-shift Python loop over the slots.
+
+    python -m benchmarks.coverage --staff 5000 --days 90
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.core import User, Shift, LeaveRequest
+from App.controllers import coverage_controller as coverage
+from benchmarks.common import make_app, measure
+
+ROLES = ("staff",) * 8 + ("supervisor",)
+
+
+def seed_quarter(start, staff, days, seed=42):
+    """Five shifts a week per user on rotating early/day/late/night starts, plus a week of leave for one in 20."""
+    rng = random.Random(seed)
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": ROLES[i % len(ROLES)]}
+        for i in range(1, staff + 1)
+    ])
+    sid = 0
+    for day in range(days):
+        midnight = datetime.combine(start + timedelta(days=day), datetime.min.time())
+        shifts = []
+        for uid in range(1, staff + 1):
+            if (uid + day) % 7 >= 5:
+                continue
+            sid += 1
+            begin = midnight + timedelta(hours=rng.choice((6, 9, 14, 22)), minutes=rng.choice((0, 30)))
+            shifts.append({"id": sid, "user_id": uid, "work_date": begin.date(), "start_time": begin,
+                           "end_time": begin + timedelta(hours=8), "status": "scheduled"})
+        db.session.execute(insert(Shift), shifts)
+    db.session.execute(insert(LeaveRequest), [
+        {"requester_id": uid, "start_date": start + timedelta(days=d), "end_date": start + timedelta(days=d + 6),
+         "type": "annual", "status": "approved"}
+        for uid in range(1, staff + 1, 20) for d in (rng.randrange(max(days - 7, 1)),)
+    ])
+    db.session.commit()
+    return sid
+
+
+def python_loop(start, end, slot_minutes):
+    """What the heatmap replaces: every shift walks its slots, one counter at a time."""
+    lo = datetime.combine(start, datetime.min.time())
+    slot, n = timedelta(minutes=slot_minutes), (end - start).days * 1440 // slot_minutes + 1440 // slot_minutes
+    counts = {}
+    rows = db.session.execute(select(User.role, Shift.start_time, Shift.end_time).join(User, User.id == Shift.user_id)
+                              .where(Shift.start_time < lo + n * slot, Shift.end_time > lo))
+    for role, s, e in rows:
+        series = counts.setdefault(role, [0] * n)
+        for i in range(max(0, (s - lo) // slot), min(n, -(-(e - lo) // slot))):
+            series[i] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--slot-minutes", type=int, default=15)
+    args = parser.parse_args()
+    start = date(2025, 1, 6)
+    end = start + timedelta(days=args.days - 1)
+    minimums = {"staff": args.staff // 5, "supervisor": args.staff // 60}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with app.app_context():
+            t0 = time.perf_counter()
+            shifts = seed_quarter(start, args.staff, args.days)
+            print(f"seeded {shifts} shifts in {time.perf_counter() - t0:.1f} s")
+
+            for label in ("coverage (cold)", "coverage (warm)"):
+                with measure(label):
+                    result = coverage.coverage(start, end, args.slot_minutes, minimums=minimums)
+            print(f"{'':<32} {result['slots']} slots, {len(result['understaffed'])} understaffed runs")
+            with measure("coverage, one role"):
+                coverage.coverage(start, end, args.slot_minutes, ["supervisor"], minimums)
+            with measure("per-shift Python loop"):
+                python_loop(start, end, args.slot_minutes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Seeded synthetic data at realistic volumes, into SQLite or PostgreSQL.
+
+    python -m benchmarks.generate --uri sqlite:///bench.db --staff 1000 --weeks 8
+    python -m benchmarks.generate --uri postgresql+psycopg2://... --staff 5000 --weeks 26 --reset
+
+One admin, one HR user and a supervisor per 25 staff. Each staff member works five 8-hour shifts a
+week on rotating starts. The first half of the weeks is history: shifts worked (timelogs, mostly
+with a break) or missed, decided leave and swaps, read notifications. The second half is
+scheduled, with pending leave and swaps. Swap targets are off that day, so every pending swap can
+be approved. Derived tables (attendance rollup, availability, leave calendar and balances, unread
+counters) are rebuilt from the inserted rows, so the result looks like a database the app has been
+running on. The same --seed always gives the same rows.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select, func, text
+
+from App.database import db
+from App.models.core import (User, Shift, TimeLog, BreakLog, LeaveRequest, SwapRequest, Notification,
+                             LeaveLedger)
+from App.controllers import attendance_controller as attendance
+from App.controllers import availability_controller as availability
+from App.controllers import leave_controller as leave
+from App.controllers import notify_controller as notify
+from benchmarks.common import make_app
+
+START = date(2025, 1, 6)  # a Monday; fixed so runs on different days produce the same data
+BATCH = 5000  # rows per INSERT, under PostgreSQL's bind-parameter limit
+STAFF_PER_SUPERVISOR = 25
+STARTS = (6, 9, 14, 22)  # shift start hours; 22:00 runs past midnight
+ACCRUALS = {"annual": 2.08, "sick": 1.0}
+ADMIN, HR = "admin@bench.local", "hr@bench.local"
+
+
+def staff_email(uid):
+    return f"staff{uid}@bench.local"
+
+
+def works(uid, day_index):
+    """Five days on, two off, staggered across staff."""
+    return (uid + day_index) % 7 < 5
+
+
+def _insert(model, rows):
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[i:i + BATCH])
+
+
+def _sync_sequences(models):
+    """Rows went in with explicit ids; move PostgreSQL's serial sequences past them."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__table__.name
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"GREATEST((SELECT MAX(id) FROM {table}), 1))"))
+
+
+def generate(staff=1000, weeks=8, start=START, seed=42):
+    """
+    Insert the synthetic workforce into the app's (empty) database and commit. Returns row counts,
+    plus `week` (a Monday in the history), `today` (first scheduled day), and for mutating
+    benchmarks `clockable` [(email, shift id)] scheduled shifts and `pending_swaps` [swap id].
+    """
+    if staff < 1 or weeks < 2: raise ValueError("need at least one staff member and two weeks")
+    if db.session.scalar(select(func.count(User.id))): raise ValueError("database already has users")
+    rng = random.Random(seed)
+    days = weeks * 7
+    today = start + timedelta(days=(weeks // 2) * 7)
+    supervisors = max(1, staff // STAFF_PER_SUPERVISOR)
+
+    # Users: ids 1..staff are staff, so the rota pattern can use the id directly.
+    users = [{"id": uid, "name": f"Staff {uid}", "email": staff_email(uid), "role": "staff"}
+             for uid in range(1, staff + 1)]
+    users += [{"id": staff + 1, "name": "Admin", "email": ADMIN, "role": "admin"},
+              {"id": staff + 2, "name": "HR", "email": HR, "role": "hr"}]
+    users += [{"id": staff + 2 + k, "name": f"Supervisor {k}", "email": f"supervisor{k}@bench.local",
+               "role": "supervisor"} for k in range(1, supervisors + 1)]
+    approver = staff + 3
+
+    # Leave: about one request every four weeks per person, 1-5 days; decided in the past,
+    # mostly pending in the future. Approved days are kept off the roster.
+    requests, off = [], set()
+    for uid in range(1, staff + 1):
+        taken = set()
+        for _ in range(rng.randint(0, max(1, weeks // 4))):
+            first = start + timedelta(days=rng.randrange(days))
+            span = {first + timedelta(days=d) for d in range(rng.choice((1, 1, 2, 3, 5)))}
+            if span & taken:
+                continue
+            taken |= span
+            kind = rng.choices(("annual", "sick", "unpaid"), (6, 3, 1))[0]
+            if first < today:
+                status = rng.choices(("approved", "rejected"), (85, 15))[0]
+            else:
+                status = rng.choices(("approved", "pending", "rejected"), (5, 4, 1))[0]
+            requests.append({"id": len(requests) + 1, "requester_id": uid, "start_date": min(span),
+                             "end_date": max(span), "type": kind, "status": status, "reason": "",
+                             "approver_id": approver if status != "pending" else None})
+            if status == "approved":
+                off |= {(uid, d) for d in span}
+
+    # Shifts, then swaps (decided in the past, mostly pending ahead), then the history's timelogs.
+    shifts, swaps, targets = [], [], set()
+    for d in range(days):
+        day = start + timedelta(days=d)
+        midnight = datetime.combine(day, datetime.min.time())
+        for uid in range(1, staff + 1):
+            if not works(uid, d) or (uid, day) in off:
+                continue
+            begin = midnight + timedelta(hours=STARTS[(uid + d // 7) % len(STARTS)])
+            past = day < today
+            shift = {"id": len(shifts) + 1, "user_id": uid, "work_date": day, "start_time": begin,
+                     "end_time": begin + timedelta(hours=8),
+                     "status": rng.choices(("completed", "missed"), (92, 8))[0] if past else "scheduled"}
+            shifts.append(shift)
+            if staff < 2 or rng.random() >= 0.03:
+                continue
+            to = rng.randrange(1, staff + 1)
+            if to == uid or works(to, d) or (to, day) in off or (to, day) in targets:
+                continue
+            targets.add((to, day))
+            if past:
+                status = rng.choices(("approved", "rejected"), (3, 1))[0]
+                if status == "approved":
+                    shift["user_id"] = to
+            else:
+                status = rng.choices(("pending", "rejected", "cancelled"), (7, 2, 1))[0]
+            swaps.append({"id": len(swaps) + 1, "shift_id": shift["id"], "from_user_id": uid,
+                          "to_user_id": to, "note": "", "status": status})
+
+    logs, breaks = [], []
+    for shift in shifts:
+        if shift["status"] != "completed":
+            continue
+        clock_in = shift["start_time"] + timedelta(minutes=rng.randint(-5, 15), seconds=rng.randint(0, 59))
+        logs.append({"id": len(logs) + 1, "shift_id": shift["id"], "user_id": shift["user_id"],
+                     "clock_in": clock_in, "source": rng.choice(("app", "kiosk")),
+                     "clock_out": shift["end_time"] + timedelta(minutes=rng.randint(-10, 20))})
+        if rng.random() < 0.8:
+            b_start = clock_in + timedelta(hours=4)
+            breaks.append({"timelog_id": len(logs), "break_start": b_start,
+                           "break_end": b_start + timedelta(minutes=rng.choice((15, 30, 45)))})
+
+    # Notifications: two a week per user over the history, most read; a few email ones queued.
+    history = (today - start).days * 86400
+    notes = []
+    for u in users:
+        for _ in range(weeks):
+            at = datetime.combine(start, datetime.min.time()) + timedelta(seconds=rng.randrange(history))
+            channel = rng.choices(("inapp", "email"), (19, 1))[0]
+            queued = channel != "inapp" and rng.random() < 0.5
+            notes.append({"recipient_id": u["id"], "message": "Roster updated", "channel": channel,
+                          "entity_type": "shift", "created_at": at, "read": rng.random() < 0.7,
+                          "status": "pending" if queued else "sent", "attempts": 0,
+                          "next_attempt_at": at if queued else None, "sent_at": None if queued else at})
+
+    _insert(User, users)
+    _insert(LeaveRequest, requests)
+    _insert(Shift, shifts)
+    _insert(SwapRequest, swaps)
+    _insert(TimeLog, logs)
+    _insert(BreakLog, breaks)
+    _insert(Notification, notes)
+    _sync_sequences((User, LeaveRequest, Shift, SwapRequest, TimeLog))
+    db.session.commit()
+
+    # Entitlements: an opening balance, monthly accruals, and a debit per approved annual/sick request.
+    _insert(LeaveLedger, [{"user_id": uid, "type": "annual", "kind": "adjustment", "days": 20.0,
+                           "note": "opening balance", "posted_at": datetime.combine(start, datetime.min.time())}
+                          for uid in range(1, staff + 1)])
+    month = date(start.year, start.month, 1)
+    while month <= start + timedelta(days=days - 1):
+        leave.accrue(f"{month:%Y-%m}", ACCRUALS, ["staff"])
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    _insert(LeaveLedger, [{"user_id": r["requester_id"], "type": r["type"], "kind": "debit", "leave_id": r["id"],
+                           "days": -float((r["end_date"] - r["start_date"]).days + 1),
+                           "posted_at": datetime.combine(r["start_date"], datetime.min.time())}
+                          for r in requests if r["status"] == "approved" and r["type"] in ACCRUALS])
+    leave.rebuild_balances()
+    attendance.rebuild()
+    availability.rebuild()
+    leave.rebuild_calendar()
+    notify.recount_unread()
+    db.session.commit()
+
+    clockable = [(staff_email(s["user_id"]), s["id"]) for s in shifts
+                 if s["status"] == "scheduled" and s["user_id"] <= staff]
+    return {"users": len(users), "shifts": len(shifts), "timelogs": len(logs), "breaks": len(breaks),
+            "leave": len(requests), "swaps": len(swaps), "notifications": len(notes),
+            "week": start + timedelta(days=((weeks // 2) - 1) * 7), "today": today,
+            "clockable": clockable, "pending_swaps": [s["id"] for s in swaps if s["status"] == "pending"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="sqlite:///bench.db", help="database to fill (SQLite or PostgreSQL)")
+    parser.add_argument("--staff", type=int, default=1000)
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--start", type=date.fromisoformat, default=START, help="first Monday (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    args = parser.parse_args()
+
+    app = make_app(args.uri)
+    with app.app_context():
+        if args.reset:
+            db.drop_all(); db.create_all()
+        t0 = time.perf_counter()
+        try:
+            counts = generate(args.staff, args.weeks, args.start, args.seed)
+        except ValueError as e:
+            raise SystemExit(f"{e} (use --reset to replace it)")
+        print(", ".join(f"{k}={v}" for k, v in counts.items() if isinstance(v, int)))
+        print(f"history until {counts['today']}, generated in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
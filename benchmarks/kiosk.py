@@ -0,0 +1,104 @@
+"""Benchmark POST /api/punches (queued, group-committed) against one clock_in() call per punch.
+
+    python -m benchmarks.kiosk --staff 2000 --threads 32
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from App.database import db
+from App.main import create_app
+from App.models.core import User, Shift
+from App.controllers import create_user, login
+from App.controllers import staff_controller as staff
+from benchmarks.common import measure
+
+
+def seed(staff_count, start):
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+        for i in range(1, staff_count + 1)
+    ])
+    db.session.execute(insert(Shift), [
+        {"user_id": i, "work_date": start.date(), "start_time": start, "end_time": start + timedelta(hours=8),
+         "status": "scheduled"} for i in range(1, staff_count + 1)
+    ])
+    db.session.commit()
+
+
+def punches(ids, kind, at):
+    return [{"key": f"{kind}-{i}", "email": f"staff{i}@bench.local", "type": kind, "at": at.isoformat()}
+            for i in ids]
+
+
+def run(app, headers, bodies, threads):
+    clients = {}  # one test client per thread
+
+    def send(body):
+        client = clients.setdefault(threading.get_ident(), app.test_client())
+        res = client.post("/api/punches", json=body, headers=headers)
+        assert res.status_code == 200, res.get_data(as_text=True)
+        return res.get_json()["results"]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = [r for batch in pool.map(send, bodies) for r in batch]
+    return results, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--kiosk-batch", type=int, default=50, help="punches per request in the batched run")
+    parser.add_argument("--legacy-sample", type=int, default=300, help="clock_in calls to time")
+    args = parser.parse_args()
+    start = datetime(2026, 1, 5, 9)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A file database, so every commit pays for the journal like a real deployment.
+        # The full app (JWT, blueprints), not benchmarks.common.make_app's bare factory.
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.db')}", "TESTING": True,
+                          "CREATE_SCHEMA": True})
+        with app.app_context():
+            seed(args.staff, start)
+            create_user("kiosk", "kioskpass")
+            headers = {"Authorization": f"Bearer {login('kiosk', 'kioskpass')}"}
+            ids = range(1, args.staff + 1)
+
+            with measure(f"clock-in x{args.legacy_sample} (legacy)"):
+                t0 = time.perf_counter()
+                for i in ids[:args.legacy_sample]:
+                    staff.clock_in(f"staff{i}@bench.local", i)
+                legacy = args.legacy_sample / (time.perf_counter() - t0)
+
+        with app.app_context():
+            todo = ids[args.legacy_sample:]
+            singles = [[p] for p in punches(todo, "in", start)]
+            with measure(f"punch in x{len(singles)}, 1/request"):
+                results, single_secs = run(app, headers, singles, args.threads)
+            assert all(r["status"] == "ok" for r in results), results[:3]
+
+            outs = punches(todo, "out", start + timedelta(hours=8))
+            batched = [outs[i:i + args.kiosk_batch] for i in range(0, len(outs), args.kiosk_batch)]
+            with measure(f"punch out x{len(outs)}, {args.kiosk_batch}/request"):
+                results, batch_secs = run(app, headers, batched, args.threads)
+            assert all(r["status"] == "ok" for r in results), results[:3]
+
+            with measure(f"retry x{len(outs)} (all duplicates)"):
+                results, _ = run(app, headers, batched, args.threads)
+            assert all(r["status"] == "duplicate" for r in results)
+
+        print(f"legacy clock_in:        {legacy:10.0f} punches/s")
+        print(f"endpoint, 1/request:    {len(singles) / single_secs:10.0f} punches/s")
+        print(f"endpoint, batched:      {len(outs) / batch_secs:10.0f} punches/s")
+
+
+if __name__ == "__main__":
+    main()
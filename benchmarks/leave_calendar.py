@@ -0,0 +1,74 @@
+"""Benchmark the leave calendar over years of requests against expanding overlapping requests in Python.
+
+    python -m benchmarks.leave_calendar --staff 5000 --years 5
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.core import User, LeaveRequest
+from App.controllers import leave_controller as leave
+from benchmarks.common import make_app, measure
+
+
+def seed(start, staff, years, seed=42):
+    """Six requests a year per user, 1 to 10 days long; four in five approved."""
+    rng = random.Random(seed)
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+        for i in range(1, staff + 1)
+    ])
+    rows = []
+    for uid in range(1, staff + 1):
+        for _ in range(6 * years):
+            first = start + timedelta(days=rng.randrange(365 * years))
+            rows.append({"requester_id": uid, "start_date": first, "end_date": first + timedelta(days=rng.randrange(10)),
+                         "type": "annual", "status": rng.choice(("approved",) * 4 + ("rejected",))})
+    db.session.execute(insert(LeaveRequest), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def scan(start, end):
+    """The old way: every approved request overlapping the range, expanded day by day in Python."""
+    absent = {}
+    for uid, first, last in db.session.execute(
+            select(LeaveRequest.requester_id, LeaveRequest.start_date, LeaveRequest.end_date)
+            .where(LeaveRequest.status == 'approved', LeaveRequest.start_date <= end, LeaveRequest.end_date >= start)):
+        for d in range((min(last, end) - max(first, start)).days + 1):
+            absent.setdefault(max(first, start) + timedelta(days=d), set()).add(uid)
+    return {day: len(users) for day, users in absent.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+    start = date(2021, 1, 1)
+
+    app = make_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        requests = seed(start, args.staff, args.years)
+        print(f"seeded {requests} leave requests in {time.perf_counter() - t0:.1f} s")
+        with measure("rebuild calendar"):
+            days = leave.rebuild_calendar()
+        print(f"{'':<32} {days} leave days")
+
+        last = start + timedelta(days=365 * args.years - 1)
+        for label, first in (("month", last - timedelta(days=30)), ("quarter", last - timedelta(days=90)),
+                             ("year", last - timedelta(days=364))):
+            with measure(f"calendar, last {label}"):
+                cal = leave.calendar(first, last)
+            with measure(f"overlap scan, last {label}"):
+                assert scan(first, last) == {date.fromisoformat(d["day"]): d["absent"]
+                                             for d in cal["days"] if d["absent"]}
+
+
+if __name__ == "__main__":
+    main()
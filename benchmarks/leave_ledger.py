@@ -0,0 +1,65 @@
+"""Benchmark monthly leave accruals for the whole workforce, and balance checks against summing history.
+
+    python -m benchmarks.leave_ledger --staff 20000 --months 24
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import insert, select, func
+
+from App.database import db
+from App.models.core import User, LeaveLedger
+from App.controllers import leave_controller as leave
+from benchmarks.common import make_app, measure
+
+RATES = {"annual": 2.08, "sick": 1.0}
+
+
+def per_user(period):
+    """The row-at-a-time way: one posting (ledger row and snapshot update) per user and type."""
+    for uid in db.session.scalars(select(User.id)):
+        for kind, days in RATES.items():
+            leave.post(uid, kind, 'accrual', days)
+    db.session.commit()
+
+
+def history_sum(uid, kind):
+    """What a balance check costs without the snapshot: sum the user's whole ledger for the type."""
+    return db.session.scalar(select(func.sum(LeaveLedger.days))
+                             .where(LeaveLedger.user_id == uid, LeaveLedger.type == kind))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=20000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--checks", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+            for i in range(1, args.staff + 1)
+        ])
+        db.session.commit()
+        t0 = time.perf_counter()
+        for m in range(args.months - 1):
+            leave.accrue(f"{2024 + m // 12}-{m % 12 + 1:02d}", RATES)
+        per_month = (time.perf_counter() - t0) / max(args.months - 1, 1)
+        print(f"{'accrue, set-based':<32} {per_month * 1000:10.1f} ms per month "
+              f"({args.staff * len(RATES)} postings)")
+        with measure("accrue, one posting at a time"):
+            per_user("last")
+
+        users = random.Random(7).choices(range(1, args.staff + 1), k=args.checks)
+        with measure(f"balance snapshot x{args.checks}"):
+            snap = [leave.balance(uid, "annual") for uid in users]
+        with measure(f"ledger sum x{args.checks}"):
+            summed = [history_sum(uid, "annual") for uid in users]
+        assert all(abs(a - b) < 1e-6 for a, b in zip(snap, summed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Load test the connection pool: request throughput as concurrency grows past the pool's capacity.
+
+    python -m benchmarks.pool --pool-size 8 --max-overflow 4 --latency 20
+    python -m benchmarks.pool --uri postgresql+psycopg2://... --gevent
+
+Each request runs a roster query and then holds its connection for --latency ms, standing in for
+the network round trips of a real database. Throughput should grow with concurrency until the pool
+is saturated; past that, requests queue for a connection (wait) instead of adding throughput.
+"""
+import sys
+
+if "--gevent" in sys.argv:
+    from gevent import monkey
+    monkey.patch_all()
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import select, func
+
+from App.database import db, MeteredQueuePool, pool_stats
+from App.models.core import Shift
+from benchmarks.common import make_app, seed_week
+
+
+def run(app, concurrency, requests, latency):
+    def request(i):
+        t0 = time.perf_counter()
+        with app.app_context():
+            try:
+                db.session.execute(select(func.count(Shift.id)).where(Shift.user_id == 1 + i % 500)).scalar()
+                time.sleep(latency)  # the connection stays checked out until the session is removed
+            finally:
+                db.session.remove()
+        return time.perf_counter() - t0
+
+    with app.app_context():
+        db.engine.pool.reset_stats()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        times = sorted(pool.map(request, range(requests)))
+    return requests / (time.perf_counter() - t0), times[int(len(times) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="database to test (default: a temporary SQLite file)")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--max-overflow", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=20, help="ms each request holds its connection")
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32,64")
+    parser.add_argument("--gevent", action="store_true", help="monkey-patch and patch psycopg2, like the workers")
+    args = parser.parse_args()
+    if args.gevent and args.uri and args.uri.startswith("postgresql"):
+        from App.database import make_psycopg_green
+        make_psycopg_green()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = args.uri or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # The production profile's pool, sized by the flags instead of the worker count.
+        app = make_app(uri, SQLALCHEMY_ENGINE_OPTIONS={
+            "poolclass": MeteredQueuePool, "pool_size": args.pool_size, "max_overflow": args.max_overflow,
+            "pool_timeout": 30, "pool_pre_ping": True})
+        with app.app_context():
+            if args.uri is None:
+                seed_week(datetime(2026, 1, 5), staff=500)
+
+        print(f"pool {args.pool_size}+{args.max_overflow}, {args.latency:.0f} ms per request, "
+              f"{'gevent' if args.gevent else 'threads'}")
+        print(f"{'concurrency':>11} {'req/s':>9} {'p95 ms':>9} {'wait avg':>9} {'wait max':>9} {'peak sat':>9}")
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            rate, p95 = run(app, concurrency, args.requests, args.latency / 1000)
+            with app.app_context():
+                stats = pool_stats()
+            print(f"{concurrency:>11} {rate:>9.0f} {p95 * 1000:>9.1f} {stats['wait_avg_ms']:>9.1f} "
+                  f"{stats['wait_max_ms']:>9.1f} {stats['peak_saturation']:>9.2f}")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark `flask roster report-week`: legacy per-row loop vs grouped SQL aggregates.
+
+    python -m benchmarks.report_week --staff 2000
+"""
+import argparse
+from datetime import datetime
+
+from App.database import db
+from App.models.core import User, Shift, TimeLog
+from App.controllers import report_controller as reports
+from benchmarks.common import make_app, seed_week, measure
+
+
+def legacy_report(week_start):
+    # The pre-aggregation implementation, kept here for comparison only.
+    start_dt, end_dt = reports.week_window(week_start)
+    stats = {}
+
+    def ensure(uid):
+        if uid not in stats:
+            u = db.session.get(User, uid)
+            stats[uid] = {"name": u.name, "scheduled": 0, "completed": 0, "missed": 0, "worked_minutes": 0}
+
+    for sh in Shift.query.filter(Shift.start_time >= start_dt, Shift.end_time <= end_dt).all():
+        ensure(sh.user_id)
+        stats[sh.user_id]["scheduled"] += 1
+        if sh.status in ("completed", "missed"):
+            stats[sh.user_id][sh.status] += 1
+    logs = (TimeLog.query.filter(TimeLog.clock_out != None)  # noqa: E711
+            .filter(TimeLog.clock_in >= start_dt, TimeLog.clock_out <= end_dt).all())
+    for tl in logs:
+        ensure(tl.user_id)
+        stats[tl.user_id]["worked_minutes"] += tl.worked_minutes()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=2000)
+    parser.add_argument("--week", default="2025-10-06")
+    args = parser.parse_args()
+
+    with make_app().app_context():
+        week_start = datetime.fromisoformat(args.week)
+        seed_week(week_start, staff=args.staff)
+        print(f"staff={args.staff} week={args.week} (seeded {Shift.query.count()} shifts)")
+
+        with measure("report-week (aggregate)") as q:
+            report = reports.weekly_report(args.week)
+        assert q.count == 1, q.count
+        db.session.expunge_all()
+        with measure("report-week (legacy loop)"):
+            legacy = legacy_report(args.week)
+
+        mismatched = [r for r in report["rows"] if legacy[r["user_id"]]["worked_minutes"] != r["worked_minutes"]]
+        print(f"rows={len(report['rows'])} mismatches vs TimeLog.worked_minutes(): {len(mismatched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark `flask roster import` against one assign_shift() call per shift.
+
+    python -m benchmarks.roster_import --staff 500 --days 200
+"""
+import argparse
+import csv
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from App.database import db
+from App.models.core import User, Shift
+from App.controllers import admin_controller as admin
+from benchmarks.common import make_app, measure
+
+
+def write_csv(path, staff, days, start):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["email", "start", "end"])
+        for day in range(days):
+            for uid in range(1, staff + 1):
+                s = start + timedelta(days=day, hours=9)
+                writer.writerow([f"staff{uid}@bench.local", s.isoformat(), (s + timedelta(hours=8)).isoformat()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=500)
+    parser.add_argument("--days", type=int, default=200)
+    parser.add_argument("--legacy-sample", type=int, default=500, help="assign_shift calls to time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A file database, so commits pay for the journal like a real deployment.
+        with make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}").app_context():
+            db.session.execute(insert(User), [
+                {"name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+                for i in range(1, args.staff + 1)
+            ])
+            db.session.commit()
+            path = os.path.join(tmp, "shifts.csv")
+            write_csv(path, args.staff, args.days, datetime(2026, 1, 1))
+            total = args.staff * args.days
+
+            with measure(f"roster import ({total} rows)"):
+                inserted, errors = admin.import_shifts(admin.read_shift_file(path))
+            assert inserted == total and not errors, (inserted, errors[:3])
+
+            n = args.legacy_sample
+            with measure(f"assign_shift x{n}") as q:
+                for i in range(n):
+                    s = datetime(2027, 1, 1) + timedelta(hours=i)
+                    admin.assign_shift(f"staff{i % args.staff + 1}@bench.local", s.isoformat(),
+                                       (s + timedelta(hours=8)).isoformat())
+            print(f"shifts={Shift.query.count()} (assign_shift: {q.count / n:.0f} queries per shift)")
+
+
+if __name__ == "__main__":
+    main()
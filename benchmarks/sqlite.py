@@ -0,0 +1,81 @@
+"""Parallel clock-in/clock-out writers on a SQLite file: default settings against the tuned profile.
+
+    python -m benchmarks.sqlite --staff 400 --threads 16
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import exc, insert, text
+
+from App.database import db
+from App.models.core import User, Shift
+from App.controllers import staff_controller as staff
+from benchmarks.common import make_app
+
+
+def seed(staff_count, start):
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+        for i in range(1, staff_count + 1)
+    ])
+    db.session.execute(insert(Shift), [
+        {"id": i, "user_id": i, "work_date": start.date(), "start_time": start,
+         "end_time": start + timedelta(hours=8), "status": "scheduled"} for i in range(1, staff_count + 1)
+    ])
+    db.session.commit()
+
+
+def run(app, staff_count, threads):
+    """Clock every staff member in and out from `threads` writers; returns (seconds, locked errors)."""
+    def shift(i):
+        email, locked = f"staff{i}@bench.local", 0
+        with app.app_context():
+            try:
+                try:
+                    tl = staff.clock_in(email, i)
+                    staff.clock_out(email, tl.id)
+                except exc.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    db.session.rollback()
+                    locked += 1
+            finally:
+                db.session.remove()
+        return locked
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        locked = sum(pool.map(shift, range(1, staff_count + 1)))
+    return time.perf_counter() - t0, locked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+    start = datetime(2026, 1, 5, 9)
+
+    runs = (("default", {}), ("tuned (DB_PROFILE=production)", {"DB_PROFILE": "production"}),
+            ("tuned, BEGIN IMMEDIATE", {"DB_PROFILE": "production", "SQLITE_BEGIN": "IMMEDIATE"}))
+    for label, config in runs:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", **config)
+            with app.app_context():
+                seed(args.staff, start)
+                mode = db.session.execute(text("PRAGMA journal_mode")).scalar()
+                db.session.remove()
+            seconds, locked = run(app, args.staff, args.threads)
+            with app.app_context():
+                db.engine.dispose()
+        shifts = args.staff - locked
+        print(f"{label:<30} journal={mode:<8} {seconds * 1000:9.1f} ms {shifts / seconds:9.0f} shifts/s"
+              f" {locked:6d} 'database is locked'")
+
+
+if __name__ == "__main__":
+    main()
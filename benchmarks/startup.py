@@ -0,0 +1,80 @@
+"""Time cold `flask` CLI invocations, lazy (FLASK_LAZY_STARTUP) against eager startup.
+
+    python -m benchmarks.startup --runs 10 --max-ms 200
+
+Exits non-zero when the lazy `template list` median is over --max-ms, so CI can gate on it.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = [["--help"], ["template", "list"]]
+
+
+def flask(args, env):
+    return subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", *args], cwd=ROOT, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+
+
+def time_command(args, env, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        flask(args, env)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def slowest_imports(args, env, top):
+    """Cumulative import time per top-level package for one run, from -X importtime."""
+    err = flask(args, dict(env, PYTHONPROFILEIMPORTTIME="1")).stderr
+    totals = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit() and "." not in name.strip():
+            totals[name.strip()] = max(totals.get(name.strip(), 0), int(cumulative))
+    return sorted(totals.items(), key=lambda kv: -kv[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=200.0, help="budget for the lazy `template list` median")
+    parser.add_argument("--skip-eager", action="store_true", help="only time the lazy startup")
+    parser.add_argument("--imports", type=int, default=10, help="show the N slowest top-level imports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        lazy, eager = dict(base, FLASK_LAZY_STARTUP="true"), dict(base, FLASK_LAZY_STARTUP="false")
+        flask(["init", "db"], lazy)
+
+        medians = {}
+        for cmd in COMMANDS:
+            label = "flask " + " ".join(cmd)
+            medians[label] = time_command(cmd, lazy, args.runs)
+            line = f"{label:<24} lazy {medians[label]:8.1f} ms"
+            if not args.skip_eager:
+                line += f"   eager {time_command(cmd, eager, args.runs):8.1f} ms"
+            print(line)
+
+        if args.imports:
+            print(f"\nslowest imports, lazy `flask {' '.join(COMMANDS[-1])}` (cumulative ms):")
+            for name, us in slowest_imports(COMMANDS[-1], lazy, args.imports):
+                print(f"  {name:<28} {us / 1000:8.1f}")
+
+    gated = medians["flask " + " ".join(COMMANDS[-1])]
+    if gated > args.max_ms:
+        sys.exit(f"FAIL: lazy startup median {gated:.1f} ms is over the {args.max_ms:.0f} ms budget")
+    print(f"\nok: lazy startup median {gated:.1f} ms (budget {args.max_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
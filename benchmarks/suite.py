@@ -0,0 +1,185 @@
+"""Time controllers and CLI commands across data sizes, and gate on regressions against a baseline.
+
+    python -m benchmarks.suite --sizes 200,1000 --weeks 8 --out bench.json
+    python -m benchmarks.suite --sizes 200,1000 --weeks 8 --baseline bench.json --tolerance 0.25
+
+Each size gets a freshly generated database (benchmarks.generate): a temporary SQLite file, or
+--uri, whose tables are dropped and recreated. Every case runs --repeat times for the median time
+and query count, then once more under tracemalloc for its peak Python memory. Cases that write
+(clock_in, approve_swap) act on a different shift or swap each run.
+
+With --baseline, a case regresses when it issues more queries than before, or when its time or
+peak memory grew by more than --tolerance and by more than the --min-ms / --min-kib noise floors.
+Any regression makes the run exit non-zero, after --out has been written.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from App.database import db
+from App.controllers import attendance_controller as attendance
+from App.controllers import leave_controller as leave
+from App.controllers import notify_controller as notify
+from App.controllers import report_controller as reports
+from App.controllers import staff_controller as staff
+from App.controllers import swap_controller as swap
+from App.cli import SESSION_FILE
+from App.cli.leave import leave_cli
+from App.cli.roster import roster_cli
+from App.cli.swap import swap_cli
+from benchmarks.common import QueryCounter, make_app
+from benchmarks.generate import ADMIN, generate
+
+# name -> fn(data, run) over the generated `data`; `run` counts from 0 across every call of the case.
+CASES = {
+    "report_week": lambda d, i: reports.weekly_report(d["week"].isoformat()),
+    "report_week rollup": lambda d, i: attendance.weekly_report(d["week"].isoformat()),
+    "list_leave": lambda d, i: sum(1 for _ in leave.list_leave()),
+    "leave calendar": lambda d, i: leave.calendar(d["week"], d["week"] + timedelta(days=27)),
+    "list_swaps": lambda d, i: sum(1 for _ in swap.list_swaps()),
+    "view_roster": lambda d, i: sum(1 for _ in staff.view_roster(d["week"], d["week"] + timedelta(days=6))),
+    "inbox": lambda d, i: notify.inbox(1),
+    "clock_in": lambda d, i: staff.clock_in(*d["clockable"][i]),
+    "approve_swap": lambda d, i: swap.approve_swap(d["pending_swaps"][i], ADMIN, "approved"),
+}
+
+# name -> (group, fn(data, run) -> args, session email); run in-process, output captured and dropped.
+COMMANDS = {
+    "flask roster report-week": (roster_cli, lambda d, i: ["report-week", d["week"].isoformat()], ADMIN),
+    "flask leave list": (leave_cli, lambda d, i: ["list"], ADMIN),
+    "flask swap list": (swap_cli, lambda d, i: ["list"], ADMIN),
+    "flask roster view": (roster_cli, lambda d, i: ["view", "--from", d["week"].isoformat(),
+                                                    "--to", (d["week"] + timedelta(days=6)).isoformat()], ADMIN),
+    "flask roster clock-in": (roster_cli, lambda d, i: ["clock-in", *map(str, d["clockable"][-1 - i])],
+                              lambda d, i: d["clockable"][-1 - i][0]),
+    "flask swap decide": (swap_cli, lambda d, i: ["decide", str(d["pending_swaps"][-1 - i]), ADMIN, "approved"],
+                          ADMIN),
+}
+
+
+def _command(app, group, args, email):
+    def run(d, i):
+        with open(SESSION_FILE, "w") as f:
+            json.dump({"email": email(d, i) if callable(email) else email}, f)
+        result = app.test_cli_runner().invoke(group, args(d, i))
+        if result.exit_code:
+            raise RuntimeError(f"{group.name} {' '.join(args(d, i))} failed: {result.output}{result.exception or ''}")
+    return run
+
+
+def time_case(fn, data, repeat):
+    """(median seconds, queries of the last run, peak KiB) over `repeat` timed runs and one traced run."""
+    counter = QueryCounter()
+    samples = []
+    for i in range(repeat):
+        db.session.expire_all()  # each run starts from the database, not from the last run's objects
+        counter.count = 0
+        event.listen(db.engine, "before_cursor_execute", counter)
+        t0 = time.perf_counter()
+        try:
+            fn(data, i)
+        finally:
+            samples.append(time.perf_counter() - t0)
+            event.remove(db.engine, "before_cursor_execute", counter)
+    db.session.expire_all()
+    tracemalloc.start()
+    try:
+        fn(data, repeat)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return statistics.median(samples), counter.count, peak / 1024
+
+
+def run_size(uri, size, weeks, repeat, only=None):
+    app = make_app(uri)
+    results = {}
+    with app.app_context():
+        db.drop_all(); db.create_all()
+        t0 = time.perf_counter()
+        data = generate(size, weeks)
+        print(f"staff={size}: {data['shifts']} shifts, {data['timelogs']} timelogs, {data['leave']} leave, "
+              f"{data['swaps']} swaps, {data['notifications']} notifications in {time.perf_counter() - t0:.1f} s")
+        cases = {**CASES, **{name: _command(app, *spec) for name, spec in COMMANDS.items()}}
+        for name, fn in cases.items():
+            if only and not any(word in name for word in only):
+                continue
+            seconds, queries, peak = time_case(fn, data, repeat)
+            results[f"{name} @{size}"] = {"case": name, "staff": size, "seconds": seconds,
+                                          "queries": queries, "peak_kib": round(peak, 1)}
+            print(f"  {name:<28} {seconds * 1000:10.2f} ms {queries:6d} queries {peak:10.0f} KiB peak")
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_ms=5.0, min_kib=256.0):
+    """Regression messages for cases in both runs: more queries, or slower / bigger past the tolerance and floor."""
+    problems = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if new["queries"] > old["queries"]:
+            problems.append(f"{key}: {old['queries']} -> {new['queries']} queries")
+        grew_ms = (new["seconds"] - old["seconds"]) * 1000
+        if grew_ms > min_ms and new["seconds"] > old["seconds"] * (1 + tolerance):
+            problems.append(f"{key}: {old['seconds'] * 1000:.1f} -> {new['seconds'] * 1000:.1f} ms")
+        grew_kib = new["peak_kib"] - old["peak_kib"]
+        if grew_kib > min_kib and new["peak_kib"] > old["peak_kib"] * (1 + tolerance):
+            problems.append(f"{key}: {old['peak_kib']:.0f} -> {new['peak_kib']:.0f} KiB peak")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="200,1000", help="comma-separated staff counts")
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--uri", default=None, help="database to use (reset for every size); default a temp SQLite file")
+    parser.add_argument("--only", action="append", help="run cases whose name contains this (repeatable)")
+    parser.add_argument("--out", default=None, help="write results as JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth in time and memory")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="time growth below this is noise")
+    parser.add_argument("--min-kib", type=float, default=256.0, help="memory growth below this is noise")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # CLI cases log in through a session file in the working directory
+        try:
+            for size in sizes:
+                uri = args.uri or f"sqlite:///{os.path.join(tmp, f'bench{size}.db')}"
+                results.update(run_size(uri, size, args.weeks, args.repeat, args.only))
+        finally:
+            os.chdir(cwd)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "weeks": args.weeks, "repeat": args.repeat, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f)["results"], args.tolerance, args.min_ms, args.min_kib)
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if problems:
+            sys.exit(f"FAIL: {len(problems)} regressions against {args.baseline}")
+        print(f"\nok: no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark the swap-candidate finder against checking every staff member with per-candidate queries.
+
+    python -m benchmarks.swap_candidates --staff 5000 --weeks 4
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.core import User, Shift
+from App.controllers import availability_controller as availability
+from App.controllers import conflict_controller as conflicts
+from benchmarks.common import make_app, measure
+
+
+def seed(start, staff, weeks, seed=42):
+    """Four 8-hour shifts a week per user, on one of three start times."""
+    rng = random.Random(seed)
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+        for i in range(1, staff + 1)
+    ])
+    shifts = []
+    for uid in range(1, staff + 1):
+        for day in range(weeks * 7):
+            if (uid + day) % 7 >= 4:
+                continue
+            begin = start + timedelta(days=day, hours=rng.choice((6, 9, 14)))
+            shifts.append({"user_id": uid, "work_date": begin.date(), "start_time": begin,
+                           "end_time": begin + timedelta(hours=8), "status": "scheduled"})
+    db.session.execute(insert(Shift), shifts)
+    db.session.commit()
+    return len(shifts)
+
+
+def per_candidate(shift):
+    """The old way: one overlap query per staff member (rest and weekly hours not even checked)."""
+    found = []
+    for uid in db.session.scalars(select(User.id).where(User.role == 'staff', User.id != shift.user_id)):
+        try:
+            conflicts.check_shift(uid, shift.start_time, shift.end_time)
+        except conflicts.ConflictError:
+            continue
+        found.append(uid)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=5000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=20)
+    args = parser.parse_args()
+    start = datetime(2026, 1, 5)
+
+    app = make_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        shifts = seed(start, args.staff, args.weeks)
+        print(f"seeded {shifts} shifts in {time.perf_counter() - t0:.1f} s")
+        with measure("rebuild availability"):
+            availability.rebuild()
+
+        ids = random.Random(7).sample(range(1, shifts + 1), args.lookups)
+        t0 = time.perf_counter()
+        with measure(f"candidates x{args.lookups}"):
+            found = [availability.candidates(sid) for sid in ids]
+        per_lookup = (time.perf_counter() - t0) / args.lookups
+        print(f"{'':<32} {per_lookup * 1000:10.1f} ms per lookup, {sum(map(len, found)) / len(found):.0f} shown")
+
+        with measure("per-candidate queries x1"):
+            per_candidate(db.session.get(Shift, ids[0]))
+
+
+if __name__ == "__main__":
+    main()
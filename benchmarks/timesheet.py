@@ -0,0 +1,93 @@
+"""Benchmark the streaming timesheet export over a year of data against TimeLog.worked_minutes() per log.
+
+    python -m benchmarks.timesheet --staff 1000 --days 365
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from App.database import db
+from App.models.core import User, Shift, TimeLog, BreakLog
+from App.controllers import timesheet_controller as timesheets
+from benchmarks.common import make_app, measure
+
+
+def seed_year(start, staff, days, seed=42):
+    """Weekday shifts for `staff` users over `days` days: one timelog and one break each."""
+    rng = random.Random(seed)
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"Staff {i}", "email": f"staff{i}@bench.local", "role": "staff"}
+        for i in range(1, staff + 1)
+    ])
+    sid = 0
+    for day in range(days):
+        begin = datetime.combine(start + timedelta(days=day), datetime.min.time()) + timedelta(hours=9)
+        if begin.weekday() >= 5:
+            continue
+        shifts, logs, breaks = [], [], []
+        for uid in range(1, staff + 1):
+            sid += 1
+            clock_in = begin + timedelta(minutes=rng.randint(-5, 15))
+            shifts.append({"id": sid, "user_id": uid, "work_date": begin.date(), "start_time": begin,
+                           "end_time": begin + timedelta(hours=8), "status": "completed"})
+            logs.append({"id": sid, "shift_id": sid, "user_id": uid, "clock_in": clock_in,
+                         "clock_out": clock_in + timedelta(hours=8, minutes=rng.randint(-10, 20)), "source": "app"})
+            breaks.append({"timelog_id": sid, "break_start": clock_in + timedelta(hours=4),
+                           "break_end": clock_in + timedelta(hours=4, minutes=rng.choice((15, 30, 45)))})
+        db.session.execute(insert(Shift), shifts)
+        db.session.execute(insert(TimeLog), logs)
+        db.session.execute(insert(BreakLog), breaks)
+    db.session.commit()
+    return sid
+
+
+def export(start, end, fmt):
+    with open(os.devnull, "w") as out:
+        return sum(out.write(chunk) for chunk in timesheets.export(start, end, fmt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--legacy-sample", type=int, default=2000, help="timelogs to time worked_minutes() on")
+    args = parser.parse_args()
+    start = date(2025, 1, 1)
+    end = start + timedelta(days=args.days - 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with app.app_context():
+            t0 = time.perf_counter()
+            logs = seed_year(start, args.staff, args.days)
+            print(f"seeded {logs} timelogs in {time.perf_counter() - t0:.1f} s")
+
+            with measure(f"legacy worked_minutes x{args.legacy_sample}"):
+                t0 = time.perf_counter()
+                sample = db.session.scalars(select(TimeLog).limit(args.legacy_sample)).all()
+                sum(tl.worked_minutes() for tl in sample)
+                legacy = (time.perf_counter() - t0) / len(sample) * logs
+            db.session.expunge_all()
+
+            for fmt in timesheets.FORMATS:
+                with measure(f"export {fmt}, {args.days} days"):
+                    size = export(start, end, fmt)
+                print(f"{'':<32} {size / 1e6:10.1f} MB written")
+
+            # A separate pass: tracing slows Python down several times over.
+            tracemalloc.start()
+            export(start, end, "csv")
+            print(f"peak memory during the csv export: {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+            tracemalloc.stop()
+
+        print(f"legacy, extrapolated to {logs} timelogs: {legacy:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
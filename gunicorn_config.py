@@ -1,19 +1,49 @@
 # gunicorn_config.py
 import multiprocessing
+import os
+import shutil
+import tempfile
 
 # The socket to bind.
 # "0.0.0.0" to bind to all interfaces. 8000 is the port number.
 bind = "0.0.0.0:8080"
 
 # The number of worker processes for handling requests.
-workers = 4
+# gevent workers get their concurrency from greenlets, so one per core; WEB_CONCURRENCY overrides it.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
 
 # Use the 'gevent' worker type for async performance.
 worker_class = 'gevent'
 
+# Greenlets (concurrent requests) per worker.
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Production DB profile: each worker sizes its SQLAlchemy pool from these (see App/config.py).
+# The config file runs in the master before it forks, so the workers inherit them.
+os.environ.setdefault('FLASK_DB_PROFILE', 'production')
+os.environ.setdefault('FLASK_DB_WORKERS', str(workers))
+os.environ.setdefault('FLASK_DB_GREENLETS', str(worker_connections))
+
+# Prometheus multiprocess mode: every worker writes its samples under this directory and /metrics
+# sums them. It is emptied when the master starts, so a restart doesn't replay the last run's totals.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'roster-metrics'))
+
+def on_starting(server):
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+def child_exit(server, worker):
+    from App.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+def post_worker_init(worker):
+    # After gevent has monkey-patched the worker: make psycopg2 wait cooperatively too.
+    from App.database import make_psycopg_green
+    make_psycopg_green()
+
 # Log level
 loglevel = 'info'
 
 # Where to log to
 accesslog = '-'  # '-' means log to stdout
-errorlog = '-'  # '-' means log to stderr
\ No newline at end of file
+errorlog = '-'  # '-' means log to stderr
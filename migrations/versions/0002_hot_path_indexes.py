@@ -0,0 +1,53 @@
+"""hot path indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 15:50:43.695560
+
+Composite indexes for the roster, report, leave, swap and notification
+queries. db.create_all() creates these on fresh databases, so any index
+that already exists is left alone.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('shifts', 'ix_shifts_start_end', ['start_time', 'end_time']),
+    ('shifts', 'ix_shifts_user_start', ['user_id', 'start_time']),
+    ('timelogs', 'ix_timelogs_clock_in_out', ['clock_in', 'clock_out']),
+    ('timelogs', 'ix_timelogs_user_clock_in', ['user_id', 'clock_in']),
+    ('timelogs', 'ix_timelogs_shift', ['shift_id']),
+    ('breaklogs', 'ix_breaklogs_timelog', ['timelog_id']),
+    ('exception_flags', 'ix_exception_flags_shift', ['shift_id']),
+    ('leave_requests', 'ix_leave_requests_status_id', ['status', 'id']),
+    ('leave_requests', 'ix_leave_requests_requester_id', ['requester_id', 'id']),
+    ('swap_requests', 'ix_swap_requests_status_id', ['status', 'id']),
+    ('swap_requests', 'ix_swap_requests_from_user_id', ['from_user_id', 'id']),
+    ('swap_requests', 'ix_swap_requests_to_user_id', ['to_user_id', 'id']),
+    ('notifications', 'ix_notifications_recipient_created', ['recipient_id', 'created_at']),
+]
+
+
+def _existing(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        if name not in _existing(table):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, name, _ in reversed(INDEXES):
+        if name in _existing(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,69 @@
+"""shift templates and holidays
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 16:02:10.418733
+
+Adds recurring shift templates, public holidays, and shifts.template_id
+linking expanded shifts back to their template. Objects that
+db.create_all() already made are skipped.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def upgrade():
+    if not _inspector().has_table('shift_templates'):
+        op.create_table('shift_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('weekdays', sa.String(length=20), nullable=True),
+        sa.Column('on_days', sa.Integer(), nullable=True),
+        sa.Column('off_days', sa.Integer(), nullable=True),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('anchor_date', sa.Date(), nullable=False),
+        sa.Column('until_date', sa.Date(), nullable=True),
+        sa.Column('skip_holidays', sa.Boolean(), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=True),
+        sa.Column('expanded_until', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _inspector().has_table('holidays'):
+        op.create_table('holidays',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('date')
+        )
+    if 'template_id' not in {c['name'] for c in _inspector().get_columns('shifts')}:
+        with op.batch_alter_table('shifts', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('template_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_shifts_template_id', 'shift_templates', ['template_id'], ['id'])
+    if 'ix_shifts_template_date' not in {ix['name'] for ix in _inspector().get_indexes('shifts')}:
+        op.create_index('ix_shifts_template_date', 'shifts', ['template_id', 'work_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_shifts_template_date', table_name='shifts')
+    with op.batch_alter_table('shifts', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_shifts_template_id', type_='foreignkey')
+        batch_op.drop_column('template_id')
+    op.drop_table('holidays')
+    op.drop_table('shift_templates')
@@ -0,0 +1,32 @@
+"""sweep high-water marks
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 16:40:12.203118
+
+Adds sweep_marks, where incremental jobs such as the exception sweep
+record how far they have got. Skipped if db.create_all() already made it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('sweep_marks'):
+        op.create_table('sweep_marks',
+        sa.Column('name', sa.String(length=40), nullable=False),
+        sa.Column('high_water', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade():
+    op.drop_table('sweep_marks')
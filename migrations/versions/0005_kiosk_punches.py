@@ -0,0 +1,40 @@
+"""kiosk punches
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 17:05:41.551902
+
+Adds kiosk_punches, keyed by the kiosk's idempotency key, so retried
+punches are answered from the stored outcome instead of logged twice.
+Skipped if db.create_all() already made it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('kiosk_punches'):
+        op.create_table('kiosk_punches',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('punched_at', sa.DateTime(), nullable=False),
+        sa.Column('timelog_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(length=120), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['timelog_id'], ['timelogs.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('key')
+        )
+
+
+def downgrade():
+    op.drop_table('kiosk_punches')
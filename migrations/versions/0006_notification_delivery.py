@@ -0,0 +1,54 @@
+"""notification delivery status
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 17:31:08.092741
+
+Adds delivery status, attempt count, retry time, sent time and last
+error to notifications, plus the (status, next_attempt_at) index the
+delivery worker polls. Existing rows were never delivered anywhere but
+the inbox, so they are marked 'sent'. Columns or indexes that
+db.create_all() already made are skipped.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+]
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def upgrade():
+    existing = {c['name'] for c in _inspector().get_columns('notifications')}
+    missing = [col for col in COLUMNS if col.name not in existing]
+    if missing:
+        with op.batch_alter_table('notifications', schema=None) as batch_op:
+            for col in missing:
+                batch_op.add_column(col)
+        op.execute("UPDATE notifications SET status = 'sent', attempts = 0 WHERE status IS NULL")
+    if 'ix_notifications_status_next' not in {ix['name'] for ix in _inspector().get_indexes('notifications')}:
+        op.create_index('ix_notifications_status_next', 'notifications', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_status_next', table_name='notifications')
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        for col in reversed(COLUMNS):
+            batch_op.drop_column(col.name)
@@ -0,0 +1,36 @@
+"""unread notification counters
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 17:58:44.310927
+
+Adds unread_counts, one row per user holding their unread notification
+count, and fills it from the existing notifications. Skipped if
+db.create_all() already made it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('unread_counts'):
+        op.create_table('unread_counts',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+        op.execute("INSERT INTO unread_counts (user_id, unread) "
+                   "SELECT recipient_id, COUNT(*) FROM notifications WHERE read = false GROUP BY recipient_id")
+
+
+def downgrade():
+    op.drop_table('unread_counts')
@@ -0,0 +1,84 @@
+"""daily attendance rollup
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 19:02:16.541208
+
+Adds daily_attendance, one row per user and work date with shift
+counts, worked and break minutes and exception flags, and fills it from
+the existing shifts, timelogs and flags. The sums are worked out here
+rather than with the application's models, whose columns may be newer
+than this revision; they match attendance_controller.rollup_statement.
+Skipped if db.create_all() already made it.
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _ms(start, end):
+    """Whole milliseconds from start to end, rounded like the elapsed_ms SQL helper."""
+    return ((end - start) // timedelta(microseconds=1) + 500) // 1000
+
+
+def upgrade():
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('daily_attendance'):
+        return
+    table = op.create_table('daily_attendance',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('scheduled', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('missed', sa.Integer(), nullable=False),
+    sa.Column('worked_minutes', sa.Integer(), nullable=False),
+    sa.Column('break_minutes', sa.Integer(), nullable=False),
+    sa.Column('exceptions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_daily_attendance_day', 'daily_attendance', ['day'], unique=False)
+    shifts = sa.table('shifts', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                      sa.column('work_date', sa.Date), sa.column('status', sa.String))
+    timelogs = sa.table('timelogs', sa.column('id', sa.Integer), sa.column('shift_id', sa.Integer),
+                        sa.column('user_id', sa.Integer), sa.column('clock_in', sa.DateTime),
+                        sa.column('clock_out', sa.DateTime))
+    breaklogs = sa.table('breaklogs', sa.column('timelog_id', sa.Integer), sa.column('break_start', sa.DateTime),
+                         sa.column('break_end', sa.DateTime))
+    flags = sa.table('exception_flags', sa.column('shift_id', sa.Integer))
+    rows = {}  # (user_id, day) -> [scheduled, completed, missed, worked minutes, break minutes, exceptions]
+    for uid, day, status in bind.execute(sa.select(shifts.c.user_id, shifts.c.work_date, shifts.c.status)):
+        row = rows.setdefault((uid, day), [0] * 6)
+        row[0] += 1; row[1] += status == 'completed'; row[2] += status == 'missed'
+    break_ms = {}
+    finished = sa.select(breaklogs.c.timelog_id, breaklogs.c.break_start, breaklogs.c.break_end).where(
+        breaklogs.c.break_end.is_not(None))
+    for tid, start, end in bind.execute(finished):
+        break_ms[tid] = break_ms.get(tid, 0) + _ms(start, end)
+    for tid, uid, day, clock_in, clock_out in bind.execute(
+            sa.select(timelogs.c.id, timelogs.c.user_id, shifts.c.work_date, timelogs.c.clock_in, timelogs.c.clock_out)
+            .select_from(timelogs.join(shifts, shifts.c.id == timelogs.c.shift_id))):
+        row, off = rows.setdefault((uid, day), [0] * 6), break_ms.get(tid, 0)
+        row[3] += max(_ms(clock_in, clock_out) - off, 0) // 60000 if clock_out else 0
+        row[4] += off // 60000
+    for uid, day in bind.execute(sa.select(shifts.c.user_id, shifts.c.work_date)
+                                 .select_from(flags.join(shifts, shifts.c.id == flags.c.shift_id))):
+        rows.setdefault((uid, day), [0] * 6)[5] += 1
+    columns = ['scheduled', 'completed', 'missed', 'worked_minutes', 'break_minutes', 'exceptions']
+    values = [{'user_id': uid, 'day': day, **dict(zip(columns, counts))} for (uid, day), counts in rows.items()]
+    for i in range(0, len(values), 5000):
+        op.bulk_insert(table, values[i:i + 5000])
+
+
+def downgrade():
+    op.drop_index('ix_daily_attendance_day', table_name='daily_attendance')
+    op.drop_table('daily_attendance')
@@ -0,0 +1,36 @@
+"""table change counters
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 19:02:11.804513
+
+Adds table_versions, one change counter per table served with ETags
+(users, shifts, and the login accounts in user). The counters start at 1 so clients holding responses
+from before the upgrade revalidate once. Skipped if db.create_all()
+already made it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('table_versions'):
+        table = op.create_table('table_versions',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+        op.bulk_insert(table, [{'name': name, 'version': 1} for name in ('users', 'shifts', 'user')])
+
+
+def downgrade():
+    op.drop_table('table_versions')
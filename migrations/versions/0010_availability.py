@@ -0,0 +1,81 @@
+"""availability bitmaps
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 20:14:37.226190
+
+Adds availability, per staff member and week, bitmaps of the 15-minute
+slots taken by shifts and approved leave plus the week's rostered
+minutes, for the swap-candidate finder, and fills it from the existing
+shifts and approved leave. Skipped if db.create_all() already made it.
+
+"""
+from datetime import datetime, time, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+# The bitmap layout of App.controllers.availability_controller, as of this revision.
+SLOT = timedelta(minutes=15)
+WEEK = timedelta(days=7)
+WEEK_SLOTS = WEEK // SLOT
+
+
+def _weeks(start, end):
+    week = start.date() - timedelta(days=start.weekday())
+    while week <= (end - timedelta(microseconds=1)).date():
+        yield week
+        week += WEEK
+
+
+def _bits(start, end, week):
+    origin = datetime.combine(week, time.min)
+    a, b = max(0, (start - origin) // SLOT), min(WEEK_SLOTS, -(-(end - origin) // SLOT))
+    return ((1 << (b - a)) - 1) << a if a < b else 0
+
+
+def upgrade():
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('availability'):
+        return
+    table = op.create_table('availability',
+    sa.Column('week', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('shifts', sa.LargeBinary(), nullable=False),
+    sa.Column('leave', sa.LargeBinary(), nullable=False),
+    sa.Column('minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('week', 'user_id')
+    )
+    shifts = sa.table('shifts', sa.column('user_id', sa.Integer), sa.column('start_time', sa.DateTime),
+                      sa.column('end_time', sa.DateTime))
+    leave = sa.table('leave_requests', sa.column('requester_id', sa.Integer), sa.column('start_date', sa.Date),
+                     sa.column('end_date', sa.Date), sa.column('status', sa.String))
+    rows = {}  # (week, user_id) -> [shift bits, leave bits, minutes]
+    for uid, s, e in bind.execute(sa.select(shifts.c.user_id, shifts.c.start_time, shifts.c.end_time)
+                                  .where(shifts.c.end_time > shifts.c.start_time)):
+        for week in _weeks(s, e):
+            rows.setdefault((week, uid), [0, 0, 0])[0] |= _bits(s, e, week)
+        rows[(s.date() - timedelta(days=s.weekday()), uid)][2] += (e - s) // timedelta(minutes=1)
+    for uid, first, last in bind.execute(sa.select(leave.c.requester_id, leave.c.start_date, leave.c.end_date)
+                                         .where(leave.c.status == 'approved', leave.c.end_date >= leave.c.start_date)):
+        s, e = datetime.combine(first, time.min), datetime.combine(last + timedelta(days=1), time.min)
+        for week in _weeks(s, e):
+            rows.setdefault((week, uid), [0, 0, 0])[1] |= _bits(s, e, week)
+    values = [{'week': week, 'user_id': uid, 'shifts': bits.to_bytes(WEEK_SLOTS // 8, 'little'),
+               'leave': off.to_bytes(WEEK_SLOTS // 8, 'little'), 'minutes': minutes}
+              for (week, uid), (bits, off, minutes) in rows.items()]
+    for i in range(0, len(values), 5000):
+        op.bulk_insert(table, values[i:i + 5000])
+
+
+def downgrade():
+    op.drop_table('availability')
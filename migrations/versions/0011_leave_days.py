@@ -0,0 +1,51 @@
+"""leave calendar
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 21:03:52.519344
+
+Adds leave_days, one row per day of every approved leave request, and
+fills it from the existing approved requests. Skipped if
+db.create_all() already made it.
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('leave_days'):
+        return
+    table = op.create_table('leave_days',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('leave_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['leave_id'], ['leave_requests.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('day', 'user_id', 'leave_id')
+    )
+    op.create_index('ix_leave_days_leave', 'leave_days', ['leave_id'], unique=False)
+    leave = sa.table('leave_requests', sa.column('id', sa.Integer), sa.column('requester_id', sa.Integer),
+                     sa.column('start_date', sa.Date), sa.column('end_date', sa.Date),
+                     sa.column('status', sa.String))
+    approved = bind.execute(sa.select(leave.c.id, leave.c.requester_id, leave.c.start_date, leave.c.end_date)
+                            .where(leave.c.status == 'approved')).all()
+    rows = [{'day': start + timedelta(days=d), 'user_id': uid, 'leave_id': lid}
+            for lid, uid, start, end in approved for d in range((end - start).days + 1)]
+    for i in range(0, len(rows), 5000):
+        op.bulk_insert(table, rows[i:i + 5000])
+
+
+def downgrade():
+    op.drop_index('ix_leave_days_leave', table_name='leave_days')
+    op.drop_table('leave_days')
@@ -0,0 +1,77 @@
+"""leave ledger
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 22:14:08.716203
+
+Adds leave_ledger, the append-only record of leave entitlement postings,
+and leave_balances, its running total per user and leave type. Every
+request approved before the ledger existed gets its debit, so those types
+start tracked at minus the days already taken; accruals and opening
+balance adjustments are added on top. Skipped if db.create_all() already
+made them.
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('leave_ledger'):
+        return
+    ledger = op.create_table('leave_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('days', sa.Float(), nullable=False),
+    sa.Column('leave_id', sa.Integer(), nullable=True),
+    sa.Column('period', sa.String(length=7), nullable=True),
+    sa.Column('note', sa.String(length=255), nullable=True),
+    sa.Column('posted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['leave_id'], ['leave_requests.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_leave_ledger_user_type', 'leave_ledger', ['user_id', 'type', 'id'], unique=False)
+    op.create_index('ix_leave_ledger_leave', 'leave_ledger', ['leave_id'], unique=False)
+    op.create_index('ux_leave_ledger_accrual', 'leave_ledger', ['period', 'type', 'user_id'], unique=True)
+    op.create_table('leave_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('days', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'type')
+    )
+    leave = sa.table('leave_requests', sa.column('id', sa.Integer), sa.column('requester_id', sa.Integer),
+                     sa.column('start_date', sa.Date), sa.column('end_date', sa.Date),
+                     sa.column('type', sa.String), sa.column('status', sa.String))
+    approved = bind.execute(sa.select(leave.c.id, leave.c.requester_id, leave.c.type, leave.c.start_date,
+                                      leave.c.end_date)
+                            .where(leave.c.status == 'approved').order_by(leave.c.id)).all()
+    now = datetime.utcnow()
+    rows = [{'user_id': uid, 'type': kind, 'kind': 'debit', 'days': -float((end - start).days + 1),
+             'leave_id': lid, 'note': 'approved before the ledger', 'posted_at': now}
+            for lid, uid, kind, start, end in approved]
+    for i in range(0, len(rows), 5000):
+        op.bulk_insert(ledger, rows[i:i + 5000])
+    op.execute("INSERT INTO leave_balances (user_id, type, days) "
+               "SELECT user_id, type, SUM(days) FROM leave_ledger GROUP BY user_id, type")
+
+
+def downgrade():
+    op.drop_table('leave_balances')
+    op.drop_index('ux_leave_ledger_accrual', table_name='leave_ledger')
+    op.drop_index('ix_leave_ledger_leave', table_name='leave_ledger')
+    op.drop_index('ix_leave_ledger_user_type', table_name='leave_ledger')
+    op.drop_table('leave_ledger')